@@ -1,13 +1,26 @@
 import pandas as pd
-import feedparser
-from openai import AzureOpenAI
-import time
 import re
+import hashlib
+import json
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import chain
 from dotenv import load_dotenv
 import os
-from bs4 import BeautifulSoup
-import requests
-import chardet
+from article_extractor import fetch_article_summary
+from document_reader import iter_chunks, read_head
+from http_client import http_client
+from rate_limiter import rate_limited_completion
+from insight_cache import insight_cache, make_cache_key
+from insight_parser import (
+    MANUAL_PAGE_FIELDS, Insight, InsightParseError, json_batch_format_instructions, json_format_instructions,
+    load_json_insight, parse_insight
+)
+from feed_index import feed_index, entry_keys, manual_page_key
+from dedup_index import dedup_index, document_key
+from gazetteer import normalize_insight
+from metrics import metrics
 
 load_dotenv()  
 
@@ -19,19 +32,55 @@ rss_feeds = {
     "Global Construction Review": "https://www.globalconstructionreview.com/feed/",
 }
 
-client = AzureOpenAI(
-    api_key=os.getenv("AZURE_OPENAI_KEY"),                     
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),        
-    azure_deployment=os.getenv("AZURE_OPENAI_DEPLOYMENT"),
-    api_version="2023-05-15"                       
+# The client (and the openai package behind it) is only built for the first model call, so
+# importing this module needs no credentials and stays fast
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            from openai import AzureOpenAI
+
+            _client = AzureOpenAI(
+                api_key=os.getenv("AZURE_OPENAI_KEY"),
+                azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+                azure_deployment=os.getenv("AZURE_OPENAI_DEPLOYMENT"),
+                api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-01"),
+                max_retries=0  # retries and pacing are handled by rate_limiter
+            )
+    return _client
+
+MAX_WORKERS = int(os.getenv("AEC_MAX_WORKERS", "16"))
+MAX_LLM_CONCURRENCY = int(os.getenv("AEC_MAX_LLM_CONCURRENCY", "4"))
+BATCH_SIZE = int(os.getenv("AEC_BATCH_SIZE", "1"))
+BATCH_MAX_TOKENS = int(os.getenv("AEC_BATCH_MAX_TOKENS", "8000"))
+STRUCTURED_OUTPUT = os.getenv("AEC_STRUCTURED_OUTPUT", "1") == "1"
+DEDUP = os.getenv("AEC_DEDUP", "1") == "1"
+# Internal documents longer than one chunk are summarized chunk by chunk (map), and the notes
+# are merged in document order (reduce) before the usual insight prompt
+CHUNK_TOKENS = int(os.getenv("AEC_CHUNK_TOKENS", "3000"))
+NOTES_MAX_TOKENS = int(os.getenv("AEC_NOTES_MAX_TOKENS", "400"))
+CHUNK_WORKERS = int(os.getenv("AEC_CHUNK_WORKERS", str(MAX_LLM_CONCURRENCY)))
+MANUAL_SUMMARY_CHARS = 500
+
+_llm_slots = threading.BoundedSemaphore(MAX_LLM_CONCURRENCY)
+
+SYSTEM_PROMPT = (
+    "You are an elite AEC strategy analyst producing executive-grade insights for proactive business growth."
+    "If any words in the title or summary appear garbled, corrupted, or misencoded (e.g., 'â€™', 'xÃ©p'), attempt to infer and rewrite them correctly. "
+    "Translate foreign terms or Unicode errors into their likely English equivalents."
+    "Every field must be completed exactly as listed. Use 'N/A' only if the source is an internal article and the field is not applicable."
 )
 
-def ultimate_aec_market_intelligence_prompt(title, summary=None):
-    prompt = f"""
+def prompt_instructions(with_summary=True):
+    return f"""
 You are a senior market intelligence agent with expert knowledge of the Architecture, Engineering, and Construction (AEC) industry. 
 You have one goal: to extract deep, actionable insights from industry articles, publications, and announcements to support proactive business development and strategic positioning for Surbana Jurong.
 
-You will be given a news article title{'' if not summary else ' and summary'} from a professional AEC-relevant source. 
+You will be given a news article title{'' if not with_summary else ' and summary'} from a professional AEC-relevant source. 
 You may receive either:
 a. An external article title and/or summary (e.g., industry news, announcements, regulations), or
 b. An internal record (e.g., past SJ project, strategic document, or portfolio entry).
@@ -68,45 +117,244 @@ If the source is internal (e.g., historical SJ project or strategic plan), summa
 Be concise and complete all of the fields. Do not end any field with a period (.). 
 Always return clean, fluent English.
 
-Article Title: "{title}"
+"""
+
+def build_prompt(title, summary=None, structured=False):
+    return prompt_instructions(bool(summary)) + (json_format_instructions() + "\n" if structured else "") + f"""Article Title: "{title}"
 {f"Article Summary: {summary}" if summary else ''}
 """
 
-    response = client.chat.completions.create(
-        model=os.getenv("AZURE_OPENAI_DEPLOYMENT"),
+# Any edit to the prompt text changes this hash, which retires every cached insight built from the old wording
+PROMPT_VERSION = hashlib.sha256(
+    (SYSTEM_PROMPT + build_prompt("{title}") + build_prompt("{title}", "{summary}")).encode("utf-8")
+).hexdigest()[:16]
+JSON_PROMPT_VERSION = hashlib.sha256(
+    (SYSTEM_PROMPT + build_prompt("{title}", structured=True) + build_prompt("{title}", "{summary}", structured=True)).encode("utf-8")
+).hexdigest()[:16]
+
+def completion_options(structured):
+    return {"response_format": {"type": "json_object"}} if structured else {}
+
+def cached_insight(title, summary, versions, deployment):
+    # Answers from either output format parse the same way, so any of them will do
+    for version in versions:
+        cached = insight_cache.get(make_cache_key(title, summary, version, deployment))
+        if cached is not None:
+            metrics.incr("insight_cache", result="hit")
+            return cached
+    metrics.incr("insight_cache", result="miss")
+    return None
+
+def ultimate_aec_market_intelligence_prompt(title, summary=None, use_cache=True, structured=None):
+    structured = STRUCTURED_OUTPUT if structured is None else structured
+    version = JSON_PROMPT_VERSION if structured else PROMPT_VERSION
+    deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT")
+    if use_cache:
+        cached = cached_insight(title, summary, [version, JSON_PROMPT_VERSION, PROMPT_VERSION], deployment)
+        if cached is not None:
+            return cached
+
+    response = rate_limited_completion(
+        get_client(),
+        model=deployment,
         messages=[
-            {"role": "system", "content": "You are an elite AEC strategy analyst producing executive-grade insights for proactive business growth."
-             "If any words in the title or summary appear garbled, corrupted, or misencoded (e.g., 'â€™', 'xÃ©p'), attempt to infer and rewrite them correctly. "
-             "Translate foreign terms or Unicode errors into their likely English equivalents."
-             "Every field must be completed exactly as listed. Use 'N/A' only if the source is an internal article and the field is not applicable."
-            },
-            {"role": "user", "content": prompt}
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": build_prompt(title, summary, structured)}
         ],
-        max_tokens=800
+        max_tokens=800,
+        stage="llm_single",
+        **completion_options(structured)
     )
 
-    return response.choices[0].message.content.strip()
+    insight = response.choices[0].message.content.strip()
+    insight_cache.put(make_cache_key(title, summary, version, deployment), insight)
+    return insight
+
+def build_batch_prompt(articles, structured=False):
+    blocks = []
+    for k, (title, summary) in enumerate(articles, start=1):
+        blocks.append(f"""### Article {k}
+Article Title: "{title}"
+{f"Article Summary: {summary}" if summary else ''}""")
+    if structured:
+        output_format = json_format_instructions() + json_batch_format_instructions()
+    else:
+        output_format = """Start each block with the line "### Article k" using the article's number, followed by all of the numbered fields in the exact format above.
+"""
+    return prompt_instructions(True) + f"""You will be given {len(articles)} articles below, each introduced by a line "### Article k".
+Analyse each article independently and return one result block per article, in the same order.
+""" + output_format + """Do not merge, skip or reorder articles.
+
+""" + "\n\n".join(blocks) + "\n"
+
+BATCH_PROMPT_VERSION = hashlib.sha256(
+    (SYSTEM_PROMPT + build_batch_prompt([("{title}", "{summary}")])).encode("utf-8")
+).hexdigest()[:16]
+JSON_BATCH_PROMPT_VERSION = hashlib.sha256(
+    (SYSTEM_PROMPT + build_batch_prompt([("{title}", "{summary}")], structured=True)).encode("utf-8")
+).hexdigest()[:16]
+
+def split_batch_response(text, expected):
+    # Returns {article number: raw_insight}; articles whose block is missing or fails
+    # validation are left out so the caller can retry them one by one
+    blocks = {}
+    try:
+        articles = load_json_insight(text).get("articles")
+    except (InsightParseError, AttributeError):
+        articles = None
+    if isinstance(articles, list):
+        for position, item in enumerate(articles, start=1):
+            if not isinstance(item, dict):
+                continue
+            item = dict(item)
+            k = item.pop("article", position)
+            try:
+                k = int(k)
+                Insight.from_json(item)
+            except (InsightParseError, TypeError, ValueError):
+                continue
+            if 1 <= k <= expected and k not in blocks:
+                blocks[k] = json.dumps(item, ensure_ascii=False)
+        return blocks
+
+    parts = re.split(r"^\s*#{2,4}\s*Article\s+(\d+)\s*$", text, flags=re.M)
+    for number, block in zip(parts[1::2], parts[2::2]):
+        k = int(number)
+        block = block.strip()
+        parsed = parse_insight(block)
+        if 1 <= k <= expected and k not in blocks and parsed["Summary"] and parsed["Category"]:
+            blocks[k] = block
+    return blocks
+
+def batch_aec_market_intelligence_prompt(articles, use_cache=True, structured=None):
+    # articles is a list of (title, summary); returns one raw_insight per article, in order
+    structured = STRUCTURED_OUTPUT if structured is None else structured
+    version = JSON_BATCH_PROMPT_VERSION if structured else BATCH_PROMPT_VERSION
+    deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT")
+    insights = [None] * len(articles)
+
+    if use_cache:
+        versions = [version, JSON_BATCH_PROMPT_VERSION, BATCH_PROMPT_VERSION, JSON_PROMPT_VERSION, PROMPT_VERSION]
+        for i, (title, summary) in enumerate(articles):
+            insights[i] = cached_insight(title, summary, versions, deployment)
+
+    pending = [i for i, insight in enumerate(insights) if insight is None]
+    if len(pending) > 1:
+        response = rate_limited_completion(
+            get_client(),
+            model=deployment,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": build_batch_prompt([articles[i] for i in pending], structured)}
+            ],
+            max_tokens=min(BATCH_MAX_TOKENS, 700 * len(pending)),
+            stage="llm_batch",
+            **completion_options(structured)
+        )
+        blocks = split_batch_response(response.choices[0].message.content, len(pending))
+        for k, i in enumerate(pending, start=1):
+            if k in blocks:
+                insights[i] = blocks[k]
+                title, summary = articles[i]
+                insight_cache.put(make_cache_key(title, summary, version, deployment), blocks[k])
+        if len(blocks) < len(pending):
+            metrics.incr("batch_fallbacks", len(pending) - len(blocks))
+            print(f"⚠️ Batch returned {len(blocks)}/{len(pending)} usable blocks, retrying the rest one by one")
+
+    for i, insight in enumerate(insights):
+        if insight is None:
+            title, summary = articles[i]
+            insights[i] = ultimate_aec_market_intelligence_prompt(title, summary, use_cache=use_cache, structured=structured)
+
+    return insights
+
+
+NOTES_INSTRUCTIONS = """
+You are a senior market intelligence agent for Surbana Jurong, reading a long internal document in parts.
+Write concise notes on the part below, keeping only facts that matter for AEC business development:
+the project or initiative and its status, the client, partners and other organizations, the city and country,
+the sector, scale, cost and dates, and anything showing SJ's capabilities, strategy or lessons learned.
+Use short bullet points, at most 200 words, and never add facts that are not in the text.
+"""
+
+MERGE_INSTRUCTIONS = """
+You are a senior market intelligence agent for Surbana Jurong. Below are notes taken on consecutive parts of
+one internal document, in order. Merge them into a single set of concise bullet notes of at most 250 words.
+Keep every distinct fact about the project, organizations, location, sector, status, scale and strategic
+relevance; drop repetition. Never add facts that are not in the notes.
+"""
 
+def build_notes_prompt(title, text, merge=False):
+    return (MERGE_INSTRUCTIONS if merge else NOTES_INSTRUCTIONS) + f"""
+Document Title: "{title}"
+{"Notes" if merge else "Document Part"}:
+{text}
+"""
 
-def normalize_signal_strength(value):
-    value = value.lower().strip().rstrip('.') 
-    if value == "high":
-        return "High"
-    elif value == "medium":
-        return "Medium"
-    elif value == "low":
-        return "Low"
-    return value.capitalize()
+NOTES_PROMPT_VERSION = hashlib.sha256((SYSTEM_PROMPT + build_notes_prompt("{title}", "{text}")).encode("utf-8")).hexdigest()[:16]
+MERGE_PROMPT_VERSION = hashlib.sha256((SYSTEM_PROMPT + build_notes_prompt("{title}", "{text}", merge=True)).encode("utf-8")).hexdigest()[:16]
+
+def document_notes(title, text, merge=False):
+    # One map (or merge) call over a chunk of an internal document, cached like an insight
+    deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT")
+    key = make_cache_key(title, text, MERGE_PROMPT_VERSION if merge else NOTES_PROMPT_VERSION, deployment)
+    cached = insight_cache.get(key)
+    if cached is not None:
+        metrics.incr("insight_cache", result="hit")
+        return cached
+    metrics.incr("insight_cache", result="miss")
+
+    with _llm_slots:
+        response = rate_limited_completion(
+            get_client(),
+            model=deployment,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": build_notes_prompt(title, text, merge)}
+            ],
+            max_tokens=NOTES_MAX_TOKENS,
+            stage="llm_merge" if merge else "llm_map",
+        )
+    notes = response.choices[0].message.content.strip()
+    insight_cache.put(key, notes)
+    return notes
+
+def summarize_document(path, title):
+    # The text the insight prompt gets for an internal document: the document itself when it fits
+    # in one chunk, otherwise chunk notes merged in order. Chunks are read as the map calls need them
+    # (at most 2 * CHUNK_WORKERS in flight), and the notes are merged whenever they outgrow a chunk,
+    # so memory stays bounded whatever the document size
+    max_chars = CHUNK_TOKENS * 4  # ~4 characters per token, as rate_limiter budgets
+    chunks = iter_chunks(path, max_chars)
+    first = next(chunks, "")
+    second = next(chunks, None)
+    if second is None:
+        return first
+
+    notes, size = [], 0
+    def fold(note):
+        nonlocal notes, size
+        notes.append(note)
+        size += len(note)
+        if size > max_chars:
+            notes = [document_notes(title, "\n\n".join(notes), merge=True)]
+            size = len(notes[0])
+
+    with ThreadPoolExecutor(max_workers=CHUNK_WORKERS) as pool:
+        window = deque()
+        for chunk in chain([first, second], chunks):
+            metrics.incr("document_chunks")
+            window.append(pool.submit(document_notes, title, chunk))
+            if len(window) >= 2 * CHUNK_WORKERS:
+                fold(window.popleft().result())
+        while window:
+            fold(window.popleft().result())
+    return "\n\n".join(notes)
 
 def extract_clean_feed_entry(entry):
     try:
-        res = requests.get(entry.link, timeout=10)
-        detected = chardet.detect(res.content)
-        html = res.content.decode(detected["encoding"], errors="replace")
-        soup = BeautifulSoup(html, 'html.parser')
-
-        paragraphs = soup.find_all('p')
-        full_summary = " ".join(p.get_text() for p in paragraphs[:3])
+        with metrics.timer("article_fetch"):
+            full_summary = fetch_article_summary(entry.link, timeout=10)
 
         title = entry.title
         return {
@@ -120,120 +368,296 @@ def extract_clean_feed_entry(entry):
             "summary": entry.get("summary", "")
         }
 
-def run_news_insight_agent(feed_dict, manual_pages=None, max_per_feed=5):
-    all_results = []
-
-    for source, url in feed_dict.items():
-        feed = feedparser.parse(url)
-        print(f"\n📡 Processing: {source}")
-
-        for entry in feed.entries[:max_per_feed]:
-            article = extract_clean_feed_entry(entry)
-            title = article["title"]
-            summary = article["summary"]
-
-
-            insight = ultimate_aec_market_intelligence_prompt(title, summary)
-            print(f"📰 {title}")
-            print(f"🧠 Output:\n{insight}\n")
-
-
-            parsed_fields = {
-                "Summary": None,
-                "Source Type": None,
-                "Category": None,
-                "Entity Involved": None,
-                "City": None,
-                "Country": None,
-                "Sector": None,
-                "Project or Initiative Name": None,
-                "Project Status": None,
-                "Strategic Insight Summary": None,
-                "Signal Strength": None,
-                "Action Recommendation": None
-            }
-
-            for line in insight.splitlines():
-                match = re.match(r"\d+\.\s+\*\*(.*?)\*\*:\s*(.*)", line)
-                if match:
-                    key, value = match.groups()
-                    key = key.strip()
-
-                    if value.endswith('.'):
-                        value = value[:-1]
-
-                    if key == "Signal Strength":
-                        value = normalize_signal_strength(value)
-
-                    if key in parsed_fields:
-                        parsed_fields[key] = value.strip()
-
-            result = {
-                "Source": source,
-                "Title": title,
-                "URL": entry.link,
-                "raw_insight": insight,
-                **parsed_fields
-            }
-
-            all_results.append(result)
-            time.sleep(1.5)
- 
-
-    if manual_pages:
-        for name in manual_pages:
-            print(f"\n📄 Processing manual file: {name}")
-            try:
-                file_path = f"{name}.txt"
-                with open(file_path, "r", encoding="utf-8") as f:
-                    text = f.read()
-
-                title = name.replace("_", " ")
-                summary = text[:500]
-                insight = ultimate_aec_market_intelligence_prompt(title, summary)
-                print(f"🧠 Output:\n{insight}\n")
-
-                parsed_fields = {
-                    "Summary": None,
-                    "Source Type": "Internal",
-                    "Category": None,
-                    "Entity Involved": "Surbana Jurong",
-                    "City": None,
-                    "Country": None,
-                    "Sector": None,
-                    "Project or Initiative Name": None,
-                    "Project Status": None,
-                    "Strategic Insight Summary": None,
-                    "Signal Strength": None,
-                    "Action Recommendation": None
-                }
-
-                for line in insight.splitlines():
-                    match = re.match(r"\d+\.\s+\*\*(.*?)\*\*:\s*(.*)", line)
-                    if match:
-                        key, value = match.groups()
-                        key = key.strip()
-                        value = value.rstrip('.').strip()
-                        if key == "Signal Strength":
-                            value = normalize_signal_strength(value)
-                        if key in parsed_fields:
-                            if not parsed_fields[key]:  # Only overwrite if it was still None
-                                parsed_fields[key] = value
-
-                result = {
-                    "Source": name,
-                    "Title": title,
-                    "URL": "Manual Upload",
-                    "raw_insight": insight,
-                    **parsed_fields
-                }
-
-                all_results.append(result)
+def fetch_feed(url, incremental=False):
+    # The feed is downloaded through the shared client and only the body is handed to feedparser
+    import feedparser
+
+    headers = {}
+    if incremental:
+        etag, modified = feed_index.validators(url)
+        if etag:
+            headers["If-None-Match"] = etag
+        if modified:
+            headers["If-Modified-Since"] = modified
+    with metrics.timer("feed_download"):
+        res = http_client.get(url, timeout=10, headers=headers)
+        metrics.incr("feed_polls", status=res.status_code)
+        if res.status_code != 304:
+            res.raise_for_status()
+    if res.status_code == 304:
+        feed = feedparser.FeedParserDict(entries=[])
+    else:
+        with metrics.timer("feed_parse"):
+            feed = feedparser.parse(res.content, response_headers={k.lower(): v for k, v in res.headers.items()})
+    feed["status"] = res.status_code
+    feed["etag"] = res.headers.get("ETag")
+    feed["modified"] = res.headers.get("Last-Modified")
+    return feed
+
+def fetch_feed_article(entry):
+    return extract_clean_feed_entry(entry)
+
+def is_duplicate_article(key, title, summary):
+    # Syndicated copies of a story already analysed (in this run or an earlier one) skip the LLM.
+    # The article is registered under key, so its own re-runs are never duplicates
+    if not DEDUP:
+        return False
+    with metrics.timer("dedup_check"):
+        match = dedup_index.claim(key, title, summary)
+    if match:
+        metrics.incr("duplicates_skipped")
+        print(f"🔁 Skipping near-duplicate ({match.similarity:.0%}) of {match.title!r}: {title}")
+    return match is not None
+
+def analyse_feed_entry(source, entry):
+    # Returns None for a near-duplicate
+    article = fetch_feed_article(entry)
+    if is_duplicate_article(entry.link, article["title"], article["summary"]):
+        return None
+    insight = analyse_article(entry.link, article["title"], article["summary"])
+    return build_feed_row(source, entry, article["title"], insight)
+
+def analyse_article(key, title, summary):
+    # One chat completion; the dedup claim on key is released if it fails
+    try:
+        with _llm_slots:
+            return ultimate_aec_market_intelligence_prompt(title, summary)
+    except Exception:
+        dedup_index.discard(key)
+        raise
+
+def analyse_document(key, name, title):
+    # Map-reduce over the whole internal document, then one insight call on the result;
+    # the dedup claim on key is released if any call fails
+    try:
+        summary = summarize_document(f"{name}.txt", title)
+    except Exception:
+        dedup_index.discard(key)
+        raise
+    return analyse_article(key, title, summary)
+
+def analyse_feed_batch(items):
+    # items is a list of (source, entry, article); one chat completion covers all of them
+    try:
+        with _llm_slots:
+            insights = batch_aec_market_intelligence_prompt([(a["title"], a["summary"]) for _, _, a in items])
+    except Exception:
+        for _, entry, _ in items:
+            dedup_index.discard(entry.link)
+        raise
+    return [build_feed_row(source, entry, article["title"], insight)
+            for (source, entry, article), insight in zip(items, insights)]
+
+def build_feed_row(source, entry, title, insight):
+    print(f"📰 {title}")
+    print(f"🧠 Output:\n{insight}\n")
+
+    with metrics.timer("insight_parse"):
+        parsed_fields = parse_insight(insight)
+    with metrics.timer("normalize"):
+        normalized_fields = normalize_insight(parsed_fields)
+    metrics.incr("articles_analysed", source=source)
+
+    return {
+        "Source": source,
+        "Title": title,
+        "URL": entry.link,
+        "raw_insight": insight,
+        **parsed_fields,
+        **normalized_fields
+    }
+
+def read_manual_page(name):
+    # Only the head of the document: enough for the dedup check and the job record.
+    # analyse_document streams the whole file
+    return {"title": os.path.basename(name).replace("_", " "), "summary": read_head(f"{name}.txt", MANUAL_SUMMARY_CHARS)}
+
+def build_manual_row(name, title, insight):
+    print(f"🧠 Output:\n{insight}\n")
+
+    with metrics.timer("insight_parse"):
+        parsed_fields = parse_insight(insight, overrides=MANUAL_PAGE_FIELDS, first_wins=True)
+    with metrics.timer("normalize"):
+        normalized_fields = normalize_insight(parsed_fields)
+    metrics.incr("articles_analysed", source="manual")
+
+    return {
+        "Source": name,
+        "Title": title,
+        "URL": "Manual Upload",
+        "raw_insight": insight,
+        **parsed_fields,
+        **normalized_fields
+    }
+
+def analyse_manual_page(name):
+    print(f"\n📄 Processing manual file: {name}")
+    try:
+        page = read_manual_page(name)
+        title = page["title"]
+        if is_duplicate_article(document_key("Manual Upload", name), title, page["summary"]):
+            return None
+        insight = analyse_document(document_key("Manual Upload", name), name, title)
+        return build_manual_row(name, title, insight)
 
+    except Exception as e:
+        metrics.incr("failures", stage="manual_page", error=type(e).__name__)
+        print(f"❌ Failed to process {name}.txt: {e}")
+        return None
+
+def store_new_rows(df):
+    # What the scheduler does with each batch of rows: one new part file in the insight store, with
+    # the dedup signatures, then counted for the dashboard charts and embedded for search
+    from insight_rollups import insight_rollups
+    from insight_store import get_insight_store
+    from vector_index import vector_index
+
+    df = dedup_index.with_signatures(df)
+    part = get_insight_store().append(df)
+    try:
+        insight_rollups.add(df, part)
+    except Exception as e:
+        # The next sync counts the part file instead
+        print(f"❌ Failed to update rollups: {e}")
+    try:
+        vector_index.add(df, part)
+    except Exception as e:
+        # The next sync embeds the part file instead
+        print(f"❌ Failed to update the search index: {e}")
+    print(f"💾 Stored {len(df)} insights")
+
+def submit_batches(pool, fetch_futures, sources, batch_size, feed_failures):
+    # Group articles into batches as their downloads finish; near-duplicates never join a batch.
+    # Returns ({batch future: [(i, j, entry), ...]}, [(i, entry) skipped as duplicates])
+    batch_futures = {}
+    duplicates = []
+    targets, items = [], []
+    for future in as_completed(fetch_futures):
+        i, j, entry = fetch_futures[future]
+        try:
+            article = future.result()
+        except Exception as e:
+            feed_failures[i] += 1
+            print(f"❌ Failed to fetch {entry.link}: {e}")
+            continue
+        if is_duplicate_article(entry.link, article["title"], article["summary"]):
+            duplicates.append((i, entry))
+            continue
+        targets.append((i, j, entry))
+        items.append((sources[i][0], entry, article))
+        if len(items) == batch_size:
+            batch_futures[pool.submit(analyse_feed_batch, items)] = targets
+            targets, items = [], []
+    if items:
+        batch_futures[pool.submit(analyse_feed_batch, items)] = targets
+    return batch_futures, duplicates
+
+def run_news_insight_agent(feed_dict, manual_pages=None, max_per_feed=5, max_workers=None, incremental=False, batch_size=None):
+    # Feed polls, page downloads and LLM calls all run on one worker pool.
+    # http_client caps connections and pacing per site and _llm_slots caps
+    # in-flight chat completions, so the pool can be wide without hammering anyone.
+    # With incremental=True only entries missing from feed_index are analysed and
+    # feeds are polled with their stored ETag/Last-Modified, so an unchanged feed costs one 304.
+    # The new rows are then appended to the insight store, and only after that are the entries
+    # remembered as seen, so a failed write leaves them for the next run.
+    # With batch_size > 1 downloaded articles are grouped and analysed batch_size per chat completion.
+    # Articles whose text nearly matches one already in dedup_index are dropped before the LLM.
+    batch_size = batch_size or BATCH_SIZE
+    run_started = metrics.snapshot()
+    sources = list(feed_dict.items())
+    feed_results = [[] for _ in sources]
+    feed_failures = [0 for _ in sources]
+    manual_results = []
+    polled = {}
+    seen = []
+
+    with ThreadPoolExecutor(max_workers=max_workers or MAX_WORKERS) as pool:
+        feed_futures = {pool.submit(fetch_feed, url, incremental): i for i, (source, url) in enumerate(sources)}
+        entry_futures = {}
+
+        for future in as_completed(feed_futures):
+            i = feed_futures[future]
+            source = sources[i][0]
+            try:
+                feed = future.result()
             except Exception as e:
-                print(f"❌ Failed to process {name}.txt: {e}")
-
-    return pd.DataFrame(all_results)
-
-
-
+                print(f"❌ Failed to parse feed {source}: {e}")
+                continue
+
+            if incremental and feed.get("status") == 304:
+                print(f"\n💤 No changes: {source}")
+                continue
+            print(f"\n📡 Processing: {source}")
+            polled[i] = feed
+
+            entries = feed.entries[:max_per_feed]
+            if incremental:
+                entries = [entry for entry in entries if not feed_index.is_seen(entry_keys(entry))]
+                print(f"🆕 {len(entries)} new entries from {source}")
+            feed_results[i] = [None] * len(entries)
+            for j, entry in enumerate(entries):
+                if batch_size > 1:
+                    entry_futures[pool.submit(fetch_feed_article, entry)] = (i, j, entry)
+                else:
+                    entry_futures[pool.submit(analyse_feed_entry, source, entry)] = [(i, j, entry)]
+
+        duplicates = []
+        if batch_size > 1:
+            entry_futures, duplicates = submit_batches(pool, entry_futures, sources, batch_size, feed_failures)
+
+        manual_futures = []
+        for name in manual_pages or []:
+            if incremental:
+                try:
+                    if feed_index.is_seen([manual_page_key(name)]):
+                        continue
+                except OSError as e:
+                    print(f"❌ Failed to process {name}.txt: {e}")
+                    continue
+            manual_futures.append((name, pool.submit(analyse_manual_page, name)))
+
+        for future in as_completed(entry_futures):
+            targets = entry_futures[future]
+            try:
+                rows = future.result()
+            except Exception as e:
+                for i, j, entry in targets:
+                    feed_failures[i] += 1
+                    print(f"❌ Failed to analyse entry from {sources[i][0]}: {e}")
+                continue
+            if batch_size <= 1:
+                rows = [rows]
+            for (i, j, entry), row in zip(targets, rows):
+                feed_results[i][j] = row
+                seen.append((entry_keys(entry), sources[i][0]))
+
+        # A skipped duplicate counts as handled, so the next incremental run does not fetch it again
+        seen.extend((entry_keys(entry), sources[i][0]) for i, entry in duplicates)
+
+        for name, future in manual_futures:
+            result = future.result()
+            if result is not None:
+                manual_results.append(result)
+                seen.append(([manual_page_key(name)], name))
+
+    http_client.print_metrics()
+    metrics.print_summary(since=run_started)
+    metrics.write_prometheus()
+
+    # Keep the sequential ordering: feeds in dict order, entries in feed order, then manual pages
+    all_results = [r for results in feed_results for r in results if r is not None]
+    all_results.extend(manual_results)
+    df = pd.DataFrame(all_results)
+
+    if incremental:
+        if len(df):
+            store_new_rows(df)
+        for keys, source in seen:
+            feed_index.mark_seen(keys, source)
+        # Only remember the validators once every entry of the feed made it through,
+        # otherwise a 304 next time would hide the entries that failed
+        for i, feed in polled.items():
+            if not feed_failures[i]:
+                feed_index.save_validators(sources[i][1], feed.get("etag"), feed.get("modified"))
+
+    return df
@@ -0,0 +1,133 @@
+import codecs
+import os
+import re
+import time
+
+import chardet
+from dotenv import load_dotenv
+from lxml import etree
+
+from http_client import http_client
+from metrics import metrics
+
+load_dotenv()
+
+AEC_MAX_ARTICLE_BYTES = int(os.getenv("AEC_MAX_ARTICLE_BYTES", "1000000"))
+CHUNK_SIZE = 16 * 1024
+SNIFF_BYTES = 32 * 1024
+
+_HEADER_CHARSET = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.I)
+_META_CHARSET = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?\s*([\w.:-]+)", re.I)
+
+
+def known_encoding(name):
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name.decode("ascii") if isinstance(name, bytes) else name).name
+    except (LookupError, UnicodeDecodeError):
+        return None
+
+
+def detect_encoding(content_type, prefix):
+    # Header first, then <meta charset>, and only then chardet on a bounded prefix
+    match = _HEADER_CHARSET.search(content_type or "")
+    encoding = known_encoding(match.group(1)) if match else None
+    if encoding:
+        return encoding
+    match = _META_CHARSET.search(prefix[:SNIFF_BYTES])
+    encoding = known_encoding(match.group(1)) if match else None
+    if encoding:
+        return encoding
+    encoding = known_encoding(chardet.detect(prefix[:SNIFF_BYTES])["encoding"])
+    # A plain-ASCII prefix says nothing about the rest of the page
+    return None if encoding in (None, "ascii") else encoding
+
+
+class Utf8OrCp1252Decoder:
+    # For undeclared pages: assume UTF-8 until a byte proves otherwise, then switch to windows-1252
+    def __init__(self):
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+
+    def decode(self, data, final=False):
+        try:
+            return self.decoder.decode(data, final=final)
+        except UnicodeDecodeError:
+            self.decoder = codecs.getincrementaldecoder("cp1252")(errors="replace")
+            return self.decoder.decode(data, final=final)
+
+
+def make_decoder(encoding):
+    if encoding is None:
+        return Utf8OrCp1252Decoder()
+    return codecs.getincrementaldecoder(encoding)(errors="replace")
+
+
+def paragraph_text(element):
+    return "".join(element.itertext())
+
+
+def extract_paragraphs(chunks, content_type=None, max_paragraphs=3, max_bytes=AEC_MAX_ARTICLE_BYTES):
+    # chunks is any iterable of bytes. Parsing is incremental and stops as soon as
+    # max_paragraphs <p> elements have closed or max_bytes have been read
+    chunks = iter(chunks)
+    prefix = b""
+    for chunk in chunks:
+        prefix += chunk
+        if len(prefix) >= SNIFF_BYTES:
+            break
+
+    with metrics.timer("encoding_detect"):
+        decoder = make_decoder(detect_encoding(content_type, prefix))
+    parser = etree.HTMLPullParser(events=("end",), tag="p")
+    paragraphs = []
+    read = 0
+    parse_seconds = 0.0
+
+    def feed(data, final=False):
+        # Only decode and parse time counts as html_parse; waiting for the next chunk is download time
+        nonlocal read, parse_seconds
+        start = time.perf_counter()
+        read += len(data)
+        try:
+            text = decoder.decode(data, final=final)
+            if text:
+                parser.feed(text)
+            for _, element in parser.read_events():
+                paragraphs.append(paragraph_text(element))
+                element.clear()
+                if len(paragraphs) >= max_paragraphs:
+                    return True
+            return False
+        finally:
+            parse_seconds += time.perf_counter() - start
+
+    done = feed(prefix[:max_bytes])
+    for chunk in chunks:
+        if done or read >= max_bytes:
+            break
+        done = feed(chunk[:max_bytes - read])
+    if not done:
+        feed(b"", final=True)
+        try:
+            parser.close()
+        except etree.LxmlError:
+            pass
+        for _, element in parser.read_events():
+            if len(paragraphs) < max_paragraphs:
+                paragraphs.append(paragraph_text(element))
+
+    metrics.observe("html_parse", parse_seconds)
+    return paragraphs[:max_paragraphs]
+
+
+def fetch_article_summary(url, client=None, timeout=10, max_paragraphs=3, max_bytes=AEC_MAX_ARTICLE_BYTES):
+    client = client or http_client
+    with client.stream(url, timeout=timeout, chunk_size=CHUNK_SIZE) as (res, chunks):
+        paragraphs = extract_paragraphs(
+            chunks,
+            res.headers.get("Content-Type"),
+            max_paragraphs=max_paragraphs,
+            max_bytes=max_bytes,
+        )
+    return " ".join(paragraphs)
@@ -1,30 +1,92 @@
-from azure.storage.blob import BlobServiceClient
 import pandas as pd
 from io import StringIO
 import os
+import threading
 from dotenv import load_dotenv
+from metrics import metrics
 
 load_dotenv()
 
-connect_str = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
-blob_service_client = BlobServiceClient.from_connection_string(connect_str)
 container_name = "aec-insights"
 
-# Create container if it doesn't exist
-try:
-    blob_service_client.create_container(container_name)
-except:
-    pass
+# The Azure SDK, the service client and the create-container round trip all wait for the first
+# blob access, so importing this module needs neither credentials nor the network
+_container_client = None
+_container_lock = threading.Lock()
+
+
+def get_container_client():
+    global _container_client
+    with _container_lock:
+        if _container_client is None:
+            from azure.core.exceptions import ResourceExistsError
+            from azure.storage.blob import BlobServiceClient
+
+            service = BlobServiceClient.from_connection_string(os.getenv("AZURE_STORAGE_CONNECTION_STRING"))
+            container = service.get_container_client(container_name)
+            # Create container if it doesn't exist. It nearly always does, which is not a failure; any
+            # other error propagates and the next blob access tries again
+            with metrics.timer("blob_connect"):
+                try:
+                    container.create_container()
+                except ResourceExistsError:
+                    pass
+            _container_client = container
+    return _container_client
 
 def upload_insights_to_blob(df, filename="insights.csv"):
     output = StringIO()
     df.to_csv(output, index=False)
-    blob_client = blob_service_client.get_blob_client(container=container_name, blob=filename)
-    blob_client.upload_blob(output.getvalue(), overwrite=True)
+    blob_client = get_container_client().get_blob_client(filename)
+    data = output.getvalue()
+    with metrics.timer("blob_upload"):
+        blob_client.upload_blob(data, overwrite=True)
+    metrics.incr("blob_bytes", len(data), direction="upload")
 
 def load_insights_from_blob(filename="insights.csv"):
-    blob_client = blob_service_client.get_blob_client(container=container_name, blob=filename)
-    if blob_client.exists():
-        stream = blob_client.download_blob()
-        return pd.read_csv(StringIO(stream.readall().decode()))
-    return pd.DataFrame()  
\ No newline at end of file
+    blob_client = get_container_client().get_blob_client(filename)
+    with metrics.timer("blob_download"):
+        if not blob_client.exists():
+            return pd.DataFrame()
+        data = blob_client.download_blob().readall()
+    metrics.incr("blob_bytes", len(data), direction="download")
+    with metrics.timer("csv_parse"):
+        return pd.read_csv(StringIO(data.decode()))
+
+class BlobBackend:
+    # Insight store part files as individual blobs under one prefix of the container
+    def __init__(self, prefix="insight_store/"):
+        self.prefix = prefix
+
+    @property
+    def container(self):
+        return get_container_client()
+
+    def list_files(self):
+        with metrics.timer("blob_list"):
+            return sorted(
+                blob.name[len(self.prefix):]
+                for blob in self.container.list_blobs(name_starts_with=self.prefix)
+                if blob.name.endswith(".parquet")
+            )
+
+    def read_file(self, name):
+        with metrics.timer("blob_download"):
+            data = self.container.get_blob_client(self.prefix + name).download_blob().readall()
+        metrics.incr("blob_bytes", len(data), direction="download")
+        return data
+
+    def write_file(self, name, data):
+        with metrics.timer("blob_upload"):
+            self.container.get_blob_client(self.prefix + name).upload_blob(data, overwrite=False)
+        metrics.incr("blob_bytes", len(data), direction="upload")
+
+    def delete_file(self, name):
+        from azure.core.exceptions import ResourceNotFoundError
+
+        with metrics.timer("blob_delete"):
+            try:
+                self.container.get_blob_client(self.prefix + name).delete_blob()
+            except ResourceNotFoundError:
+                # Already deleted, by another machine compacting the same partition
+                pass
@@ -0,0 +1,121 @@
+import argparse
+import io
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+import pyarrow.parquet as pq
+from dotenv import load_dotenv
+
+from gazetteer import normalize_frame
+from insight_parser import INSIGHT_FIELDS, MANUAL_PAGE_FIELDS, parse_insights_bulk
+from insight_rollups import insight_rollups
+from insight_store import get_insight_store, to_arrow
+from vector_index import vector_index
+
+load_dotenv()
+
+# Re-derives the parsed and normalized columns of every stored insight from its raw_insight
+# text, after a change to the parsing rules or the gazetteer, without calling the model:
+#   python backfill.py --workers 8 --dry-run
+# Part files are processed in parallel, each streamed in record batches of --chunk-rows so
+# memory stays bounded whatever the store size. A part whose rows all come out unchanged is
+# left alone; the others are written back as the part's next revision.
+
+AEC_BACKFILL_CHUNK_ROWS = int(os.getenv("AEC_BACKFILL_CHUNK_ROWS", "50000"))
+AEC_BACKFILL_WORKERS = int(os.getenv("AEC_BACKFILL_WORKERS", str(os.cpu_count() or 1)))
+
+
+def rederive(df):
+    # The columns build_feed_row / build_manual_row would produce for the stored raw_insight.
+    # Rows without one (migrated from the old CSV) only get their normalized columns refreshed
+    if "raw_insight" in df:
+        raw = df["raw_insight"].astype(object)
+        has_raw = raw.notna() & raw.astype(str).str.strip().ne("")
+        if has_raw.any():
+            raw = raw[has_raw]
+            manual = df.loc[has_raw, "URL"].eq("Manual Upload") if "URL" in df else pd.Series(False, index=raw.index)
+            # Internal documents keep the first value of a repeated field, feed rows the last
+            parsed = pd.concat([parse_insights_bulk(raw[~manual]), parse_insights_bulk(raw[manual], first_wins=True)])
+            for column, value in MANUAL_PAGE_FIELDS.items():
+                parsed.loc[manual[manual].index, column] = value
+            df = df.copy()
+            for column in INSIGHT_FIELDS:
+                stored = df[column].astype(object) if column in df else None
+                df[column] = parsed[column].reindex(df.index).where(has_raw, stored)
+    return normalize_frame(df, refresh=True)
+
+
+def backfill_part(path, chunk_rows):
+    # Runs in a worker process. Returns (rows, changed rows, new file bytes or None)
+    source = pq.ParquetFile(path)
+    buffer = io.BytesIO()
+    writer = None
+    rows = changed = 0
+    for batch in source.iter_batches(batch_size=chunk_rows):
+        df = batch.to_pandas()
+        table = to_arrow(rederive(df))
+        old = df.reindex(columns=table.column_names)
+        new = table.to_pandas()
+        # Nulls compare equal here, unlike with ==
+        same = (old.isna() & new.isna()) | (old == new)
+        changed += int((~same.all(axis=1)).sum())
+        rows += len(df)
+        if writer is None:
+            # Keeps the part's own metadata, such as the parts a compacted part replaces
+            writer = pq.ParquetWriter(buffer, table.schema.with_metadata(source.schema_arrow.metadata), compression="zstd")
+        writer.write_table(table.cast(writer.schema))
+    if writer is None:
+        return rows, changed, None
+    writer.close()
+    return rows, changed, buffer.getvalue() if changed else None
+
+
+def run_backfill(store=None, workers=AEC_BACKFILL_WORKERS, chunk_rows=AEC_BACKFILL_CHUNK_ROWS, dry_run=False):
+    store = store or get_insight_store()
+    store.sync()
+    names = store.current_files()
+    totals = {"parts": len(names), "rows": 0, "changed_rows": 0, "rewritten_parts": 0}
+    start = time.perf_counter()
+    # At most two parts per worker in flight, so finished files never pile up in memory
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending, queue = {}, iter(names)
+        while True:
+            for name in queue:
+                pending[pool.submit(backfill_part, os.path.join(store.cache_dir, name), chunk_rows)] = name
+                if len(pending) >= 2 * workers:
+                    break
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                rows, changed, data = future.result()
+                totals["rows"] += rows
+                totals["changed_rows"] += changed
+                if data is not None:
+                    totals["rewritten_parts"] += 1
+                    if not dry_run:
+                        store.replace_file(name, data)
+    totals["seconds"] = time.perf_counter() - start
+
+    if totals["rewritten_parts"] and not dry_run:
+        # Counted parts were replaced, so the chart rollups are recounted from the new files.
+        # The search index reads them too, but only re-embeds rows whose text changed
+        insight_rollups.sync(store)
+        vector_index.sync(store)
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-derive stored insight columns from raw_insight")
+    parser.add_argument("--workers", type=int, default=AEC_BACKFILL_WORKERS)
+    parser.add_argument("--chunk-rows", type=int, default=AEC_BACKFILL_CHUNK_ROWS, help="rows per record batch")
+    parser.add_argument("--dry-run", action="store_true", help="count the rows that would change, write nothing")
+    args = parser.parse_args()
+
+    totals = run_backfill(workers=args.workers, chunk_rows=args.chunk_rows, dry_run=args.dry_run)
+    verb = "would change" if args.dry_run else "changed"
+    print(f"✅ {totals['rows']} rows in {totals['parts']} parts, {totals['changed_rows']} {verb} "
+          f"({totals['rewritten_parts']} parts), {totals['seconds']:.1f}s")
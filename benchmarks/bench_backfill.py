@@ -0,0 +1,89 @@
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+# Wall time, throughput and peak memory of backfill.py re-deriving a store of synthetic
+# insights (markdown answers with a share of JSON ones), against the per-row parse_insight /
+# normalize_insight path timed on a sample and scaled up. Nothing calls the model:
+#   python benchmarks/bench_backfill.py --rows 1000000 --workers 8
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+# The backfill recounts the chart rollups and updates the search index; keep them out of the real cache
+SCRATCH = tempfile.mkdtemp(prefix="aec-backfill-")
+os.environ["AEC_ROLLUPS_PATH"] = os.path.join(SCRATCH, "insight_rollups.sqlite")
+os.environ["AEC_VECTOR_INDEX_PATH"] = os.path.join(SCRATCH, "vector_index.sqlite")
+
+from backfill import run_backfill
+from fixtures import markdown_insight, synthetic_responses
+from gazetteer import normalize_insight
+from insight_parser import INSIGHT_FIELDS, parse_insight
+from insight_store import InsightStore, LocalBackend
+
+ANSWERS = synthetic_responses(n=500)
+
+
+def make_rows(rng, n, json_share):
+    picks = rng.integers(len(ANSWERS), size=n)
+    as_json = rng.random(n) < json_share
+    raw = [json.dumps(ANSWERS[p]) if j else markdown_insight(ANSWERS[p]) for p, j in zip(picks, as_json)]
+    df = pd.DataFrame({
+        "Source": "Bench",
+        "Title": [f"Article {i}" for i in range(n)],
+        "URL": [f"https://bench.example/{i}" for i in range(n)],
+        "raw_insight": raw,
+    })
+    # Stored columns as an older parser left them: untouched casing, trailing full stops
+    for column in INSIGHT_FIELDS:
+        df[column] = [ANSWERS[p][INSIGHT_FIELDS[column]] + "." for p in picks]
+    return df
+
+
+def per_row(df):
+    for raw in df["raw_insight"]:
+        normalize_insight(parse_insight(raw))
+
+
+def peak_rss_mb(who):
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--part-rows", type=int, default=20_000, help="rows per stored part file")
+    parser.add_argument("--json-share", type=float, default=0.1)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-rows", type=int, default=50_000)
+    parser.add_argument("--sample", type=int, default=20_000, help="rows timed on the per-row path")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    store = InsightStore(LocalBackend(os.path.join(SCRATCH, "insight_store")))
+    start = time.perf_counter()
+    for offset in range(0, args.rows, args.part_rows):
+        rows = min(args.part_rows, args.rows - offset)
+        store.append(make_rows(rng, rows, args.json_share), ingest_date=f"2025-01-{offset // args.part_rows % 28 + 1:02d}")
+    print(f"📦 wrote {args.rows} rows in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    sample = make_rows(rng, min(args.sample, args.rows), args.json_share)
+    start = time.perf_counter()
+    per_row(sample)
+    per_row_seconds = (time.perf_counter() - start) * args.rows / len(sample)
+
+    totals = run_backfill(store, workers=args.workers, chunk_rows=args.chunk_rows, dry_run=True)
+    dry_seconds = totals["seconds"]
+    totals = run_backfill(store, workers=args.workers, chunk_rows=args.chunk_rows)
+
+    print(f"{'rows':>9} {'parts':>6} {'workers':>8} {'changed':>9} {'dry run s':>10} {'backfill s':>11} "
+          f"{'rows/s':>9} {'per-row s (est.)':>17} {'parent MB':>10} {'worker MB':>10}")
+    print(f"{totals['rows']:>9} {totals['parts']:>6} {args.workers:>8} {totals['changed_rows']:>9} {dry_seconds:>10.1f} "
+          f"{totals['seconds']:>11.1f} {totals['rows'] / totals['seconds']:>9.0f} {per_row_seconds:>17.1f} "
+          f"{peak_rss_mb(resource.RUSAGE_SELF):>10.0f} {peak_rss_mb(resource.RUSAGE_CHILDREN):>10.0f}")
@@ -0,0 +1,142 @@
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Compares tokens and wall time of one-article-per-call against batched prompting,
+# using the local stub deployment so nothing is billed:
+#   python benchmarks/bench_batching.py --articles 50 --batch-sizes 1 5 10
+# With --scheduler the articles come from stub feeds through a real scheduler.py run
+# (fetch workers feeding the analyse stage), so the calls per article are what the daemon makes:
+#   python benchmarks/bench_batching.py --scheduler --articles 60 --batch-sizes 1 5 10
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_openai_server import start_stub_server
+
+
+def make_articles(n):
+    return [(
+        f"Contractor wins ${i + 10}m contract for new hospital wing in Sydney",
+        "The state health department has awarded the design-and-construct package for a 300-bed "
+        "expansion, with works due to start next year and completion expected by 2029. " * 3,
+    ) for i in range(n)]
+
+
+def run(articles, batch_size, concurrency):
+    import aec_agent
+
+    if batch_size <= 1:
+        call = lambda article: [aec_agent.ultimate_aec_market_intelligence_prompt(*article, use_cache=False)]
+        work = articles
+    else:
+        call = lambda batch: aec_agent.batch_aec_market_intelligence_prompt(batch, use_cache=False)
+        work = [articles[i:i + batch_size] for i in range(0, len(articles), batch_size)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = [insight for insights in pool.map(call, work) for insight in insights]
+    return time.perf_counter() - start, results
+
+
+def run_scheduler(feed_urls, per_feed, batch_size):
+    # Runs inside the child process; the environment already points every index at a scratch dir
+    from scheduler import Scheduler
+
+    scheduler = Scheduler(feeds=feed_urls, manual_pages=[], max_per_feed=per_feed, batch_size=batch_size, indexes=False)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        scheduler.run_once()
+    return {"seconds": time.perf_counter() - start, "jobs": scheduler.jobs.counts()}
+
+
+def spawn_scheduler(args, batch_size, feed_urls, llm_url):
+    scratch = tempfile.mkdtemp(prefix="aec-batching-")
+    env = dict(os.environ, **{
+        "AZURE_OPENAI_KEY": "stub",
+        "AZURE_OPENAI_ENDPOINT": llm_url,
+        "AZURE_OPENAI_DEPLOYMENT": "stub",
+        "AZURE_OPENAI_TPM": "100000000",
+        "AZURE_OPENAI_RPM": "100000",
+        # Every stub feed and page is one site, so pages reach the analyse stage one per host delay
+        "AEC_HOST_DELAY": str(args.host_delay),
+        "AEC_MAX_LLM_CONCURRENCY": str(args.concurrency),
+        "AEC_STORE_BACKEND": "local",
+        "AEC_STORE_DIR": os.path.join(scratch, "insight_store"),
+        "AEC_METRICS_LOG": "",
+        "AEC_METRICS_PROM_PATH": "",
+    })
+    job = {"feeds": feed_urls, "per_feed": math.ceil(args.articles / len(feed_urls)), "batch_size": batch_size}
+    # Every other index defaults to .cache/ under the working directory
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", json.dumps(job)],
+                         env=env, cwd=scratch, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(f"batch size {batch_size} failed:\n{out.stderr[-2000:]}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--worker":
+        job = json.loads(sys.argv[2])
+        print(json.dumps(run_scheduler(job["feeds"], job["per_feed"], job["batch_size"])))
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=50)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.3, help="stub base latency per call (s)")
+    parser.add_argument("--token-latency", type=float, default=0.002, help="stub latency per completion token (s)")
+    parser.add_argument("--scheduler", action="store_true", help="run the articles through scheduler.py from stub feeds")
+    parser.add_argument("--feeds", type=int, default=3, help="stub feeds the articles are spread over (--scheduler)")
+    parser.add_argument("--host-delay", type=float, default=0.25, help="AEC_HOST_DELAY for the scheduler run (--scheduler)")
+    args = parser.parse_args()
+
+    server = start_stub_server(latency=args.latency, token_latency=args.token_latency)
+    if args.scheduler:
+        from stub_feed_server import start_stub_feed_server
+
+        feeds = start_stub_feed_server(feeds=args.feeds, items=math.ceil(args.articles / args.feeds))
+        llm_url = f"http://127.0.0.1:{server.server_address[1]}"
+        print(f"{'batch':>6} {'stored':>7} {'calls':>6} {'calls/article':>14} {'tok/article':>12} {'wall s':>8}")
+        for batch_size in args.batch_sizes:
+            state = server.state
+            before = (state.requests, state.prompt_tokens, state.completion_tokens)
+            result = spawn_scheduler(args, batch_size, feeds.feed_urls, llm_url)
+            stored = result["jobs"].get("stored", 0)
+            calls = state.requests - before[0]
+            tokens = state.prompt_tokens - before[1] + state.completion_tokens - before[2]
+            print(f"{batch_size:>6} {stored:>7} {calls:>6} {calls / max(stored, 1):>14.2f} {tokens / max(stored, 1):>12.0f} "
+                  f"{result['seconds']:>8.2f}")
+        feeds.shutdown()
+        server.shutdown()
+        sys.exit(0)
+    os.environ.update({
+        "AZURE_OPENAI_KEY": "stub",
+        "AZURE_OPENAI_ENDPOINT": f"http://127.0.0.1:{server.server_address[1]}",
+        "AZURE_OPENAI_DEPLOYMENT": "stub",
+        "AZURE_OPENAI_TPM": "100000000",
+        "AZURE_OPENAI_RPM": "100000",
+        "AEC_CACHE_PATH": os.path.join(tempfile.mkdtemp(), "cache.sqlite"),
+    })
+
+    articles = make_articles(args.articles)
+    print(f"{'batch':>6} {'calls':>6} {'prompt tok':>11} {'compl tok':>10} {'tok/article':>12} {'wall s':>8}")
+    for batch_size in args.batch_sizes:
+        state = server.state
+        before = (state.requests, state.prompt_tokens, state.completion_tokens)
+        elapsed, results = run(articles, batch_size, args.concurrency)
+        assert len(results) == len(articles)
+        calls = state.requests - before[0]
+        prompt = state.prompt_tokens - before[1]
+        completion = state.completion_tokens - before[2]
+        print(f"{batch_size:>6} {calls:>6} {prompt:>11} {completion:>10} {(prompt + completion) / len(articles):>12.0f} {elapsed:>8.2f}")
+
+    server.shutdown()
@@ -0,0 +1,88 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from difflib import SequenceMatcher
+
+import numpy as np
+
+# Near-duplicate lookup latency as the index grows. The index is filled with synthetic
+# summaries up to each size; queries are half near-copies of indexed summaries (a few words
+# rewritten, as syndicated stories are) and half unseen text. The old pairwise SequenceMatcher
+# scan is timed against a sample and scaled linearly to the full size.
+#   python benchmarks/bench_dedup.py --sizes 10000 100000 1000000
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dedup_index import DedupIndex
+
+WORDS_PER_SUMMARY = 60
+EDITED_WORDS = 5
+
+
+def make_vocabulary(rng, size=20_000):
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    return ["".join(rng.choice(letters, rng.integers(3, 10))) for _ in range(size)]
+
+
+def make_summaries(rng, vocabulary, n):
+    # Zipf-like word frequencies so common words collide the way real text does
+    ranks = np.minimum(rng.zipf(1.3, size=(n, WORDS_PER_SUMMARY)), len(vocabulary)) - 1
+    return [" ".join(vocabulary[i] for i in row) for row in ranks]
+
+
+def near_copy(rng, vocabulary, summary):
+    words = summary.split()
+    for position in rng.choice(len(words), EDITED_WORDS, replace=False):
+        words[position] = vocabulary[rng.integers(len(vocabulary))]
+    return " ".join(words)
+
+
+def pairwise_seconds(query, summaries, threshold=0.8):
+    # The loop is_duplicate_summary used to run against every stored summary
+    start = time.perf_counter()
+    for summary in summaries:
+        if SequenceMatcher(None, query, summary).ratio() > threshold:
+            break
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--pairwise-sample", type=int, default=2000, help="summaries scanned per pairwise query")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    vocabulary = make_vocabulary(rng)
+    index = DedupIndex(os.path.join(tempfile.mkdtemp(), "dedup_index.sqlite"))
+    summaries = []
+
+    print(f"{'rows':>10} {'build s':>9} {'p50 ms':>8} {'p95 ms':>8} {'recall':>7} {'false +':>8} {'pairwise s/lookup':>18}")
+    for size in sorted(args.sizes):
+        start = time.perf_counter()
+        fresh = make_summaries(rng, vocabulary, size - len(summaries))
+        index.add_many([(f"doc-{len(summaries) + k}", "", text) for k, text in enumerate(fresh)])
+        summaries.extend(fresh)
+        build = time.perf_counter() - start
+
+        copies = [near_copy(rng, vocabulary, summaries[i]) for i in rng.integers(len(summaries), size=args.queries // 2)]
+        unseen = make_summaries(rng, vocabulary, args.queries - len(copies))
+        latencies, found, false_positives = [], 0, 0
+        for k, text in enumerate(copies + unseen):
+            start = time.perf_counter()
+            match = index.find("", text)
+            latencies.append(time.perf_counter() - start)
+            if k < len(copies):
+                found += match is not None
+            else:
+                false_positives += match is not None
+
+        sample = summaries[:args.pairwise_sample]
+        per_lookup = np.mean([pairwise_seconds(text, sample) for text in unseen[:5]]) * len(summaries) / len(sample)
+
+        latencies = np.array(latencies) * 1000
+        print(f"{size:>10,} {build:>9.1f} {np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 95):>8.2f} "
+              f"{found / len(copies):>7.1%} {false_positives / len(unseen):>8.1%} {per_lookup:>18.1f}")
@@ -0,0 +1,107 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# Throughput, LLM calls and peak memory of the chunked map-reduce analysis of internal
+# documents, against the stub deployment. Each case (documents x size) runs in a fresh process
+# over freshly written .txt files, so peak RSS shows whether memory stays flat as they grow:
+#   python benchmarks/bench_documents.py --cases 10x0.01 100x0.2 200x1 5x20
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from fixtures import STORY_WORDS
+from stub_openai_server import start_stub_server
+
+
+def write_documents(directory, count, size_mb, seed=0):
+    # Paragraphs of filler prose, written a paragraph at a time
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    for k in range(count):
+        with open(os.path.join(directory, f"Internal_Document_{k}.txt"), "w", encoding="utf-8") as f:
+            written = 0
+            while written < target:
+                paragraph = " ".join(rng.choice(STORY_WORDS) for _ in range(rng.randint(40, 160))) + ".\n\n"
+                written += f.write(paragraph)
+
+
+def run_case(directory):
+    # Runs inside the child process; the environment already points every cache at a scratch dir
+    import aec_agent
+    from document_reader import list_documents
+    from metrics import metrics
+
+    names = list(list_documents(directory))
+    started = metrics.snapshot()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = aec_agent.run_news_insight_agent({}, manual_pages=names)
+    summary = metrics.summary(since=started)
+    return {
+        "rows": len(df),
+        "seconds": time.perf_counter() - start,
+        "peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "chunks": metrics.counter("document_chunks", started),
+        "stages": {stage: s["count"] for stage, s in summary["stages"].items() if stage.startswith("llm")},
+    }
+
+
+def spawn_case(count, size_mb, llm_url, workers):
+    scratch = tempfile.mkdtemp(prefix="aec-docs-")
+    documents = os.path.join(scratch, "documents")
+    os.makedirs(documents)
+    write_documents(documents, count, size_mb)
+    env = dict(os.environ, **{
+        "AZURE_OPENAI_KEY": "stub",
+        "AZURE_OPENAI_ENDPOINT": llm_url,
+        "AZURE_OPENAI_DEPLOYMENT": "stub",
+        "AZURE_OPENAI_TPM": "1000000000",
+        "AZURE_OPENAI_RPM": "10000000",
+        "AEC_MAX_WORKERS": str(workers),
+        "AEC_CACHE_PATH": os.path.join(scratch, "insight_cache.sqlite"),
+        "AEC_FEED_INDEX_PATH": os.path.join(scratch, "feed_index.sqlite"),
+        "AEC_DEDUP_INDEX_PATH": os.path.join(scratch, "dedup_index.sqlite"),
+        "AEC_METRICS_LOG": "",
+        "AEC_METRICS_PROM_PATH": "",
+        # The filler prose repeats itself, so every document would look like a duplicate of the first
+        "AEC_DEDUP": "0",
+    })
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", documents],
+                         env=env, cwd=scratch, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(f"case {count}x{size_mb} failed:\n{out.stderr[-2000:]}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--worker":
+        print(json.dumps(run_case(sys.argv[2]), default=float))
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", nargs="+", default=["10x0.01", "100x0.2", "200x1", "5x20"],
+                        help="DOCUMENTSxMB: number of documents and size of each in MB")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="stub latency per chat completion (s)")
+    args = parser.parse_args()
+
+    llm = start_stub_server(latency=args.llm_latency)
+    llm_url = f"http://127.0.0.1:{llm.server_address[1]}"
+    print(f"{'docs':>6} {'MB/doc':>7} {'rows':>6} {'chunks':>7} {'wall s':>8} {'MB/s':>7} {'LLM calls':>10} {'peak MB':>8}  calls by stage")
+    for case in args.cases:
+        count, size_mb = case.split("x")
+        count, size_mb = int(count), float(size_mb)
+        r = spawn_case(count, size_mb, llm_url, args.workers)
+        calls = sum(r["stages"].values())
+        print(f"{count:>6} {size_mb:>7.2f} {r['rows']:>6} {r['chunks']:>7.0f} {r['seconds']:>8.2f} {count * size_mb / r['seconds']:>7.1f} "
+              f"{calls:>10} {r['peak_mb']:>8.0f}  {r['stages']}")
+    llm.shutdown()
@@ -0,0 +1,99 @@
+import argparse
+import functools
+import http.server
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+import chardet
+import requests
+from bs4 import BeautifulSoup
+
+# Per-article CPU time and peak Python memory of the old whole-page extractor
+# against article_extractor.fetch_article_summary, on heavy pages served locally.
+#   python benchmarks/bench_extraction.py --page-kb 3000
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from article_extractor import fetch_article_summary
+
+
+def legacy_summary(url):
+    # extract_clean_feed_entry before the streaming extractor
+    res = requests.get(url, timeout=10)
+    detected = chardet.detect(res.content)
+    html = res.content.decode(detected["encoding"], errors="replace")
+    soup = BeautifulSoup(html, 'html.parser')
+    paragraphs = soup.find_all('p')
+    return " ".join(p.get_text() for p in paragraphs[:3])
+
+
+def heavy_page(size_kb, encoding, declare):
+    # Typical news page: big inline scripts and navigation up top, the story, then comments and related links
+    meta = f'<meta charset="{encoding}">' if declare else ""
+    script = "<script>" + "var tracking = {'id': 12345, 'name': 'analytics'};\n" * 400 + "</script>"
+    nav = "<ul>" + "".join(f"<li><a href='/section/{i}'>Section {i}</a></li>" for i in range(300)) + "</ul>"
+    story = "".join(
+        f"<p>Paragraph {i}: the city council approved the café district masterplan, "
+        f"with a naïve estimate of €{i}m for façade works and 20 kilómetros of new rail.</p>"
+        for i in range(40)
+    )
+    head = f"<html><head>{meta}<title>Story</title>{script}</head><body>{nav}<article>{story}</article>"
+    filler = "<div class='comment'><span>Reader comment with some text in it</span></div>\n"
+    body = head + filler * max(0, (size_kb * 1024 - len(head)) // len(filler)) + "</body></html>"
+    return body.encode(encoding, errors="replace")
+
+
+def measure(fn, url, repeat):
+    tracemalloc.start()
+    cpu = time.process_time()
+    for _ in range(repeat):
+        result = fn(url)
+    cpu = (time.process_time() - cpu) / repeat
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return cpu, peak, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--page-kb", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = {
+        "utf-8 + meta": heavy_page(args.page_kb, "utf-8", True),
+        "windows-1252, undeclared": heavy_page(args.page_kb, "windows-1252", False),
+        "iso-8859-15 + meta": heavy_page(args.page_kb, "iso-8859-15", True),
+    }
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            body = pages[list(pages)[int(self.path.strip("/"))]]
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print(f"{'page':<28} {'extractor':<10} {'cpu ms':>9} {'peak MB':>9}  same text")
+    for i, name in enumerate(pages):
+        url = f"{base}/{i}"
+        old_cpu, old_peak, old_text = measure(legacy_summary, url, args.repeat)
+        new_cpu, new_peak, new_text = measure(functools.partial(fetch_article_summary, timeout=10), url, args.repeat)
+        print(f"{name:<28} {'legacy':<10} {old_cpu * 1000:>9.1f} {old_peak / 2**20:>9.1f}")
+        print(f"{'':<28} {'streaming':<10} {new_cpu * 1000:>9.1f} {new_peak / 2**20:>9.1f}  {old_text.strip() == new_text.strip()}")
+
+    server.shutdown()
@@ -0,0 +1,135 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+# Memory and dashboard filter/groupby time of the insight frame as load_insights used to build it
+# (every column as text, raw_insight included) against the typed frame from insight_frame.py
+# (categoricals, ordered Signal Strength, raw_insight left on disk). "object" is the old frame
+# with Python string objects, as pandas < 3 loads text. Each mode loads in a fresh process so
+# peak RSS is its own:
+#   python benchmarks/bench_insight_frame.py --sizes 100000 1000000
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+MODES = ["before", "object", "typed"]
+
+
+def make_rows(rng, answers, n, offset):
+    from fixtures import markdown_insight
+    from insight_parser import INSIGHT_FIELDS
+
+    picks = rng.integers(len(answers), size=n)
+    df = pd.DataFrame({
+        "Source": [f"Feed {k}" for k in rng.integers(25, size=n)],
+        "Title": [f"Article {offset + i} on {answers[p]['sector']} work" for i, p in enumerate(picks)],
+        "URL": [f"https://bench.example/{offset + i}" for i in range(n)],
+        "raw_insight": [markdown_insight(answers[p]) for p in picks],
+    })
+    for column, key in INSIGHT_FIELDS.items():
+        df[column] = [answers[p][key] for p in picks]
+    # Free text is unique per article, enumerated fields repeat
+    df["Summary"] = df["Summary"] + [f" (story {offset + i})" for i in range(n)]
+    df["Entity Involved"] = [f"Entity {k}" for k in rng.integers(5_000, size=n)]
+    return df
+
+
+def build_store(root, rows, part_rows=20_000):
+    from fixtures import synthetic_responses
+    from gazetteer import normalize_frame
+    from insight_store import InsightStore, LocalBackend
+
+    rng = np.random.default_rng(0)
+    answers = synthetic_responses(n=500)
+    store = InsightStore(LocalBackend(root))
+    for offset in range(0, rows, part_rows):
+        part = make_rows(rng, answers, min(part_rows, rows - offset), offset)
+        store.append(normalize_frame(part), ingest_date=f"2025-01-{offset // part_rows % 28 + 1:02d}")
+
+
+def best_of(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def run_mode(mode, root):
+    # Runs inside the child process
+    from gazetteer import normalize_frame
+    from insight_frame import read_insight_frame
+    from insight_store import InsightStore, LocalBackend
+
+    store = InsightStore(LocalBackend(root))
+    start = time.perf_counter()
+    if mode == "typed":
+        df = read_insight_frame(store)
+    else:
+        df = normalize_frame(store.read())
+        if mode == "object":
+            df = df.astype({column: object for column in df.columns if df[column].dtype == "str"})
+    load = time.perf_counter() - start
+
+    sectors, categories = ["Transport", "Energy"], ["Project Win", "Early Market Signal"]
+
+    def filters():
+        # The sidebar filters as one mask, as the page applies them
+        return df[df["Sector"].isin(sectors) & df["Category"].isin(categories) & df["Signal Strength"].isin(["High"])]
+
+    def kpis():
+        return (df["Signal Strength"] == "High").sum(), df["Entity ID"].nunique()
+
+    def groupbys():
+        return (df.groupby(["Sector", "Country Name"], observed=True).size(),
+                df.groupby("Category", observed=True)["Signal Strength"].value_counts())
+
+    return {
+        "rows": len(df),
+        "load_s": load,
+        "frame_mb": df.memory_usage(deep=True).sum() / 1e6,
+        "peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "filter_ms": best_of(filters),
+        "kpi_ms": best_of(kpis),
+        "groupby_ms": best_of(groupbys),
+    }
+
+
+def spawn_mode(mode, root):
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", mode, root],
+                         capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(f"{mode} failed:\n{out.stderr[-2000:]}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--worker":
+        print(json.dumps(run_mode(sys.argv[2], sys.argv[3]), default=float))
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="aec-frame-")
+    print(f"{'rows':>9} {'mode':>7} {'load s':>7} {'frame MB':>9} {'peak MB':>8} {'filter ms':>10} {'kpi ms':>7} {'groupby ms':>11}")
+    for size in args.sizes:
+        root = os.path.join(tmp, f"store-{size}")
+        start = time.perf_counter()
+        build_store(root, size)
+        print(f"📦 wrote {size} rows in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        for mode in args.modes:
+            r = spawn_mode(mode, root)
+            print(f"{r['rows']:>9} {mode:>7} {r['load_s']:>7.2f} {r['frame_mb']:>9.0f} {r['peak_mb']:>8.0f} "
+                  f"{r['filter_ms']:>10.1f} {r['kpi_ms']:>7.1f} {r['groupby_ms']:>11.1f}")
@@ -0,0 +1,65 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+import pandas as pd
+
+# Parse throughput over stored raw_insight text: the old per-line regex loop,
+# insight_parser.parse_insight row by row, and the vectorized parse_insights_bulk.
+#   python benchmarks/bench_parsing.py --rows 100000
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from insight_parser import normalize_signal_strength, parse_insight, parse_insights_bulk
+from stub_openai_server import CANNED_FIELDS, CANNED_INSIGHT
+
+
+def legacy_parse(insight):
+    # The loop that used to be copied into aec_agent.py and streamlit_dashboard.py
+    parsed_fields = {}
+    for line in insight.splitlines():
+        match = re.match(r"\d+\.\s+\*\*(.*?)\*\*:\s*(.*)", line)
+        if match:
+            key, value = match.groups()
+            key = key.strip()
+            if value.endswith('.'):
+                value = value[:-1]
+            if key == "Signal Strength":
+                value = normalize_signal_strength(value)
+            parsed_fields[key] = value.strip()
+    return parsed_fields
+
+
+def make_insights(n, json_share):
+    variants = [
+        CANNED_INSIGHT,
+        CANNED_INSIGHT.replace("**: ", ":** ").replace("High", "high."),
+        CANNED_INSIGHT.replace("City**: Singapore", "City**: Jurong East"),
+    ]
+    stored = json.dumps(CANNED_FIELDS)
+    every = int(1 / json_share) if json_share else 0
+    return pd.Series([stored if every and i % every == 0 else variants[i % len(variants)] for i in range(n)])
+
+
+def timed(label, fn, n):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:>8.2f}s {n / elapsed:>12,.0f} rows/s")
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--json-share", type=float, default=0.0, help="fraction of rows stored as JSON output")
+    args = parser.parse_args()
+
+    raw = make_insights(args.rows, args.json_share)
+    print(f"{args.rows:,} stored insights ({args.json_share:.0%} JSON)")
+    timed("legacy per-line loop", lambda: [legacy_parse(text) for text in raw], args.rows)
+    timed("parse_insight per row", lambda: [parse_insight(text) for text in raw], args.rows)
+    timed("parse_insights_bulk", lambda: parse_insights_bulk(raw), args.rows)
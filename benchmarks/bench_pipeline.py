@@ -0,0 +1,149 @@
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# End-to-end throughput, per-stage latency and peak memory of the ingestion pipeline and
+# the dashboard, replayed from fixtures so runs are reproducible and nothing is billed:
+#   python benchmarks/bench_pipeline.py --scales 25 250 2500 50000 --json bench.json
+# Feeds, article pages (in several encodings) and chat answers come from benchmarks/fixtures.py,
+# synthetic by default or recorded with `fixtures.py record`. Each scale runs the real
+# run_news_insight_agent (and so extract_clean_feed_entry) in a fresh process with empty
+# caches, then renders streamlit_dashboard.py over the resulting insights.
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from fixtures import load_fixtures, start_replay_llm, start_replay_server, synthetic_fixtures
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_scale(feed_urls, per_feed, batch_size, dashboard):
+    # Runs inside the child process; the environment already points every cache at a scratch dir
+    import aec_agent
+    from metrics import metrics
+
+    started = metrics.snapshot()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = aec_agent.run_news_insight_agent(feed_urls, max_per_feed=per_feed, batch_size=batch_size)
+    result = {
+        "rows": len(df),
+        "pipeline_seconds": time.perf_counter() - start,
+        "pipeline_peak_mb": peak_rss_mb(),
+        **metrics.summary(since=started),
+    }
+
+    if dashboard and not df.empty:
+        from streamlit.testing.v1 import AppTest
+
+        from insight_store import get_insight_store
+        get_insight_store().append(df)
+        app = AppTest.from_file(os.path.join(os.path.dirname(BENCH_DIR), "streamlit_dashboard.py"), default_timeout=3600)
+        start = time.perf_counter()
+        app.run()
+        result["dashboard_seconds"] = time.perf_counter() - start
+        result["dashboard_peak_mb"] = peak_rss_mb()
+        result["dashboard_errors"] = [str(e.value) for e in app.exception]
+    return result
+
+
+def spawn_scale(args, articles, feed_urls, llm_url):
+    scratch = tempfile.mkdtemp(prefix="aec-bench-")
+    env = dict(os.environ, **{
+        "AZURE_OPENAI_KEY": "stub",
+        "AZURE_OPENAI_ENDPOINT": llm_url,
+        "AZURE_OPENAI_DEPLOYMENT": "stub",
+        "AZURE_OPENAI_TPM": "1000000000",
+        "AZURE_OPENAI_RPM": "10000000",
+        # Every replayed site is the same local server; per-site politeness would only measure sleep
+        "AEC_HOST_DELAY": str(args.host_delay),
+        "AEC_MAX_PER_HOST": str(args.workers),
+        "AEC_MAX_WORKERS": str(args.workers),
+        "AEC_MAX_LLM_CONCURRENCY": str(args.llm_concurrency),
+        "AEC_CACHE_PATH": os.path.join(scratch, "insight_cache.sqlite"),
+        "AEC_FEED_INDEX_PATH": os.path.join(scratch, "feed_index.sqlite"),
+        "AEC_DEDUP_INDEX_PATH": os.path.join(scratch, "dedup_index.sqlite"),
+        "AEC_JOBS_PATH": os.path.join(scratch, "jobs.sqlite"),
+        "AEC_STORE_BACKEND": "local",
+        "AEC_STORE_DIR": os.path.join(scratch, "insight_store"),
+        "AEC_METRICS_LOG": "",
+        "AEC_METRICS_PROM_PATH": "",
+    })
+    job = {"feeds": feed_urls, "per_feed": math.ceil(articles / len(feed_urls)),
+           "batch_size": args.batch_size, "dashboard": not args.no_dashboard}
+    # The chart rollups and search index are not pointed at scratch; they default to .cache/ under the working directory
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", json.dumps(job)],
+                         env=env, cwd=scratch, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(f"scale {articles} failed:\n{out.stderr[-2000:]}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def print_results(results):
+    print(f"{'articles':>9} {'rows':>7} {'wall s':>8} {'art/s':>8} {'peak MB':>8} {'dash s':>8} {'dash MB':>8} {'$/article':>10}")
+    for articles, r in results.items():
+        print(f"{articles:>9} {r['rows']:>7} {r['pipeline_seconds']:>8.2f} {r['rows'] / r['pipeline_seconds']:>8.1f} "
+              f"{r['pipeline_peak_mb']:>8.0f} {r.get('dashboard_seconds', float('nan')):>8.2f} "
+              f"{r.get('dashboard_peak_mb', float('nan')):>8.0f} {r['cost_per_article_usd']:>10.5f}")
+        for error in r.get("dashboard_errors", []):
+            print(f"  ❌ dashboard: {error}")
+
+    stages = sorted({stage for r in results.values() for stage in r["stages"]})
+    print(f"\n{'stage p50/p95 ms':<18}" + "".join(f"{articles:>18}" for articles in results))
+    for stage in stages:
+        cells = []
+        for r in results.values():
+            s = r["stages"].get(stage)
+            cells.append(f"{s['p50'] * 1000:.2f}/{s['p95'] * 1000:.2f}" if s else "-")
+        print(f"{stage:<18}" + "".join(f"{cell:>18}" for cell in cells))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--worker":
+        job = json.loads(sys.argv[2])
+        result = run_scale(job["feeds"], job["per_feed"], job["batch_size"], job["dashboard"])
+        print(json.dumps(result, default=float))
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", type=int, nargs="+", default=[25, 250, 2500])
+    parser.add_argument("--fixtures", help="recorded fixture directory (default: synthetic pages and answers)")
+    parser.add_argument("--feeds", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--llm-concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="stub base latency per chat completion (s)")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="stub latency per completion token (s)")
+    parser.add_argument("--page-latency", type=float, default=0.0, help="replay latency per feed or page request (s)")
+    parser.add_argument("--host-delay", type=float, default=0.0, help="AEC_HOST_DELAY for the run")
+    parser.add_argument("--no-dashboard", action="store_true")
+    parser.add_argument("--json", help="also write the results here, for comparing runs")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures) if args.fixtures else synthetic_fixtures()
+    llm = start_replay_llm(fixtures, args.llm_latency, args.token_latency)
+    llm_url = f"http://127.0.0.1:{llm.server_address[1]}"
+
+    results = {}
+    for articles in args.scales:
+        replay = start_replay_server(fixtures, args.feeds, math.ceil(articles / args.feeds), args.page_latency)
+        results[articles] = spawn_scale(args, articles, replay.feed_urls, llm_url)
+        replay.shutdown()
+        print(f"✅ {articles} articles in {results[articles]['pipeline_seconds']:.1f}s", file=sys.stderr)
+
+    print_results(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2, default=float)
+    llm.shutdown()
@@ -0,0 +1,107 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+# Time to build the dashboard's chart frames (location bar, geo scatter, sector pie and
+# regulatory bar) and the word cloud frequencies from the full insight DataFrame, as every
+# rerun used to, against the grouped queries over insight_rollups. The charts are timed
+# unfiltered and with a sector filter.
+#   python benchmarks/bench_rollups.py --sizes 10000 100000 500000
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from insight_rollups import InsightRollups
+
+SECTORS = ["Transport", "Healthcare", "Energy", "Residential", "Education", "Water", "Commercial", "Hospitality"]
+CATEGORIES = ["Project Win", "Strategic Movement", "Competitor Activity", "Policy/Regulatory Update", "Early Market Signal"]
+SIGNALS = ["High", "Medium", "Low"]
+PRIORITIES = (
+    "decarbonisation resilience modular delivery digital twins net-zero retrofit affordability "
+    "public-private partnership rail capacity healthcare demand water security smart mobility"
+).split()
+
+
+def make_insights(rng, n, cities=400):
+    city = rng.integers(cities, size=n)
+    return pd.DataFrame({
+        "Sector": np.array(SECTORS, dtype=object)[rng.integers(len(SECTORS), size=n)],
+        "Category": np.array(CATEGORIES, dtype=object)[rng.integers(len(CATEGORIES), size=n)],
+        "Signal Strength": np.array(SIGNALS, dtype=object)[rng.integers(len(SIGNALS), size=n)],
+        "Source Type": np.where(rng.random(n) < 0.05, "Internal", "External").astype(object),
+        "City": [f"City {c}" for c in city],
+        "Country": [f"Country {c % 60}" for c in city],
+        "Strategic Insight Summary": [
+            "Signals demand for " + ", ".join(PRIORITIES[k] for k in row) + "."
+            for row in rng.integers(len(PRIORITIES), size=(n, 4))
+        ],
+    })
+
+
+def dataframe_charts(df, sectors):
+    # The per-rerun aggregation streamlit_dashboard.py did before the rollups
+    filtered_df = df[df["Sector"].isin(sectors)] if sectors else df.copy()
+    filtered_df["Location"] = filtered_df["City"].fillna("Unknown") + ", " + filtered_df["Country"].fillna("Unknown")
+    location_data = filtered_df[filtered_df["Location"] != "Unknown, Unknown"]
+    location_counts = location_data["Location"].value_counts().reset_index()
+    location_data["Signal Score"] = location_data["Signal Strength"].map({"Low": 2, "Medium": 5, "High": 10}).fillna(8)
+    sectors = filtered_df["Sector"].value_counts()
+    regulatory_df = filtered_df[(filtered_df["Category"] == "Policy/Regulatory Update") & (filtered_df["Source Type"] != "Internal")]
+    return location_counts, location_data, sectors, regulatory_df["Sector"].value_counts()
+
+
+def dataframe_words(df):
+    text = " ".join(df["Strategic Insight Summary"].dropna()).lower()
+    return Counter(word for word in text.split() if word not in {"for", "signals"})
+
+
+def rollup_charts(rollups, sectors):
+    filters = {"Sector": sectors}
+    return (
+        rollups.location_counts(filters),
+        rollups.geo_points(filters),
+        rollups.counts(["Sector"], filters),
+        rollups.counts(["Sector"], {**filters, "Category": ["Policy/Regulatory Update"]}, exclude={"Source Type": ["Internal"]}),
+    )
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 500_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    tmp = tempfile.mkdtemp()
+    print(f"{'insights':>9} {'rollup rows':>12} {'append ms':>10} {'pandas ms':>10} {'rollup ms':>10} {'filtered pandas':>16} {'filtered rollup':>16} {'words pandas':>13} {'words rollup':>13}")
+    for size in args.sizes:
+        df = make_insights(rng, size)
+        rollups = InsightRollups(os.path.join(tmp, f"rollups-{size}.sqlite"))
+        # Insights arrive as part files of a few hundred rows; the last one is timed
+        for start in range(0, size, 5_000):
+            rollups.add(df.iloc[start:start + 5_000], part=f"part-{start}")
+        append = best_of(lambda: rollups.add(df.iloc[:500]), 1)
+
+        distinct = rollups.conn.execute("SELECT COUNT(*) FROM rollups").fetchone()[0]
+        full_df = best_of(lambda: dataframe_charts(df, []), args.repeat)
+        full_rollup = best_of(lambda: rollup_charts(rollups, []), args.repeat)
+        some_df = best_of(lambda: dataframe_charts(df, SECTORS[:2]), args.repeat)
+        some_rollup = best_of(lambda: rollup_charts(rollups, SECTORS[:2]), args.repeat)
+        words_df = best_of(lambda: dataframe_words(df), args.repeat)
+        words_rollup = best_of(lambda: rollups.word_counts({}, {"for", "signals"}), args.repeat)
+        print(f"{size:>9} {distinct:>12} {append * 1000:>10.1f} {full_df * 1000:>10.1f} {full_rollup * 1000:>10.1f} "
+              f"{some_df * 1000:>16.1f} {some_rollup * 1000:>16.1f} {words_df * 1000:>13.1f} {words_rollup * 1000:>13.1f}")
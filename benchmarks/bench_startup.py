@@ -0,0 +1,108 @@
+import argparse
+import ast
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Cold-start cost of the dashboard, the agent and the storage layer, each imported in a fresh
+# interpreter under python -X importtime with no Azure credentials set. Reports wall time,
+# time spent importing, the heaviest packages pulled in and which optional heavy dependencies
+# were loaded at import rather than on first use:
+#   python benchmarks/bench_startup.py --repeat 5
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+MARKER = "-- bench_startup --"
+
+# Packages that should only load when a feature needs them
+WATCHED = ["openai", "azure.storage.blob", "wordcloud", "matplotlib", "feedparser", "newspaper", "bs4"]
+
+
+def dashboard_imports():
+    # The page itself runs on import, so only its import statements are timed
+    tree = ast.parse(open(os.path.join(REPO_DIR, "streamlit_dashboard.py"), encoding="utf-8").read())
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+TARGETS = {
+    "dashboard": dashboard_imports(),
+    "agent": "import aec_agent",
+    "storage": "import azure_storage\nimport insight_store",
+    "scheduler": "import scheduler",
+}
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def child_code(code):
+    return "\n".join([
+        "import json, sys",
+        f"sys.path.insert(0, {REPO_DIR!r})",
+        f"sys.stderr.write({MARKER!r} + '\\n')",
+        code,
+        f"print(json.dumps([name for name in {WATCHED!r} if name in sys.modules]))",
+    ])
+
+
+def parse_importtime(stderr):
+    # (self us, cumulative us, depth, module) of every import after the marker
+    rows = []
+    for line in stderr.split(MARKER, 1)[-1].splitlines():
+        match = _IMPORTTIME.match(line)
+        if match:
+            rows.append((int(match.group(1)), int(match.group(2)), len(match.group(3)) // 2, match.group(4)))
+    return rows
+
+
+def heaviest(rows, n=3):
+    # Third-party packages by the import time of all their modules together
+    packages = {}
+    for own, _, _, module in rows:
+        package = module.split(".")[0]
+        if not package.startswith("_") and not os.path.exists(os.path.join(REPO_DIR, package + ".py")):
+            packages[package] = packages.get(package, 0) + own
+    return sorted(packages.items(), key=lambda item: -item[1])[:n]
+
+
+def run_target(code, env, cwd):
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", child_code(code)],
+                         env=env, cwd=cwd, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1])
+    rows = parse_importtime(out.stderr)
+    imported = sum(cumulative for _, cumulative, depth, _ in rows if depth == 0)
+    return wall, imported / 1e6, rows, json.loads(out.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--targets", nargs="+", default=list(TARGETS), choices=list(TARGETS))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # Empty credentials: importing must neither need them nor reach the network
+    env = dict(os.environ, AZURE_OPENAI_KEY="", AZURE_OPENAI_ENDPOINT="", AZURE_STORAGE_CONNECTION_STRING="",
+               AEC_METRICS_LOG="", AEC_METRICS_PROM_PATH="")
+    cwd = tempfile.mkdtemp(prefix="aec-startup-")
+    baseline = np.median([run_target("pass", env, cwd)[0] for _ in range(args.repeat)])
+    print(f"interpreter start: {baseline * 1000:.0f} ms")
+    print(f"{'target':>10} {'wall ms':>8} {'import ms':>10} {'modules':>8}  {'heaviest packages':<45} loaded at import")
+    for target in args.targets:
+        try:
+            runs = [run_target(TARGETS[target], env, cwd) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"{target:>10} failed: {e}")
+            continue
+        wall = np.median([run[0] for run in runs]) * 1000
+        imported = np.median([run[1] for run in runs]) * 1000
+        rows, loaded = runs[-1][2], runs[-1][3]
+        packages = ", ".join(f"{name} {us / 1000:.0f}" for name, us in heaviest(rows))
+        print(f"{target:>10} {wall:>8.0f} {imported:>10.0f} {len(rows):>8}  {packages:<45} {', '.join(loaded) or '-'}")
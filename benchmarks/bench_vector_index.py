@@ -0,0 +1,84 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+# Build time, query latency (p50/p95, embedding included) and recall@10 of vector_index.py over
+# synthetic insights, with the exact backend and with IVF clustering. Uses the local hashing
+# embedder, so nothing is billed and the timings are the index's own:
+#   python benchmarks/bench_vector_index.py --sizes 10000 100000 300000
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from fixtures import CITIES, PRIORITIES, SECTORS, STORY_WORDS
+from vector_index import HashingEmbedder, VectorIndex
+
+QUERIES = [
+    "data centre cooling in Southeast Asia", "hospital wing design contract", "rail capacity and smart mobility",
+    "net zero retrofit of public housing", "water security and flood defence", "airport terminal expansion tender",
+    "solar farm and district heating", "public-private partnership for a metro line",
+]
+
+
+def make_insights(rng, n, offset=0):
+    story = np.array(STORY_WORDS, dtype=object)
+    priorities = np.array(PRIORITIES, dtype=object)
+    cities = rng.integers(len(CITIES), size=n)
+    sectors = rng.integers(len(SECTORS), size=n)
+    return pd.DataFrame({
+        "URL": [f"https://bench.example/{offset + i}" for i in range(n)],
+        "Source": "Bench",
+        "Summary": [
+            f"{SECTORS[s]} {' '.join(story[rng.integers(len(story), size=12)])} in {CITIES[c][0]}, {CITIES[c][1]}"
+            for s, c in zip(sectors, cities)
+        ],
+        "Strategic Insight Summary": [
+            "Signals demand for " + " and ".join(priorities[rng.integers(len(priorities), size=3)]) for _ in range(n)
+        ],
+    })
+
+
+def latencies(index, queries):
+    times = []
+    for query in queries:
+        index.query_vector.cache_clear()
+        start = time.perf_counter()
+        index.search(query, k=10)
+        times.append(time.perf_counter() - start)
+    return np.percentile(times, 50) * 1000, np.percentile(times, 95) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--nprobe", type=int, default=32)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    tmp = tempfile.mkdtemp()
+    queries = [QUERIES[i % len(QUERIES)] + f" {STORY_WORDS[i % len(STORY_WORDS)]}" for i in range(args.queries)]
+    print(f"{'insights':>9} {'build s':>8} {'exact p50':>10} {'exact p95':>10} {'train s':>8} {'ivf p50':>8} {'ivf p95':>8} {'recall@10':>10}")
+    for size in args.sizes:
+        path = os.path.join(tmp, f"vectors-{size}.sqlite")
+        exact = VectorIndex(path, embedder=HashingEmbedder(), backend="exact")
+        start = time.perf_counter()
+        for offset in range(0, size, 5_000):
+            exact.add(make_insights(rng, min(5_000, size - offset), offset), part=f"part-{offset}")
+        build = time.perf_counter() - start
+        exact_p50, exact_p95 = latencies(exact, queries)
+
+        ivf = VectorIndex(path, embedder=HashingEmbedder(), backend="ivf", nprobe=args.nprobe)
+        start = time.perf_counter()
+        ivf.train()
+        train = time.perf_counter() - start
+        ivf_p50, ivf_p95 = latencies(ivf, queries)
+
+        # Synthetic texts tie a lot, so a hit is any IVF result scoring at least the exact 10th best
+        hits = [(ivf.search(q)["Score"] >= exact.search(q)["Score"].iloc[-1] - 1e-6).sum() / 10 for q in queries[:50]]
+        print(f"{size:>9} {build:>8.1f} {exact_p50:>10.2f} {exact_p95:>10.2f} {train:>8.1f} {ivf_p50:>8.2f} {ivf_p95:>8.2f} {np.mean(hits):>10.2f}")
@@ -0,0 +1,297 @@
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+# Replayable fixtures for the offline benchmarks: article page templates (as served,
+# with their Content-Type and encoding) and chat-completion answers. A fixture set is
+# either synthetic (the default) or recorded once from the live feeds:
+#   python benchmarks/fixtures.py record .cache/fixtures --per-feed 10 --responses
+# Replay serves any number of feed items from a handful of templates: each article page is
+# a template with its own story paragraphs spliced in before the first <p>, so pages keep
+# their real size, markup and encoding while every article stays distinct for dedup and caching.
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_openai_server import make_handler, StubState
+
+STORY_WORDS = (
+    "council approved the masterplan for a new metro line hospital wing timber tower rail depot "
+    "airport terminal water treatment plant solar farm district heating school campus bridge "
+    "retrofit façade café naïve €120m contract tender award consultancy design engineering works "
+    "kilómetros résidence stadium port expansion housing estate flood defence data centre"
+).split()
+
+CITIES = [
+    ("Singapore", "Singapore"), ("Sydney", "Australia"), ("London", "United Kingdom"), ("Dubai", "United Arab Emirates"),
+    ("Riyadh", "Saudi Arabia"), ("Toronto", "Canada"), ("Auckland", "New Zealand"), ("Jakarta", "Indonesia"),
+    ("Nairobi", "Kenya"), ("Manila", "Philippines"), ("Melbourne", "Australia"), ("Doha", "Qatar"),
+]
+SECTORS = ["Transport", "Healthcare", "Energy", "Residential", "Education", "Water", "Commercial", "Hospitality"]
+CATEGORIES = ["Project Win", "Strategic Movement", "Competitor Activity", "Policy/Regulatory Update", "Early Market Signal"]
+STATUSES = ["Ongoing", "Planned", "Announced", "Approved", "Under Construction", "Completed"]
+SIGNALS = ["High", "Medium", "Low"]
+PRIORITIES = (
+    "decarbonisation resilience modular delivery digital twins net zero retrofit affordability "
+    "public-private partnership rail capacity healthcare demand water security smart mobility"
+).split()
+
+# Content types and page encodings exercised by the synthetic set: declared in the header,
+# declared only in <meta>, and undeclared (left to the UTF-8/cp1252 fallback)
+SYNTHETIC_PAGES = [
+    ("utf-8", "text/html; charset=utf-8", True, 40),
+    ("windows-1252", "text/html", False, 120),
+    ("iso-8859-15", "text/html", True, 300),
+    ("utf-8", "text/html", False, 80),
+    ("latin-1", "text/html; charset=ISO-8859-1", False, 600),
+]
+
+MARKDOWN_LABELS = [
+    ("summary", "Summary"), ("source_type", "Source Type"), ("is_relevant", "Is this relevant to the AEC industry?"),
+    ("category", "Category"), ("entity_involved", "Entity Involved"), ("city", "City"), ("country", "Country"),
+    ("sector", "Sector"), ("project_or_initiative_name", "Project or Initiative Name"), ("project_status", "Project Status"),
+    ("strategic_insight_summary", "Strategic Insight Summary"), ("signal_strength", "Signal Strength"),
+    ("action_recommendation", "Action Recommendation"),
+]
+
+
+class Page:
+    def __init__(self, body, content_type, encoding, title):
+        self.body = body
+        self.content_type = content_type
+        self.encoding = encoding
+        self.title = title
+        match = re.search(rb"<p[\s>]", body, re.I) or re.search(rb"</body", body, re.I)
+        self.story_at = match.start() if match else len(body)
+
+    def render(self, story):
+        return self.body[:self.story_at] + story.encode(self.encoding, errors="xmlcharrefreplace") + self.body[self.story_at:]
+
+
+class FixtureSet:
+    def __init__(self, pages, responses):
+        self.pages = pages
+        self.responses = responses
+
+
+def story_html(feed, item, paragraphs=3, words=60):
+    rng = random.Random(f"{feed}-{item}")
+    return "".join(f"<p>{' '.join(rng.choice(STORY_WORDS) for _ in range(words))}</p>" for _ in range(paragraphs))
+
+
+def synthetic_page(encoding, content_type, declare, size_kb, title):
+    # A news page: inline scripts and navigation up top, the story slot, then comments
+    meta = f'<meta charset="{encoding}">' if declare else ""
+    script = "<script>" + "var tracking = {'id': 12345, 'name': 'analytics'};\n" * 40 + "</script>"
+    nav = "<ul>" + "".join(f"<li><a href='/section/{i}'>Section {i}</a></li>" for i in range(60)) + "</ul>"
+    head = f"<html><head>{meta}<title>{title}</title>{script}</head><body>{nav}<article><h1>{title}</h1>"
+    comment = "<div class='comment'><span>Reader comment on the café district façade works</span></div>\n"
+    tail = "</article>" + comment * max(0, (size_kb * 1024 - len(head)) // len(comment)) + "</body></html>"
+    return Page((head + tail).encode(encoding, errors="xmlcharrefreplace"), content_type, encoding, title)
+
+
+def synthetic_responses(n=60, seed=7):
+    rng = random.Random(seed)
+    responses = []
+    for i in range(n):
+        city, country = rng.choice(CITIES)
+        sector = rng.choice(SECTORS)
+        responses.append({
+            "is_relevant": "Yes",
+            "summary": f"A {sector.lower()} project in {city} has moved forward with a new design contract",
+            "source_type": "External",
+            "category": rng.choice(CATEGORIES),
+            "entity_involved": f"{city} {rng.choice(['Authority', 'Council', 'Holdings', 'Partners'])}",
+            "city": city,
+            "country": country,
+            "sector": sector,
+            "project_or_initiative_name": f"{city} {sector} Programme {i}",
+            "project_status": rng.choice(STATUSES),
+            "strategic_insight_summary": "Signals demand for " + " and ".join(rng.sample(PRIORITIES, 3)),
+            "signal_strength": rng.choice(SIGNALS),
+            "action_recommendation": f"Engage the {sector.lower()} team on early design packages",
+        })
+    return responses
+
+
+def synthetic_fixtures():
+    pages = [synthetic_page(encoding, content_type, declare, size_kb, f"Replay page {i}")
+             for i, (encoding, content_type, declare, size_kb) in enumerate(SYNTHETIC_PAGES)]
+    return FixtureSet(pages, synthetic_responses())
+
+
+def load_fixtures(path):
+    with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    pages = []
+    for page in manifest["pages"]:
+        with open(os.path.join(path, "pages", page["file"]), "rb") as f:
+            pages.append(Page(f.read(), page["content_type"], page["encoding"], page["title"]))
+    responses = synthetic_responses()
+    responses_path = os.path.join(path, "responses.jsonl")
+    if os.path.exists(responses_path):
+        with open(responses_path, encoding="utf-8") as f:
+            responses = [json.loads(line) for line in f if line.strip()] or responses
+    return FixtureSet(pages, responses)
+
+
+def record_fixtures(path, feeds, per_feed=10, responses=False):
+    # Downloads the live feeds' article pages once, byte for byte, for later replay.
+    # With responses=True each page is also analysed by the configured deployment
+    import feedparser
+
+    from article_extractor import detect_encoding, extract_paragraphs
+    from http_client import http_client
+
+    os.makedirs(os.path.join(path, "pages"), exist_ok=True)
+    manifest, answers = {"pages": []}, []
+    for source, url in feeds.items():
+        try:
+            entries = feedparser.parse(http_client.get(url, timeout=10).content).entries[:per_feed]
+        except Exception as e:
+            print(f"❌ Failed to record feed {source}: {e}")
+            continue
+        for entry in entries:
+            try:
+                res = http_client.get(entry.link, timeout=10)
+                res.raise_for_status()
+            except Exception as e:
+                print(f"❌ Failed to record {entry.link}: {e}")
+                continue
+            content_type = res.headers.get("Content-Type", "text/html")
+            encoding = detect_encoding(content_type, res.content) or "utf-8"
+            name = f"{len(manifest['pages'])}.html"
+            with open(os.path.join(path, "pages", name), "wb") as f:
+                f.write(res.content)
+            manifest["pages"].append({"file": name, "content_type": content_type, "encoding": encoding,
+                                      "title": entry.title, "source": source, "url": entry.link})
+            if responses:
+                import aec_agent
+                summary = " ".join(extract_paragraphs([res.content], content_type))
+                answer = aec_agent.ultimate_aec_market_intelligence_prompt(entry.title, summary, use_cache=False, structured=True)
+                answers.append(json.loads(answer))
+            print(f"📼 {source}: {entry.title}")
+
+    with open(os.path.join(path, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    if answers:
+        with open(os.path.join(path, "responses.jsonl"), "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(answer) + "\n" for answer in answers)
+    return len(manifest["pages"])
+
+
+def markdown_insight(fields):
+    return "\n".join(f"{i}. **{label}**: {fields.get(key, '')}" for i, (key, label) in enumerate(MARKDOWN_LABELS, 1))
+
+
+def make_responder(responses):
+    # Same protocol as stub_openai_server.respond, with the answer picked per article from the fixture set
+    def respond(request):
+        content = request.get("messages", [{}])[-1].get("content") or ""
+        pick = lambda k: responses[(zlib.crc32(content.encode()) + k) % len(responses)]
+        numbers = [int(k) for k in re.findall(r"^### Article (\d+)", content, flags=re.M)]
+        if (request.get("response_format") or {}).get("type") == "json_object":
+            if numbers:
+                return json.dumps({"articles": [{"article": k, **pick(k)} for k in numbers]})
+            return json.dumps(pick(0))
+        if numbers:
+            return "\n\n".join(f"### Article {k}\n{markdown_insight(pick(k))}" for k in numbers)
+        return markdown_insight(pick(0))
+
+    return respond
+
+
+class ReplayState:
+    def __init__(self, fixtures, feeds, per_feed, latency=0.0):
+        self.fixtures = fixtures
+        self.feeds = feeds
+        self.per_feed = per_feed
+        self.latency = latency
+
+    def page(self, feed, item):
+        return self.fixtures.pages[(feed * self.per_feed + item) % len(self.fixtures.pages)]
+
+    def feed_xml(self, feed, base_url):
+        items = "".join(
+            f"<item><title>{escape(self.page(feed, i).title)} ({feed}-{i})</title>"
+            f"<link>{base_url}/articles/{feed}/{i}.html</link><guid>replay-{feed}-{i}</guid>"
+            f"<description>Replayed article {feed}-{i}</description></item>"
+            for i in range(self.per_feed)
+        )
+        return f'<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel><title>Replay feed {feed}</title>{items}</channel></rss>'
+
+
+def make_replay_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body=b"", content_type="text/html"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def do_GET(self):
+            if state.latency:
+                time.sleep(state.latency)
+            parts = self.path.split("?")[0].strip("/").split("/")
+            try:
+                if parts[0] == "feeds" and len(parts) == 2:
+                    body = state.feed_xml(int(parts[1].removesuffix(".xml")), f"http://{self.headers.get('Host')}")
+                    self._send(200, body.encode(), "application/rss+xml; charset=utf-8")
+                elif parts[0] == "articles" and len(parts) == 3:
+                    feed, item = int(parts[1]), int(parts[2].removesuffix(".html"))
+                    page = state.page(feed, item)
+                    self._send(200, page.render(story_html(feed, item)), page.content_type)
+                else:
+                    self._send(404)
+            except (ValueError, IndexError):
+                self._send(404)
+
+    return Handler
+
+
+def start_replay_server(fixtures, feeds=5, per_feed=5, latency=0.0):
+    state = ReplayState(fixtures, feeds, per_feed, latency)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_replay_handler(state))
+    server.daemon_threads = True
+    server.state = state
+    server.feed_urls = {f"Replay Feed {k}": f"http://127.0.0.1:{server.server_address[1]}/feeds/{k}.xml" for k in range(feeds)}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_replay_llm(fixtures, latency=0.0, token_latency=0.0):
+    # The stub deployment answering from the fixture set's recorded responses
+    state = StubState(latency, token_latency=token_latency)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(state, make_responder(fixtures.responses)))
+    server.daemon_threads = True
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record benchmark fixtures from the live feeds")
+    parser.add_argument("command", choices=["record"])
+    parser.add_argument("path")
+    parser.add_argument("--per-feed", type=int, default=10)
+    parser.add_argument("--responses", action="store_true", help="also record answers from the configured deployment")
+    args = parser.parse_args()
+
+    from aec_agent import rss_feeds
+    print(f"📼 Recorded {record_fixtures(args.path, rss_feeds, args.per_feed, args.responses)} pages into {args.path}")
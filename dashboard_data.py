@@ -0,0 +1,114 @@
+import functools
+import io
+import os
+from datetime import datetime
+
+import streamlit as st
+from dotenv import load_dotenv
+
+from dedup_index import document_key
+from insight_frame import read_insight_frame, read_raw_insights
+from insight_rollups import insight_rollups, tokenize
+from insight_store import get_insight_store
+from vector_index import vector_index
+
+load_dotenv()
+
+AEC_DASHBOARD_TTL_SECONDS = int(os.getenv("AEC_DASHBOARD_TTL_SECONDS", "900"))
+
+EXTRA_STOPWORDS = {
+    "this", "that", "it", "they", "may", "must", "new", "within", "due", "including",
+    "completion", "similar", "position", "article", "lead", "prepare",
+    "project", "projects", "design", "opportunity", "opportunities", "potential",
+    "priority", "priorities", "highlight", "highlights", "signals", "shift",
+    "focus", "trend", "significant", "underscores",
+    "sj", "surbana", "jurong", "firm", "firms", "consultancy", "contractors", "entrants",
+    "region", "requirements", "rules", "companies", "framework", "solution", "solutions",
+    "u.s.", "african", "tanzania", "east", "social"
+}
+
+
+@functools.cache
+def word_cloud_stopwords():
+    # wordcloud pulls in matplotlib, so it is imported with the first word cloud rather than the page
+    from wordcloud import STOPWORDS
+
+    return frozenset(word for stopword in set(STOPWORDS).union(EXTRA_STOPWORDS) for word in tokenize(stopword))
+
+
+# cache_resource hands every rerun and every session the same DataFrame without copying it,
+# so filter clicks never touch storage. Callers must treat the frame as read-only
+@st.cache_resource(ttl=AEC_DASHBOARD_TTL_SECONDS, show_spinner="Loading insights...")
+def load_insights():
+    store = get_insight_store()
+    # Typed and categorical, without raw_insight (see insight_frame.py)
+    df = read_insight_frame(store)
+    # Search results come back as document keys, the same ones the scheduler indexes under
+    if not df.empty:
+        df["Document Key"] = [document_key(url, source) for url, source in zip(df["URL"], df["Source"])]
+    df.attrs["loaded_at"] = datetime.now()
+    return df
+
+
+def refresh_insights():
+    load_insights.clear()
+    raw_insight.clear()
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def raw_insight(url):
+    # The model's answer is not part of the loaded frame; views that show it read it by URL
+    rows = read_raw_insights(get_insight_store(), [url])
+    return rows["raw_insight"].dropna().iloc[-1] if rows["raw_insight"].notna().any() else None
+
+
+@st.fragment(run_every=10)
+def wait_for_insights():
+    # The scheduler daemon fills the store; reload the page once its first part file lands
+    if get_insight_store().partitions():
+        refresh_insights()
+        st.rerun(scope="app")
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def word_cloud_png(filters, generation):
+    # One render per filter state and rollup generation, kept as PNG bytes in memory
+    word_freq = insight_rollups.word_counts(dict(filters), word_cloud_stopwords())
+    if not word_freq:
+        return None
+    from wordcloud import WordCloud
+
+    wc = WordCloud(
+        width=600, height=300,
+        background_color="white",
+        colormap="tab10",
+        max_words=100,
+        random_state=42
+    ).generate_from_frequencies(word_freq)
+    buffer = io.BytesIO()
+    wc.to_image().save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def word_cloud(filters):
+    # Loading the word counts first makes a scheduler write since the last rerun bump the generation
+    insight_rollups.frame("words")
+    frozen = tuple((column, tuple(sorted(values))) for column, values in sorted(filters.items()))
+    return word_cloud_png(frozen, insight_rollups.generation)
+
+
+def search_results(df, hits):
+    # Search hits (Document Key, Score) joined to their insight rows, best first
+    if hits.empty:
+        return df.iloc[0:0].assign(Score=[])
+    rows = df.drop_duplicates("Document Key", keep="last").set_index("Document Key")
+    hits = hits[hits["Document Key"].isin(rows.index)]
+    return rows.loc[hits["Document Key"]].assign(Score=hits["Score"].round(3).to_numpy()).reset_index()
+
+
+def search_insights(df, query, keys=None, k=10):
+    return search_results(df, vector_index.search(query, k=k, keys=keys))
+
+
+def similar_insights(df, key, keys=None, k=10):
+    return search_results(df, vector_index.similar(key, k=k, keys=keys))
@@ -0,0 +1,284 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+AEC_DEDUP_INDEX_PATH = os.getenv("AEC_DEDUP_INDEX_PATH", ".cache/dedup_index.sqlite")
+AEC_DEDUP_THRESHOLD = float(os.getenv("AEC_DEDUP_THRESHOLD", "0.5"))
+NUM_PERM = 96
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+MIN_SUMMARY_WORDS = 20
+MAX_CANDIDATES = 200
+# Each stored row carries the signature its article was claimed with, so an index built from the
+# store matches new copies of the story exactly as the index that claimed it did
+SIGNATURE_COLUMN = "Dedup Signature"
+
+# Permutations are h(x) = (a * x + b) mod p over 32-bit shingle hashes. The seed is fixed
+# because signatures are persisted and must stay comparable between runs
+_PRIME = np.uint64(4294967311)
+_MASK = np.uint64(0xFFFFFFFF)
+_MIX = np.uint64(0x100000001B3)
+_rng = np.random.RandomState(20240601)
+_A = _rng.randint(1, 2**32 - 1, NUM_PERM, dtype=np.uint64)
+_B = _rng.randint(0, 2**32 - 1, NUM_PERM, dtype=np.uint64)
+_WORD = re.compile(r"[a-z0-9]+")
+
+DedupMatch = namedtuple("DedupMatch", ["key", "title", "similarity"])
+
+
+def document_key(url, source=None):
+    # Store rows for internal documents all share the URL "Manual Upload"
+    return f"manual:{source}" if url == "Manual Upload" else url
+
+
+def shingle_hashes(title, summary=None):
+    # Overlapping word 3-grams, hashed to 32 bits. Syndicated copies keep the body but often
+    # rewrite the headline, so the title only counts when there is barely any summary
+    words = _WORD.findall((summary or "").lower())
+    if len(words) < MIN_SUMMARY_WORDS:
+        words = _WORD.findall(f"{title or ''} {summary or ''}".lower())
+    if len(words) >= SHINGLE_WORDS:
+        words = [" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+    hashes = np.fromiter((zlib.crc32(w.encode()) for w in words), dtype=np.uint64, count=len(words))
+    return np.unique(hashes)
+
+
+def minhash(hashes):
+    # NUM_PERM minimums as uint32, or None for a text without a single word
+    if not len(hashes):
+        return None
+    return (((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1) & _MASK).astype(np.uint32)
+
+
+def encode_signature(signature):
+    # Store columns are text
+    return signature.astype("<u4").tobytes().hex()
+
+
+def decode_signature(text):
+    return np.frombuffer(bytes.fromhex(text), dtype="<u4").astype(np.uint32)
+
+
+def minhash_many(documents, chunk=2000):
+    # Bulk version of minhash over [(title, summary), ...]; documents without words are dropped.
+    # Returns (positions kept, signatures) with one reduceat per chunk instead of one call per document
+    kept, signatures = [], []
+    for start in range(0, len(documents), chunk):
+        hashes = [shingle_hashes(title, summary) for title, summary in documents[start:start + chunk]]
+        sizes = np.array([len(h) for h in hashes])
+        nonempty = np.flatnonzero(sizes)
+        if not len(nonempty):
+            continue
+        flat = np.concatenate([hashes[i] for i in nonempty])
+        offsets = np.concatenate([[0], np.cumsum(sizes[nonempty])[:-1]])
+        permuted = (_A[:, None] * flat[None, :] + _B[:, None]) % _PRIME
+        signatures.append((np.minimum.reduceat(permuted, offsets, axis=1) & _MASK).astype(np.uint32).T)
+        kept.append(nonempty + start)
+    if not signatures:
+        return np.empty(0, dtype=np.int64), np.empty((0, NUM_PERM), dtype=np.uint32)
+    return np.concatenate(kept), np.concatenate(signatures)
+
+
+def band_keys(signatures):
+    # LSH: one 64-bit bucket per band of ROWS values. Two documents with Jaccard similarity s
+    # share at least one bucket with probability 1 - (1 - s**ROWS)**BANDS (~99% at 0.5, ~23% at 0.2).
+    # Rewriting one word in twelve already brings word 3-gram Jaccard down to ~0.6
+    sig = np.atleast_2d(signatures).astype(np.uint64).reshape(-1, BANDS, ROWS)
+    keys = np.broadcast_to(np.arange(1, BANDS + 1, dtype=np.uint64), sig.shape[:2]).copy()
+    for r in range(ROWS):
+        keys = keys * _MIX + sig[:, :, r]
+    return keys.view(np.int64)
+
+
+class DedupIndex:
+    # MinHash signatures of every analysed article with an LSH bucket table, so a lookup
+    # touches a handful of candidates instead of every stored summary
+    def __init__(self, path=AEC_DEDUP_INDEX_PATH, threshold=AEC_DEDUP_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS docs ("
+                " id INTEGER PRIMARY KEY, key TEXT UNIQUE, title TEXT, signature BLOB, added REAL)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS buckets (bucket INTEGER, doc INTEGER)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS buckets_bucket ON buckets (bucket)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS parts (name TEXT PRIMARY KEY)")
+            self._conn.commit()
+        return self._conn
+
+    def _match(self, signature, exclude_key=None):
+        # Candidates sharing the most bands come first, so a busy bucket of loosely related
+        # articles cannot crowd the real near-duplicate out of the MAX_CANDIDATES looked at
+        buckets = [int(b) for b in band_keys(signature)[0]]
+        rows = self.conn.execute(
+            "SELECT key, title, signature FROM docs JOIN ("
+            " SELECT doc, COUNT(*) AS shared FROM buckets"
+            f" WHERE bucket IN ({','.join('?' * len(buckets))}) GROUP BY doc ORDER BY shared DESC LIMIT {MAX_CANDIDATES}"
+            ") AS candidates ON docs.id = candidates.doc",
+            buckets,
+        ).fetchall()
+        best = None
+        for key, title, blob in rows:
+            if key == exclude_key:
+                continue
+            similarity = float(np.mean(np.frombuffer(blob, dtype=np.uint32) == signature))
+            if similarity >= self.threshold and (best is None or similarity > best.similarity):
+                best = DedupMatch(key, title, similarity)
+        return best
+
+    def _insert(self, keys, titles, signatures):
+        # Ids are assigned here so both tables can be filled with one executemany each
+        now = time.time()
+        first = (self.conn.execute("SELECT MAX(id) FROM docs").fetchone()[0] or 0) + 1
+        ids = range(first, first + len(keys))
+        self.conn.executemany(
+            "INSERT INTO docs (id, key, title, signature, added) VALUES (?, ?, ?, ?, ?)",
+            [(doc, key, title, signature.tobytes(), now) for doc, key, title, signature in zip(ids, keys, titles, signatures)],
+        )
+        self.conn.executemany(
+            "INSERT INTO buckets (bucket, doc) VALUES (?, ?)",
+            ((int(bucket), doc) for doc, doc_buckets in zip(ids, band_keys(signatures).tolist()) for bucket in doc_buckets),
+        )
+
+    def find(self, title, summary, key=None):
+        # The closest indexed article at or above the threshold, ignoring key itself
+        signature = minhash(shingle_hashes(title, summary))
+        if signature is None:
+            return None
+        with self.lock:
+            return self._match(signature, exclude_key=key)
+
+    def claim(self, key, title, summary):
+        # Check and register in one step so two copies of a story racing through the
+        # worker pool cannot both pass. Returns the match for a duplicate, else None.
+        # An article re-submitted under its own key is never its own duplicate
+        signature = minhash(shingle_hashes(title, summary))
+        if signature is None:
+            return None
+        with self.lock:
+            match = self._match(signature, exclude_key=key)
+            if match is None and not self.conn.execute("SELECT 1 FROM docs WHERE key = ?", (key,)).fetchone():
+                self._insert([key], [title], signature[None, :])
+                self.conn.commit()
+        return match
+
+    def discard(self, key):
+        # Forget an article whose analysis failed so a later copy of it is not skipped
+        with self.lock:
+            row = self.conn.execute("SELECT id FROM docs WHERE key = ?", (key,)).fetchone()
+            if row:
+                self.conn.execute("DELETE FROM buckets WHERE doc = ?", row)
+                self.conn.execute("DELETE FROM docs WHERE id = ?", row)
+                self.conn.commit()
+
+    def _unknown(self, rows):
+        # rows minus keys already indexed or repeated; the key is each row's first item
+        known = set()
+        keys = [row[0] for row in rows]
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            known.update(k for (k,) in self.conn.execute(
+                f"SELECT key FROM docs WHERE key IN ({','.join('?' * len(batch))})", batch))
+        fresh, seen = [], set()
+        for row in rows:
+            if row[0] not in known and row[0] not in seen:
+                seen.add(row[0])
+                fresh.append(row)
+        return fresh
+
+    def add_many(self, rows):
+        # Bulk load [(key, title, summary), ...]; keys already indexed are left alone
+        with self.lock:
+            fresh = self._unknown(rows)
+            positions, signatures = minhash_many([(title, summary) for _, title, summary in fresh])
+            self._insert([fresh[p][0] for p in positions], [fresh[p][1] for p in positions], signatures)
+            self.conn.commit()
+        return len(positions)
+
+    def add_signatures(self, rows):
+        # Bulk load [(key, title, signature), ...] of signatures computed elsewhere
+        with self.lock:
+            fresh = self._unknown(rows)
+            if fresh:
+                self._insert([key for key, _, _ in fresh], [title for _, title, _ in fresh],
+                             np.stack([signature for _, _, signature in fresh]))
+                self.conn.commit()
+        return len(fresh)
+
+    def signatures(self, keys):
+        # {key: encoded signature} of the given keys that are indexed, for SIGNATURE_COLUMN
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self.lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                found.update((key, np.frombuffer(blob, dtype=np.uint32)) for key, blob in self.conn.execute(
+                    f"SELECT key, signature FROM docs WHERE key IN ({','.join('?' * len(batch))})", batch))
+        return {key: encode_signature(signature) for key, signature in found.items()}
+
+    def with_signatures(self, df):
+        # A copy of the insight rows with SIGNATURE_COLUMN filled in from the index, just before storing
+        if df.empty or "URL" not in df:
+            return df
+        keys = [document_key(url, source) for url, source in zip(df["URL"], df.get("Source", [None] * len(df)))]
+        found = self.signatures(key for key in keys if key)
+        return df.assign(**{SIGNATURE_COLUMN: [found.get(key) for key in keys]})
+
+    def sync(self, store):
+        # Index the store's part files not seen yet (other machines, other shards, the CSV migration).
+        # Rows carry the signature they were claimed with; rows stored before SIGNATURE_COLUMN existed
+        # only have the model's Summary, which rarely matches the article text a claim shingles
+        with self.lock:
+            done = {name for (name,) in self.conn.execute("SELECT name FROM parts")}
+        store.sync()
+        new_parts, covered = store.unseen_files(done)
+        # A compacted part is recorded with the parts it replaces, so merging it again later is no news
+        seen = [(source,) for name in new_parts + covered for source in [name, *store.compacted_from(name)]]
+        if not new_parts:
+            with self.lock:
+                self.conn.executemany("INSERT OR IGNORE INTO parts (name) VALUES (?)", seen)
+                self.conn.commit()
+            return 0
+        df = store.read_files(new_parts, columns=["Source", "Title", "URL", "Summary", SIGNATURE_COLUMN])
+        signed, unsigned = [], []
+        for row in df.to_dict("records"):
+            if not row.get("URL"):
+                continue
+            key = document_key(row.get("URL"), row.get("Source"))
+            signature = row.get(SIGNATURE_COLUMN)
+            if isinstance(signature, str) and signature:
+                signed.append((key, row.get("Title"), decode_signature(signature)))
+            else:
+                unsigned.append((key, row.get("Title"), row.get("Summary")))
+        added = self.add_signatures(signed) + self.add_many(unsigned)
+        with self.lock:
+            self.conn.executemany("INSERT OR IGNORE INTO parts (name) VALUES (?)", seen)
+            self.conn.commit()
+        return added
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+
+dedup_index = DedupIndex()
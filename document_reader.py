@@ -0,0 +1,48 @@
+import os
+
+# Internal documents are read lazily and cut into chunks of at most max_chars, so a multi-MB
+# file never sits in memory whole. Cuts fall on a paragraph break where possible, then a
+# sentence end, then any whitespace, and only mid-word when a chunk has none of those.
+
+READ_BLOCK_CHARS = 1 << 16
+DOCUMENT_SUFFIX = ".txt"
+
+
+def split_point(text, max_chars):
+    # Never cut in the first half of a chunk, or chunks would shrink to a sentence
+    floor = max_chars // 2
+    for separator in ("\n\n", "\n", ". ", " "):
+        cut = text.rfind(separator, floor, max_chars)
+        if cut != -1:
+            return cut + len(separator)
+    return max_chars
+
+
+def iter_chunks(path, max_chars, block_chars=READ_BLOCK_CHARS):
+    # At most max_chars + block_chars of text is held at any time
+    buffer = ""
+    with open(path, encoding="utf-8-sig", errors="replace") as f:
+        while True:
+            block = f.read(block_chars)
+            buffer += block
+            while len(buffer) > max_chars or (not block and buffer.strip()):
+                cut = split_point(buffer, max_chars) if len(buffer) > max_chars else len(buffer)
+                chunk, buffer = buffer[:cut].strip(), buffer[cut:]
+                if chunk:
+                    yield chunk
+            if not block:
+                return
+
+
+def read_head(path, max_chars):
+    with open(path, encoding="utf-8-sig", errors="replace") as f:
+        return f.read(max_chars)
+
+
+def list_documents(directory):
+    # Manual page names (paths without the .txt suffix) of every document under directory
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.endswith(DOCUMENT_SUFFIX) and not filename.startswith("."):
+                yield os.path.join(dirpath, filename[:-len(DOCUMENT_SUFFIX)])
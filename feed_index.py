@@ -0,0 +1,91 @@
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+AEC_FEED_INDEX_PATH = os.getenv("AEC_FEED_INDEX_PATH", ".cache/feed_index.sqlite")
+
+
+def entry_keys(entry):
+    # An article counts as seen if either its GUID or its link has been processed,
+    # so feeds that rotate one of the two still dedupe
+    keys = []
+    guid = entry.get("id") or entry.get("guid")
+    if guid:
+        keys.append(f"guid:{guid}")
+    link = entry.get("link")
+    if link:
+        keys.append(f"url:{link}")
+    return keys
+
+
+def manual_page_key(name):
+    file_path = f"{name}.txt"
+    stat = os.stat(file_path)
+    return f"manual:{name}:{stat.st_size}:{int(stat.st_mtime)}"
+
+
+class FeedIndex:
+    def __init__(self, path=AEC_FEED_INDEX_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS feeds ("
+                " url TEXT PRIMARY KEY, etag TEXT, modified TEXT, checked REAL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS seen ("
+                " key TEXT PRIMARY KEY, source TEXT, processed REAL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def validators(self, url):
+        with self.lock:
+            row = self.conn.execute("SELECT etag, modified FROM feeds WHERE url = ?", (url,)).fetchone()
+        return row if row else (None, None)
+
+    def save_validators(self, url, etag, modified):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO feeds (url, etag, modified, checked) VALUES (?, ?, ?, ?)",
+                (url, etag, modified, time.time()),
+            )
+            self.conn.commit()
+
+    def is_seen(self, keys):
+        if not keys:
+            return False
+        with self.lock:
+            placeholders = ",".join("?" * len(keys))
+            row = self.conn.execute(f"SELECT 1 FROM seen WHERE key IN ({placeholders}) LIMIT 1", keys).fetchone()
+        return row is not None
+
+    def mark_seen(self, keys, source):
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO seen (key, source, processed) VALUES (?, ?, ?)",
+                [(key, source, now) for key in keys],
+            )
+            self.conn.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+
+feed_index = FeedIndex()
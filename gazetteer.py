@@ -0,0 +1,223 @@
+import csv
+import difflib
+import functools
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict, namedtuple
+
+import pandas as pd
+
+# Canonical IDs for the free-text City, Country and Entity Involved fields the model returns.
+# Lookups go against the bundled tables in data/: countries by ISO 3166-1 alpha-3 code,
+# cities as "<ISO3>-<slug>", entities by slug. Exact alias matches come first, then a
+# trigram-prefiltered fuzzy match for spelling variants; every answer is memoized.
+
+GAZETTEER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+FUZZY_CUTOFF = 0.88
+MIN_FUZZY_LENGTH = 5
+FUZZY_CANDIDATES = 10
+
+NORMALIZED_COLUMNS = ["Country ID", "Country Name", "City ID", "City Name", "Entity ID", "Entity Name"]
+
+# Answers that mean "no value"; compared after folding
+EMPTY_VALUES = {
+    "", "n a", "na", "none", "null", "nil", "not specified", "not mentioned", "not available", "not applicable",
+    "not stated", "unknown", "unclear", "various", "multiple", "global", "worldwide", "international", "tbc", "tbd",
+}
+# Dropped from the end of entity names so "AECOM Inc" and "Aecom" share an ID
+LEGAL_SUFFIXES = {
+    "ltd", "limited", "inc", "incorporated", "llc", "plc", "pte", "pty", "co", "corp", "corporation", "company",
+    "group", "holdings", "sa", "ag", "gmbh", "bv", "nv", "spa", "bhd", "sdn",
+}
+_SEPARATORS = re.compile(r"\s*(?:[,;/|]|\band\b|&)\s*", re.I)
+
+Canonical = namedtuple("Canonical", "id name country")
+
+
+def fold(text):
+    # Accents, case and punctuation never distinguish two places or two companies
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold().replace("&", " and ")
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", text).split())
+
+
+def entity_key(text):
+    words = fold(text).split()
+    if words[:1] == ["the"]:
+        words = words[1:]
+    while len(words) > 1 and words[-1] in LEGAL_SUFFIXES:
+        words = words[:-1]
+    return " ".join(words)
+
+
+def slug(key):
+    return key.replace(" ", "-")
+
+
+def clean_label(value):
+    # The raw value tidied for display when it has no canonical match
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    value = " ".join(str(value).split()).strip(" .,;")
+    return None if fold(value) in EMPTY_VALUES else value
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class LookupIndex:
+    # Alias key -> records, plus a trigram inverted index so a fuzzy lookup only scores
+    # the few keys that share the most trigrams with the query
+    def __init__(self, key=fold):
+        self.key = key
+        self.exact = defaultdict(list)
+        self.grams = defaultdict(set)
+
+    def add(self, alias, record):
+        key = self.key(alias)
+        if not key:
+            return
+        if record not in self.exact[key]:
+            self.exact[key].append(record)
+        for gram in trigrams(key):
+            self.grams[gram].add(key)
+
+    def lookup(self, value):
+        key = self.key(value)
+        if not key or key in EMPTY_VALUES:
+            return []
+        if key in self.exact:
+            return self.exact[key]
+        if len(key) < MIN_FUZZY_LENGTH:
+            return []
+        shared = Counter(candidate for gram in trigrams(key) for candidate in self.grams.get(gram, ()))
+        best, best_score = None, FUZZY_CUTOFF
+        for candidate, _ in shared.most_common(FUZZY_CANDIDATES):
+            score = difflib.SequenceMatcher(None, key, candidate).ratio()
+            if score >= best_score:
+                best, best_score = candidate, score
+        return self.exact[best] if best else []
+
+
+def read_table(name):
+    with open(os.path.join(GAZETTEER_DIR, name), encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+class Gazetteer:
+    def __init__(self, path=GAZETTEER_DIR):
+        self.path = path
+        self.lock = threading.Lock()
+        self._loaded = False
+
+    def load(self):
+        # The tables are read on first use, not at import
+        with self.lock:
+            if self._loaded:
+                return
+            self.countries, self.country_index = {}, LookupIndex()
+            for row in read_table("countries.csv"):
+                record = Canonical(row["id"], row["name"], row["id"])
+                self.countries[row["id"]] = record
+                for alias in [row["id"], row["name"], *filter(None, row["aliases"].split("|"))]:
+                    self.country_index.add(alias, record)
+
+            self.city_index = LookupIndex()
+            for row in read_table("cities.csv"):
+                record = Canonical(row["id"], row["name"], row["country"])
+                for alias in [row["name"], *filter(None, row["aliases"].split("|"))]:
+                    self.city_index.add(alias, record)
+
+            self.entity_index = LookupIndex(entity_key)
+            for row in read_table("entities.csv"):
+                record = Canonical(row["id"], row["name"], None)
+                for alias in [row["name"], *filter(None, row["aliases"].split("|"))]:
+                    self.entity_index.add(alias, record)
+            self._loaded = True
+
+    def _first(self, index, value, accept=lambda record: True):
+        # The whole value first, then each part of a list such as "Sydney and Melbourne"
+        for part in [value, *_SEPARATORS.split(value)]:
+            for record in index.lookup(part):
+                if accept(record):
+                    return record
+        return None
+
+    @functools.lru_cache(maxsize=65536)
+    def country(self, value):
+        self.load()
+        return self._first(self.country_index, value)
+
+    @functools.lru_cache(maxsize=65536)
+    def city(self, value, country_id=None):
+        # A known country rules out same-named cities elsewhere
+        self.load()
+        return self._first(self.city_index, value, lambda record: country_id in (None, record.country))
+
+    @functools.lru_cache(maxsize=65536)
+    def entity(self, value):
+        self.load()
+        return self._first(self.entity_index, value)
+
+    @functools.lru_cache(maxsize=65536)
+    def location(self, city, country):
+        # -> (Country ID, Country Name, City ID, City Name); a known city fills in a missing country
+        city, country = clean_label(city), clean_label(country)
+        country_match = self.country(country) if country else None
+        city_match = self.city(city, country_match.id if country_match else None) if city else None
+        if country_match is None and city_match is not None:
+            country_match = self.countries.get(city_match.country)
+        return (
+            country_match.id if country_match else None,
+            country_match.name if country_match else country,
+            city_match.id if city_match else None,
+            city_match.name if city_match else city,
+        )
+
+    @functools.lru_cache(maxsize=65536)
+    def organisation(self, entity):
+        # -> (Entity ID, Entity Name); unknown names still get a stable slug ID
+        entity = clean_label(entity)
+        if entity is None:
+            return None, None
+        match = self.entity(entity)
+        if match:
+            return match.id, match.name
+        return slug(entity_key(entity)) or None, entity
+
+
+gazetteer = Gazetteer()
+
+
+def normalize_insight(fields):
+    # Normalized columns for one parsed insight, stored next to the raw ones
+    location = gazetteer.location(fields.get("City"), fields.get("Country"))
+    organisation = gazetteer.organisation(fields.get("Entity Involved"))
+    return dict(zip(NORMALIZED_COLUMNS, (*location, *organisation)))
+
+
+def normalize_frame(df, refresh=False):
+    # Fills the normalized columns for rows stored before they existed, or for every row with
+    # refresh (a backfill after the tables changed). Each distinct (City, Country) pair and
+    # entity is looked up once
+    if df.empty:
+        return df
+    if refresh or not set(NORMALIZED_COLUMNS) <= set(df.columns):
+        missing = pd.Series(True, index=df.index)
+    else:
+        missing = df[NORMALIZED_COLUMNS].isna().all(axis=1)
+    if not missing.any():
+        return df
+    rows = df.loc[missing]
+    raw = lambda column: rows[column].astype(object).where(rows[column].notna(), None) if column in rows else [None] * len(rows)
+    locations = [gazetteer.location(city, country) for city, country in zip(raw("City"), raw("Country"))]
+    organisations = [gazetteer.organisation(entity) for entity in raw("Entity Involved")]
+    values = pd.DataFrame([(*l, *o) for l, o in zip(locations, organisations)], columns=NORMALIZED_COLUMNS, index=rows.index)
+    df = df.copy()
+    for column in NORMALIZED_COLUMNS:
+        df[column] = values[column] if column not in df else df[column].where(~missing, values[column])
+    return df
@@ -0,0 +1,137 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from metrics import metrics
+
+load_dotenv()
+
+AEC_MAX_PER_HOST = int(os.getenv("AEC_MAX_PER_HOST", "2"))
+AEC_HOST_DELAY = float(os.getenv("AEC_HOST_DELAY", "0.25"))
+AEC_MAX_HOSTS = int(os.getenv("AEC_MAX_HOSTS", "64"))
+
+
+class HostStats:
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.errors = 0
+
+
+class HttpClient:
+    # One keep-alive session for every fetch in the project. Each host gets at most
+    # max_per_host open connections (callers queue for a free one) and consecutive
+    # requests to the same host are spaced at least host_delay seconds apart
+    def __init__(self, max_per_host=AEC_MAX_PER_HOST, host_delay=AEC_HOST_DELAY, max_hosts=AEC_MAX_HOSTS):
+        self.max_per_host = max_per_host
+        self.host_delay = host_delay
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_hosts, pool_maxsize=max_per_host, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.adapter = adapter
+        self.lock = threading.Lock()
+        self.slots = {}
+        self.next_allowed = {}
+        self.stats = {}
+
+    def host_slot(self, host):
+        with self.lock:
+            if host not in self.slots:
+                self.slots[host] = threading.BoundedSemaphore(self.max_per_host)
+                self.stats[host] = HostStats()
+            return self.slots[host]
+
+    def _wait_turn(self, host):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_allowed.get(host, 0.0))
+            self.next_allowed[host] = start + self.host_delay
+        if start > now:
+            metrics.observe("host_delay", start - now)
+            time.sleep(start - now)
+
+    def _record(self, host, nbytes, seconds, failed=False):
+        with self.lock:
+            stats = self.stats[host]
+            stats.requests += 1
+            stats.bytes += nbytes
+            stats.seconds += seconds
+            stats.errors += failed
+
+    @contextmanager
+    def stream(self, url, timeout=10, chunk_size=16 * 1024, headers=None):
+        # Yields (response, chunks); the connection goes back to the pool when the block exits,
+        # even if the caller stopped reading early
+        host = urlparse(url).netloc
+        nbytes = 0
+        failed = False
+        with self.host_slot(host):
+            self._wait_turn(host)
+            start = time.perf_counter()
+            try:
+                res = self.session.get(url, timeout=timeout, stream=True, headers=headers)
+            except Exception:
+                self._record(host, 0, time.perf_counter() - start, failed=True)
+                raise
+
+            def chunks():
+                nonlocal nbytes
+                for chunk in res.iter_content(chunk_size=chunk_size):
+                    nbytes += len(chunk)
+                    yield chunk
+
+            try:
+                yield res, chunks()
+            except Exception:
+                failed = True
+                raise
+            finally:
+                res.close()
+                self._record(host, nbytes, time.perf_counter() - start, failed)
+
+    def get(self, url, timeout=10, headers=None):
+        # Whole-body fetch; the returned response is already fully read
+        with self.stream(url, timeout=timeout, headers=headers) as (res, chunks):
+            res._content = b"".join(chunks)
+        return res
+
+    def metrics(self):
+        # Connection counts come from urllib3's own pool counters
+        pools = {}
+        for key in list(self.adapter.poolmanager.pools.keys()):
+            pool = self.adapter.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            host = pool.host if pool.port in (None, 80, 443) else f"{pool.host}:{pool.port}"
+            opened, requests_made = pools.get(host, (0, 0))
+            pools[host] = (opened + pool.num_connections, requests_made + pool.num_requests)
+
+        with self.lock:
+            report = {}
+            for host, stats in self.stats.items():
+                opened, requests_made = pools.get(host, (0, 0))
+                report[host] = {
+                    "requests": stats.requests,
+                    "errors": stats.errors,
+                    "connections_opened": opened,
+                    "connections_reused": max(0, requests_made - opened),
+                    "bytes_downloaded": stats.bytes,
+                    "seconds": round(stats.seconds, 3),
+                }
+            return report
+
+    def print_metrics(self):
+        for host, m in sorted(self.metrics().items()):
+            print(f"🌐 {host}: {m['requests']} requests, {m['connections_reused']} reused connections, "
+                  f"{m['bytes_downloaded'] / 1024:.0f} KB in {m['seconds']:.1f}s")
+
+
+http_client = HttpClient()
@@ -0,0 +1,153 @@
+import argparse
+import os
+import sys
+from urllib.parse import urlparse
+
+# Headless batch ingestion for backfills too large for one scheduler. Inputs are a feed list,
+# a URL list or directories of internal documents, split across processes or machines by a
+# stable hash of each article's key, so every shard gets a fixed, disjoint slice:
+#   python ingest.py run --urls urls.txt --shard 0/4 --output shards/0   # one per shard, anywhere
+#   python ingest.py merge shards/0 shards/1 shards/2 shards/3            # into the insight store
+# Each shard keeps its jobs, seen-feed index, dedup index and insight cache under its own state
+# directory. Every job state change is committed there, so rerunning the same command after an
+# interruption resumes where it stopped and never analyses a stored article twice. Without
+# --output the shard appends straight to the configured insight store, then brings its chart
+# rollups and search index up to date as merge does.
+
+DEFAULT_STATE_DIR = os.path.join(".cache", "ingest")
+URL_SOURCE = "URL List"
+
+
+def parse_shard(value):
+    index, sep, count = value.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected INDEX/COUNT, got {value!r}")
+    if not sep or count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"expected INDEX/COUNT with 0 <= INDEX < COUNT, got {value!r}")
+    return index, count
+
+
+def read_lines(path):
+    # Blank lines and # comments are ignored, and repeated lines are kept once
+    with open(path, encoding="utf-8") as f:
+        return list(dict.fromkeys(line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")))
+
+
+def read_feeds(path):
+    # "NAME URL" per line (the URL is the last word, the name may have spaces), or a bare URL
+    feeds = {}
+    for line in read_lines(path):
+        *name, url = line.rsplit(None, 1)
+        feeds[name[0] if name else urlparse(url).netloc] = url
+    return feeds
+
+
+def shard_environment(state_dir):
+    # Read by the modules below when they are imported, so this runs first
+    return {
+        "AEC_JOBS_PATH": os.path.join(state_dir, "jobs.sqlite"),
+        "AEC_FEED_INDEX_PATH": os.path.join(state_dir, "feed_index.sqlite"),
+        "AEC_DEDUP_INDEX_PATH": os.path.join(state_dir, "dedup_index.sqlite"),
+        "AEC_CACHE_PATH": os.path.join(state_dir, "insight_cache.sqlite"),
+    }
+
+
+def run(args):
+    index, count = args.shard
+    state_dir = args.state_dir or os.path.join(DEFAULT_STATE_DIR, f"shard-{index}-of-{count}")
+    os.environ.update(shard_environment(state_dir))
+    if args.retry_failed:
+        os.environ["AEC_JOB_RETRY_SECONDS"] = "0"
+
+    from dedup_index import dedup_index
+    from document_reader import list_documents
+    from insight_rollups import insight_rollups
+    from insight_store import InsightStore, LocalBackend, get_insight_store
+    from job_store import job_store
+    from scheduler import Scheduler, shard_of
+    from vector_index import vector_index
+
+    store = InsightStore(LocalBackend(args.output)) if args.output else get_insight_store()
+    if args.output:
+        # Articles already in the main store count as duplicates, so history is not analysed again
+        try:
+            dedup_index.sync(get_insight_store())
+        except Exception as e:
+            print(f"⚠️ Could not read the insight store for duplicate checks: {e}")
+
+    urls = [url for path in args.urls or [] for url in read_lines(path)]
+    added = job_store.add_many((url, "url", URL_SOURCE, url) for url in urls if shard_of(url, count) == index)
+    # Documents are keyed by their path under the directory, which is the same on every machine
+    manual_pages = [
+        name for directory in args.manual_dir or [] for name in list_documents(directory)
+        if shard_of(os.path.relpath(name, directory), count) == index
+    ]
+    feeds = {name: url for path in args.feeds or [] for name, url in read_feeds(path).items()}
+    print(f"🧩 Shard {index}/{count}: {added} new URL jobs, {len(manual_pages)} documents, {len(feeds)} feeds "
+          f"(state in {state_dir})")
+
+    scheduler = Scheduler(
+        feeds=feeds, manual_pages=manual_pages, store=store, max_per_feed=args.max_per_feed or None,
+        batch_size=args.batch_size, shard=(index, count), indexes=False,
+    )
+    scheduler.run_once()
+    if not args.output:
+        # Parts go to the store only here; indexing once at the end rather than per flush keeps
+        # concurrent shards from contending for the index files
+        try:
+            insight_rollups.sync(store)
+            vector_index.sync(store)
+        except Exception as e:
+            print(f"❌ Failed to update the chart rollups and search index: {e}")
+    # Non-zero while jobs are still failing, so a wrapper script knows to rerun the shard
+    return 1 if job_store.counts().get("failed") else 0
+
+
+def merge(args):
+    from insight_rollups import insight_rollups
+    from insight_store import InsightStore, LocalBackend, get_insight_store
+    from vector_index import vector_index
+
+    target = InsightStore(LocalBackend(args.into)) if args.into else get_insight_store()
+    target.sync()
+    # Shard parts a compaction has merged since they were copied count as present too
+    present = set(target.local_files()) | target.superseded()
+    copied = 0
+    for directory in args.shards:
+        shard = InsightStore(LocalBackend(directory))
+        for name in shard.current_files():
+            if name not in present:
+                target.copy_file(name, shard.backend.read_file(name))
+                present.add(name)
+                copied += 1
+    print(f"📦 Merged {copied} part files from {len(args.shards)} shards")
+    if copied:
+        insight_rollups.sync(target)
+        vector_index.sync(target)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded, resumable batch ingestion into the insight store")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="analyse this shard's slice of the inputs")
+    run_parser.add_argument("--feeds", action="append", metavar="FILE", help='feed list, one "NAME URL" per line')
+    run_parser.add_argument("--urls", action="append", metavar="FILE", help="article URLs, one per line")
+    run_parser.add_argument("--manual-dir", action="append", metavar="DIR", help="analyse every .txt document under DIR")
+    run_parser.add_argument("--shard", type=parse_shard, default=(0, 1), metavar="INDEX/COUNT",
+                            help="this process's shard, counted from 0 (default 0/1)")
+    run_parser.add_argument("--state-dir", help=f"checkpoint directory (default {DEFAULT_STATE_DIR}/shard-INDEX-of-COUNT)")
+    run_parser.add_argument("--output", metavar="DIR", help="write part files to a local store at DIR, to merge later")
+    run_parser.add_argument("--max-per-feed", type=int, default=0, help="newest entries taken per feed (0 = all)")
+    run_parser.add_argument("--batch-size", type=int, default=None)
+    run_parser.add_argument("--retry-failed", action="store_true", help="retry failed jobs without waiting for the back-off")
+
+    merge_parser = commands.add_parser("merge", help="copy shard outputs into one insight store")
+    merge_parser.add_argument("shards", nargs="+", metavar="DIR", help="--output directories of finished shards")
+    merge_parser.add_argument("--into", metavar="DIR", help="a local store to merge into (default: the configured store)")
+
+    args = parser.parse_args()
+    sys.exit(run(args) if args.command == "run" else merge(args))
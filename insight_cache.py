@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+AEC_CACHE_PATH = os.getenv("AEC_CACHE_PATH", ".cache/insight_cache.sqlite")
+AEC_CACHE_TTL_DAYS = float(os.getenv("AEC_CACHE_TTL_DAYS", "30"))
+AEC_CACHE_MAX_ENTRIES = int(os.getenv("AEC_CACHE_MAX_ENTRIES", "50000"))
+
+
+def make_cache_key(title, summary, prompt_version, deployment):
+    payload = json.dumps([title or "", summary or "", prompt_version, deployment or ""], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class InsightCache:
+    def __init__(self, path=AEC_CACHE_PATH, ttl_days=AEC_CACHE_TTL_DAYS, max_entries=AEC_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_days * 86400
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def conn(self):
+        # Opened on first use so importing the agent never touches the disk
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS insights ("
+                " key TEXT PRIMARY KEY, raw_insight TEXT NOT NULL,"
+                " created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS insights_accessed ON insights (accessed)")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT raw_insight, created FROM insights WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            raw_insight, created = row
+            if self.ttl_seconds and now - created > self.ttl_seconds:
+                self.conn.execute("DELETE FROM insights WHERE key = ?", (key,))
+                self.conn.commit()
+                return None
+            self.conn.execute("UPDATE insights SET accessed = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            return raw_insight
+
+    def put(self, key, raw_insight):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO insights (key, raw_insight, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, raw_insight, now, now),
+            )
+            self._evict(now)
+            self.conn.commit()
+
+    def _evict(self, now):
+        if self.ttl_seconds:
+            self.conn.execute("DELETE FROM insights WHERE created < ?", (now - self.ttl_seconds,))
+        if self.max_entries:
+            # Least recently used entries go first once the cache is over size
+            self.conn.execute(
+                "DELETE FROM insights WHERE key IN ("
+                " SELECT key FROM insights ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM insights")
+            self.conn.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM insights").fetchone()[0]
+
+
+insight_cache = InsightCache()
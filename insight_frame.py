@@ -0,0 +1,58 @@
+import pandas as pd
+
+from dedup_index import SIGNATURE_COLUMN
+from gazetteer import normalize_frame
+from insight_store import PARTITION_KEY, to_filter_expression
+from metrics import metrics
+
+# The dashboard's in-memory view of the insight store. Enumerated text columns are decoded from
+# Parquet straight into Arrow dictionaries, which pandas keeps as categoricals: a small integer
+# code per row instead of a string, so the frame is a fraction of the size and filters and
+# groupbys compare codes. Signal Strength is ordered Low < Medium < High, with any other answer (the
+# prompt's N/A for internal documents) kept as its own level below Low. raw_insight, by far the
+# widest column, stays on disk and is read by URL for the few rows a view asks for, and so does
+# the dedup signature, which only dedup_index reads.
+
+CATEGORICAL_COLUMNS = ["Source", "Source Type", "Category", "Sector", "Project Status", "City", "Country"]
+# Filled in by normalize_frame after the read, so converted afterwards
+NORMALIZED_CATEGORICAL_COLUMNS = ["Country ID", "Country Name", "City ID", "City Name", "Entity ID", "Entity Name"]
+# In order; anything else the model answered ranks below Low
+SIGNAL_LEVELS = ["Low", "Medium", "High"]
+BULKY_COLUMNS = ["raw_insight", SIGNATURE_COLUMN]
+
+
+def typed_frame(df):
+    # Casts an insight frame to the schema above, whichever columns it has
+    df = df.copy(deep=False)
+    for column in [*CATEGORICAL_COLUMNS, *NORMALIZED_CATEGORICAL_COLUMNS, PARTITION_KEY]:
+        if column in df and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype("category")
+    if "Signal Strength" in df:
+        signal = df["Signal Strength"]
+        signal = signal if isinstance(signal.dtype, pd.CategoricalDtype) else signal.astype("category")
+        # Other values keep their stored text, which is what the chart rollups count and filter on
+        others = sorted(set(signal.cat.categories).difference(SIGNAL_LEVELS))
+        df["Signal Strength"] = signal.cat.set_categories([*others, *SIGNAL_LEVELS], ordered=True)
+    return df
+
+
+def read_insight_frame(store, sync=True):
+    # Every stored insight without the bulky columns, normalized and typed
+    dataset = store.dataset(sync, dictionary_columns=[*CATEGORICAL_COLUMNS, "Signal Strength"])
+    if dataset is None:
+        return pd.DataFrame()
+    columns = [name for name in dataset.schema.names if name not in BULKY_COLUMNS]
+    with metrics.timer("store_read"):
+        df = dataset.to_table(columns=columns).to_pandas()
+    # Rows stored before normalization existed get their canonical location and entity columns here
+    return typed_frame(normalize_frame(df))
+
+
+def read_raw_insights(store, urls, sync=False):
+    # The lazily loaded side table: URL, Source and raw_insight of just the given articles
+    columns = ["URL", "Source", "raw_insight"]
+    dataset = store.dataset(sync)
+    if dataset is None or "raw_insight" not in dataset.schema.names:
+        return pd.DataFrame(columns=columns)
+    with metrics.timer("store_read"):
+        return dataset.to_table(columns=columns, filter=to_filter_expression([("URL", "in", list(urls))])).to_pandas()
@@ -0,0 +1,282 @@
+import json
+import re
+from dataclasses import dataclass, fields
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Column name -> JSON key asked of the model
+INSIGHT_FIELDS = {
+    "Summary": "summary",
+    "Source Type": "source_type",
+    "Category": "category",
+    "Entity Involved": "entity_involved",
+    "City": "city",
+    "Country": "country",
+    "Sector": "sector",
+    "Project or Initiative Name": "project_or_initiative_name",
+    "Project Status": "project_status",
+    "Strategic Insight Summary": "strategic_insight_summary",
+    "Signal Strength": "signal_strength",
+    "Action Recommendation": "action_recommendation",
+}
+
+CATEGORIES = [
+    "Project Win", "Strategic Movement", "Competitor Activity", "Policy/Regulatory Update",
+    "Early Market Signal", "Historical SJ Project", "Strategic Plan (Internal)",
+]
+PROJECT_STATUSES = ["Ongoing", "Planned", "Announced", "Approved", "Under Construction", "Completed", "Unclear"]
+SOURCE_TYPES = ["External", "Internal"]
+# Pinned for internal documents whatever the model answers
+MANUAL_PAGE_FIELDS = {"Source Type": "Internal", "Entity Involved": "Surbana Jurong"}
+
+
+class InsightParseError(ValueError):
+    pass
+
+
+def normalize_signal_strength(value):
+    value = value.lower().strip().rstrip('.')
+    if value == "high":
+        return "High"
+    elif value == "medium":
+        return "Medium"
+    elif value == "low":
+        return "Low"
+    return value.capitalize()
+
+
+def clean_value(value):
+    value = value.strip().strip("*").strip()
+    if value.endswith('.'):
+        value = value[:-1]
+    return value.strip()
+
+
+def canonical_choice(value, choices):
+    # Fix the casing of known labels but never throw away an unexpected one
+    for choice in choices:
+        if value.lower() == choice.lower():
+            return choice
+    return value
+
+
+@dataclass
+class Insight:
+    summary: str = None
+    source_type: str = None
+    category: str = None
+    entity_involved: str = None
+    city: str = None
+    country: str = None
+    sector: str = None
+    project_or_initiative_name: str = None
+    project_status: str = None
+    strategic_insight_summary: str = None
+    signal_strength: str = None
+    action_recommendation: str = None
+    is_relevant: str = None
+
+    @classmethod
+    def from_json(cls, obj):
+        if not isinstance(obj, dict):
+            raise InsightParseError(f"expected a JSON object, got {type(obj).__name__}")
+        values = {}
+        for f in fields(cls):
+            value = obj.get(f.name)
+            if value is None:
+                continue
+            if isinstance(value, bool):
+                value = "Yes" if value else "No"
+            elif isinstance(value, (int, float)):
+                value = str(value)
+            elif not isinstance(value, str):
+                raise InsightParseError(f"field {f.name!r} should be a string, got {type(value).__name__}")
+            values[f.name] = clean_value(value)
+        if not any(values.get(key) for key in INSIGHT_FIELDS.values()) and values.get("is_relevant", "").lower() != "no":
+            raise InsightParseError("JSON object has none of the insight fields")
+        insight = cls(**values)
+        insight.normalize()
+        return insight
+
+    def normalize(self):
+        if self.signal_strength:
+            self.signal_strength = normalize_signal_strength(self.signal_strength)
+        if self.category:
+            self.category = canonical_choice(self.category, CATEGORIES)
+        if self.project_status:
+            self.project_status = canonical_choice(self.project_status, PROJECT_STATUSES)
+        if self.source_type:
+            self.source_type = canonical_choice(self.source_type, SOURCE_TYPES)
+
+    def to_columns(self):
+        return {column: getattr(self, key) for column, key in INSIGHT_FIELDS.items()}
+
+
+def json_format_instructions():
+    keys = ", ".join(f'"{key}"' for key in ["is_relevant", *INSIGHT_FIELDS.values()])
+    return f"""Instead of the numbered list, return the findings as a single JSON object with exactly these keys: {keys}.
+Each value must be a plain string following the rules for the matching numbered field above ("is_relevant" is "Yes" or "No").
+"""
+
+
+def json_batch_format_instructions():
+    return """Return a single JSON object of the form {"articles": [...]} containing one object per article, in the same order as the articles.
+Each object has an "article" key with the article's number plus the keys listed above.
+"""
+
+
+# A field line is "<key>: <value>" where the key may carry list numbering, bullets, bold markers
+# or "(if available)": "1. **Key**: value", "**Key:** value", "- Key: value" all parse the same
+_KEY_CHARS = "0123456789.)-*•# \t"
+_FIELD_LOOKUP = {column.lower(): column for column in INSIGHT_FIELDS}
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def field_key(head):
+    return _FIELD_LOOKUP.get(head.replace("(if available)", "").strip(_KEY_CHARS).lower())
+
+
+def parse_markdown_insight(raw, first_wins=False):
+    # A field repeated in one answer keeps its last value, as the feed parser always did. Internal
+    # documents (first_wins) keep the first non-empty one, as the manual-page parser did
+    parsed = {}
+    for line in raw.splitlines():
+        head, sep, value = line.partition(":")
+        if not sep:
+            continue
+        column = field_key(head)
+        if column and not (first_wins and parsed.get(column)):
+            parsed[column] = clean_value(value)
+    insight = Insight(**{INSIGHT_FIELDS[column]: value for column, value in parsed.items()})
+    insight.normalize()
+    return insight
+
+
+def load_json_insight(raw):
+    text = raw.strip()
+    if text.startswith("```"):
+        text = _FENCE.sub("", text)
+    if not text.startswith("{"):
+        raise InsightParseError("not a JSON object")
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        raise InsightParseError(str(e))
+
+
+def parse_insight(raw, overrides=None, first_wins=False):
+    # Returns {column: value} for every insight column, None where the model gave nothing.
+    # overrides pins columns we already know (e.g. internal documents) regardless of the model's answer
+    try:
+        insight = Insight.from_json(load_json_insight(raw))
+    except InsightParseError:
+        insight = parse_markdown_insight(raw, first_wins)
+    columns = insight.to_columns()
+    if overrides:
+        columns.update(overrides)
+    return columns
+
+
+def clean_array(values):
+    values = pc.utf8_trim(pc.utf8_trim_whitespace(values), "*")
+    values = pc.replace_substring_regex(pc.utf8_trim_whitespace(values), r"\.$", "")
+    return pc.utf8_trim_whitespace(values)
+
+
+def canonical_series(values, choices):
+    lookup = {choice.lower(): choice for choice in choices}
+    return values.str.lower().map(lookup).fillna(values)
+
+
+def parse_markdown_bulk(raw, first_wins=False):
+    # Same rules as parse_markdown_insight, applied to every line of every row at once with Arrow kernels
+    columns = list(INSIGHT_FIELDS)
+    text = pa.array(raw, type=pa.large_string())
+    lists = pc.split_pattern(text, "\n")
+    lines = pc.list_flatten(lists)
+    rows = pc.list_parent_indices(lists)
+
+    pairs = pc.split_pattern(lines, ":", max_splits=1)
+    has_colon = pc.equal(pc.list_value_length(pairs), 2)
+    pairs, rows = pairs.filter(has_colon), rows.filter(has_colon)
+
+    heads = pc.list_element(pairs, 0)
+    heads = pc.utf8_lower(pc.utf8_trim(pc.replace_substring(heads, "(if available)", ""), _KEY_CHARS))
+    codes = pc.index_in(heads, value_set=pa.array(list(_FIELD_LOOKUP), type=pa.large_string()))
+    known = pc.is_valid(codes)
+    codes = codes.filter(known).to_numpy()
+    rows = rows.filter(known).to_numpy()
+    values = clean_array(pc.list_element(pairs.filter(known), 1)).to_numpy(zero_copy_only=False)
+
+    # Which occurrence of a repeated field wins follows parse_markdown_insight: the last one, or with
+    # first_wins the first non-empty one. Lines are sorted so the winner leads each (row, field) group
+    keys = rows.astype(np.int64) * len(columns) + codes
+    position = np.arange(len(keys))
+    order = np.lexsort((position, values == "", keys)) if first_wins else np.lexsort((-position, keys))
+    leads = np.r_[True, keys[order][1:] != keys[order][:-1]] if len(order) else np.zeros(0, dtype=bool)
+    picked = order[leads]
+
+    out = np.full((len(raw), len(columns)), None, dtype=object)
+    out[rows[picked], codes[picked]] = values[picked]
+    return pd.DataFrame(out, columns=columns, index=raw.index)
+
+
+def normalize_bulk(parsed):
+    # Insight.normalize over whole columns
+    signal = parsed["Signal Strength"].dropna()
+    lowered = signal.str.lower().str.strip().str.rstrip(".")
+    parsed.loc[signal.index, "Signal Strength"] = lowered.map({"high": "High", "medium": "Medium", "low": "Low"}).fillna(lowered.str.capitalize())
+    for column, choices in (("Category", CATEGORIES), ("Project Status", PROJECT_STATUSES), ("Source Type", SOURCE_TYPES)):
+        values = parsed[column].dropna()
+        parsed.loc[values.index, column] = canonical_series(values, choices)
+    return parsed
+
+
+def parse_json_bulk(raw, first_wins=False):
+    # Insight.from_json for rows whose object holds only strings (nearly every answer): decoded
+    # one by one, then cleaned and checked column-wise. Anything else goes through parse_insight
+    keys = [*INSIGHT_FIELDS.values(), "is_relevant"]
+    objects, simple = [], []
+    for text in raw:
+        try:
+            obj = load_json_insight(text)
+        except InsightParseError:
+            obj = None
+        ok = isinstance(obj, dict) and all(value is None or isinstance(value, str) for value in obj.values())
+        objects.append(obj if ok else {})
+        simple.append(ok)
+    simple = np.array(simple, dtype=bool)
+
+    values = pd.DataFrame.from_records(objects, index=raw.index, columns=keys).astype(object)
+    for key in keys:
+        column = values[key]
+        present = column.notna().to_numpy()
+        if present.any():
+            cleaned = clean_array(pa.array(column[present].tolist(), type=pa.large_string()))
+            values.loc[present, key] = cleaned.to_numpy(zero_copy_only=False)
+    has_field = (values[list(INSIGHT_FIELDS.values())].fillna("") != "").any(axis=1)
+    irrelevant = values["is_relevant"].fillna("").str.lower().eq("no")
+    simple &= (has_field | irrelevant).to_numpy()
+
+    out = values[list(INSIGHT_FIELDS.values())].set_axis(list(INSIGHT_FIELDS), axis=1)
+    out = normalize_bulk(out)
+    if not simple.all():
+        rest = raw[~simple]
+        out.loc[rest.index] = pd.DataFrame.from_records([parse_insight(text, first_wins=first_wins) for text in rest], index=rest.index)[list(INSIGHT_FIELDS)]
+    return out
+
+
+def parse_insights_bulk(raw, first_wins=False):
+    # Vectorized equivalent of parse_insight over a Series of stored raw_insight text.
+    # Markdown rows are parsed in one columnar pass, JSON rows are cleaned column-wise after decoding
+    raw = raw.fillna("").astype(str)
+    is_json = raw.str.lstrip().str.startswith(("{", "```"))
+    parts = [pd.DataFrame(columns=list(INSIGHT_FIELDS), dtype=object)]
+    if (~is_json).any():
+        parts.append(normalize_bulk(parse_markdown_bulk(raw[~is_json], first_wins)))
+    if is_json.any():
+        parts.append(parse_json_bulk(raw[is_json], first_wins))
+    return pd.concat(parts).astype(object).reindex(raw.index)
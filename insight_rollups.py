@@ -0,0 +1,206 @@
+import os
+import re
+import sqlite3
+import threading
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from gazetteer import NORMALIZED_COLUMNS, normalize_frame
+
+load_dotenv()
+
+AEC_ROLLUPS_PATH = os.getenv("AEC_ROLLUPS_PATH", ".cache/insight_rollups.sqlite")
+
+# Insight column -> rollup key column. Source Type is kept so the regulatory chart can leave out
+# internal documents; locations are the gazetteer's canonical ones
+ROLLUP_COLUMNS = {
+    "Sector": "sector",
+    "Category": "category",
+    "Signal Strength": "signal_strength",
+    "Source Type": "source_type",
+    "Country ID": "country_id",
+    "Country Name": "country_name",
+    "City Name": "city_name",
+}
+# Bumped whenever the tables change shape; an older database is recounted from the part files
+SCHEMA_VERSION = 2
+SIGNAL_SCORES = {"Low": 2, "Medium": 5, "High": 10}
+# Word counts are kept per dashboard filter (sector, category, signal) over this column
+WORD_COLUMNS = ["Sector", "Category", "Signal Strength"]
+WORD_SOURCE = "Strategic Insight Summary"
+# Words keep inner dots, hyphens, apostrophes and ampersands ("u.s", "net-zero", "o'neill", "r&d")
+# What sync reads from a part file: the raw location and entity fields too, for parts written
+# before the normalized columns existed
+SYNC_COLUMNS = list(dict.fromkeys([*ROLLUP_COLUMNS, "City", "Country", "Entity Involved", *NORMALIZED_COLUMNS, WORD_SOURCE]))
+_WORD = re.compile(r"[a-z0-9]+(?:[.'&-][a-z0-9]+)*")
+
+
+def tokenize(text):
+    words = _WORD.findall(text.lower().replace("\u2019", "'"))
+    return [word[:-2] if word.endswith("'s") else word for word in words]
+
+
+class InsightRollups:
+    # Insight counts per (sector, category, signal, source type, country, city), kept up to date
+    # as part files are appended. The dashboard charts are grouped sums over this table, so their
+    # cost follows the number of distinct key combinations rather than the number of insights.
+    # Missing values are stored as '' (SQLite keys treat NULLs as distinct) and read back as NaN
+    def __init__(self, path=AEC_ROLLUPS_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self._conn = None
+        self._frames = {}
+        self._frames_version = None
+        self.generation = 0
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                for table in ("rollups", "words", "parts"):
+                    self._conn.execute(f"DROP TABLE IF EXISTS {table}")
+                self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            keys = ", ".join(f"{column} TEXT NOT NULL" for column in ROLLUP_COLUMNS.values())
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS rollups ({keys}, count INTEGER NOT NULL,"
+                f" PRIMARY KEY ({', '.join(ROLLUP_COLUMNS.values())}))"
+            )
+            word_keys = ", ".join(ROLLUP_COLUMNS[column] for column in WORD_COLUMNS)
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS words ({word_keys}, word TEXT NOT NULL, count INTEGER NOT NULL,"
+                f" PRIMARY KEY ({word_keys}, word))"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS parts (name TEXT PRIMARY KEY)")
+            self._conn.commit()
+        return self._conn
+
+    def add(self, df, part=None):
+        # Counts the rows of one appended part file. The part name is claimed first and committed
+        # with the counts, so a part is never counted twice: not after a crash, and not when the
+        # dashboard's sync and the scheduler's add fold the same part in from two processes
+        df = normalize_frame(df)
+        keys = pd.DataFrame({
+            key: df[column].astype("string").fillna("") if column in df else ""
+            for column, key in ROLLUP_COLUMNS.items()
+        }, index=df.index)
+        grouped = keys.value_counts().reset_index(name="count")
+        word_keys = [ROLLUP_COLUMNS[column] for column in WORD_COLUMNS]
+        text = df[WORD_SOURCE].astype("string").fillna("") if WORD_SOURCE in df else pd.Series("", index=df.index)
+        words = keys[word_keys].assign(word=text.map(tokenize)).explode("word").dropna(subset=["word"])
+        word_counts = words.value_counts().reset_index(name="count")
+        with self.lock:
+            try:
+                if part and not self.conn.execute("INSERT OR IGNORE INTO parts (name) VALUES (?)", (part,)).rowcount:
+                    self.conn.rollback()
+                    return 0
+                self._upsert("rollups", list(ROLLUP_COLUMNS.values()), grouped)
+                self._upsert("words", [*word_keys, "word"], word_counts)
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+            self._frames = {}
+        return len(df)
+
+    def _upsert(self, table, keys, counts):
+        self.conn.executemany(
+            f"INSERT INTO {table} ({', '.join(keys)}, count) VALUES ({', '.join('?' * (len(keys) + 1))})"
+            f" ON CONFLICT ({', '.join(keys)}) DO UPDATE SET count = count + excluded.count",
+            counts.itertuples(index=False, name=None),
+        )
+
+    def sync(self, store):
+        # Count the store's part files not seen yet (other machines, the CSV migration, a missed add).
+        # A compacted part made of counted parts is only recorded. If a counted part has been
+        # superseded by a backfill, or only some of a compacted part's rows were counted, every
+        # count is rebuilt
+        store.sync()
+        current = store.current_files()
+        with self.lock:
+            done = {name for (name,) in self.conn.execute("SELECT name FROM parts")}
+            fresh, covered = store.unseen_files(done)
+            partly_counted = any(done.intersection(store.compacted_from(name)) for name in fresh)
+            if partly_counted or done - set(current) - store.superseded(current):
+                for table in ("rollups", "words", "parts"):
+                    self.conn.execute(f"DELETE FROM {table}")
+                self.conn.commit()
+                self._frames = {}
+                fresh, covered = store.unseen_files(set())
+            self._record(store, covered)
+        added = 0
+        for name in fresh:
+            added += self.add(store.read_files([name], columns=SYNC_COLUMNS), part=name)
+            with self.lock:
+                self._record(store, [name])
+        return added
+
+    def _record(self, store, names):
+        # Called with the lock held. A compacted part's sources are recorded with it, so a later
+        # compaction that merges it again is recognised as counted
+        rows = [(source,) for name in names for source in [name, *store.compacted_from(name)]]
+        self.conn.executemany("INSERT OR IGNORE INTO parts (name) VALUES (?)", rows)
+        self.conn.commit()
+
+    def frame(self, table="rollups"):
+        # A whole table, held in memory with categorical keys until it changes. data_version
+        # moves whenever another connection (the scheduler) commits; generation counts reloads
+        columns = {"rollups": list(ROLLUP_COLUMNS), "words": [*WORD_COLUMNS, "Word"]}[table]
+        with self.lock:
+            version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            if version != self._frames_version:
+                self._frames = {}
+                self._frames_version = version
+            if table not in self._frames:
+                rows = self.conn.execute(f"SELECT * FROM {table}").fetchall()
+                frame = pd.DataFrame(rows, columns=[*columns, "Count"])
+                self._frames[table] = frame.astype({column: "category" for column in columns})
+                self.generation += 1
+            return self._frames[table]
+
+    def counts(self, by, filters=None, exclude=None, table="rollups"):
+        # Insight counts grouped by the `by` columns, largest first. filters and exclude map
+        # column names to the values to keep or drop, as the dashboard's multiselects do
+        df = self.frame(table)
+        mask = pd.Series(True, index=df.index)
+        for column, values in (filters or {}).items():
+            if values:
+                mask &= df[column].isin(values)
+        for column, values in (exclude or {}).items():
+            if values:
+                mask &= ~df[column].isin(values)
+        df = df[mask].groupby(by, observed=True, sort=False)["Count"].sum().reset_index()
+        df = df.sort_values("Count", ascending=False, kind="stable", ignore_index=True)
+        df[by] = df[by].astype(object).mask(df[by].astype(object) == "")
+        return df
+
+    def location_counts(self, filters=None):
+        df = self.counts(["City Name", "Country Name"], filters)
+        df["Location"] = df["City Name"].fillna("Unknown") + ", " + df["Country Name"].fillna("Unknown")
+        df = df[df["Location"] != "Unknown, Unknown"]
+        return df.groupby("Location", as_index=False, sort=False)["Count"].sum().sort_values("Count", ascending=False, kind="stable")
+
+    def geo_points(self, filters=None):
+        # One marker per city, sector and signal strength instead of one per insight.
+        # Markers are placed by ISO-3 code, so only countries the gazetteer knows are drawn
+        df = self.counts(["Country ID", "Country Name", "City Name", "Sector", "Signal Strength"], filters)
+        df = df[df["Country ID"].notna()]
+        df["Signal Score"] = df["Signal Strength"].map(SIGNAL_SCORES).fillna(8)
+        return df
+
+    def word_counts(self, filters=None, stopwords=()):
+        # Strategic Insight Summary word frequencies for the filtered insights
+        df = self.counts(["Word"], filters, table="words")
+        df = df[~df["Word"].isin(stopwords)]
+        return dict(zip(df["Word"], df["Count"]))
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COALESCE(SUM(count), 0) FROM rollups").fetchone()[0]
+
+
+insight_rollups = InsightRollups()
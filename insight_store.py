@@ -0,0 +1,308 @@
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import uuid
+from datetime import datetime, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from dotenv import load_dotenv
+
+from metrics import metrics
+
+load_dotenv()
+
+AEC_STORE_BACKEND = os.getenv("AEC_STORE_BACKEND", "blob")
+AEC_STORE_DIR = os.getenv("AEC_STORE_DIR", ".cache/insight_store")
+PARTITION_KEY = "ingest_date"
+# A date partition with at least this many part files is merged into one by compact() (0 = never)
+AEC_COMPACT_MIN_FILES = int(os.getenv("AEC_COMPACT_MIN_FILES", "8"))
+# Parquet metadata of a compacted part: every part file it replaces, including those an earlier
+# compaction had merged, so a reader or derived index can tell which rows it has seen already
+COMPACTED_FROM = b"aec.compacted_from"
+# A rewritten part file gets the next ".r<N>" revision and supersedes the earlier ones
+_PART_NAME = re.compile(r"^(?P<base>.+?)(?:\.r(?P<revision>\d+))?\.parquet$")
+
+
+def part_revision(name):
+    match = _PART_NAME.match(name)
+    return match.group("base"), int(match.group("revision") or 0)
+
+
+def latest_revisions(names):
+    latest = {}
+    for name in names:
+        base, revision = part_revision(name)
+        if base not in latest or revision > part_revision(latest[base])[1]:
+            latest[base] = name
+    return sorted(latest.values())
+
+
+class LocalBackend:
+    # Part files live directly on disk; also the backend used for tests and offline runs
+    def __init__(self, root):
+        self.root = root
+
+    def list_files(self):
+        names = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith(".parquet"):
+                    names.append(os.path.relpath(os.path.join(dirpath, filename), self.root).replace(os.sep, "/"))
+        return sorted(names)
+
+    def read_file(self, name):
+        with open(os.path.join(self.root, name), "rb") as f:
+            return f.read()
+
+    def write_file(self, name, data):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def delete_file(self, name):
+        try:
+            os.remove(os.path.join(self.root, name))
+        except FileNotFoundError:
+            pass
+
+
+def partition_of(name):
+    return name.split("/")[0].split("=", 1)[1]
+
+
+def to_arrow(df):
+    # Every insight column is text; keep nulls as nulls rather than the string "nan"
+    arrays = {}
+    for column in df.columns:
+        if column == PARTITION_KEY:
+            continue
+        try:
+            arrays[column] = pa.array(df[column], type=pa.string(), from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            values = df[column].astype(object)
+            missing = values.isna()
+            arrays[column] = pa.array(values.where(missing, values.astype(str)).mask(missing, None), type=pa.string(), from_pandas=True)
+    return pa.table(arrays)
+
+
+def to_filter_expression(filters):
+    # Accepts a pyarrow expression or [(column, op, value), ...] in the pyarrow.parquet style
+    if filters is None or isinstance(filters, ds.Expression):
+        return filters
+    return pq.filters_to_expression(filters)
+
+
+class InsightStore:
+    def __init__(self, backend, cache_dir=None):
+        self.backend = backend
+        # A local backend is its own cache; remote ones mirror part files into cache_dir
+        self.cache_dir = backend.root if isinstance(backend, LocalBackend) else cache_dir or AEC_STORE_DIR
+        self.lock = threading.Lock()
+        # Part files never change once written (a rewrite is a new revision), so their schemas
+        # are read once per process rather than on every load
+        self._schemas = {}
+
+    def local_files(self):
+        return LocalBackend(self.cache_dir).list_files() if os.path.isdir(self.cache_dir) else []
+
+    def schema(self, name):
+        schema = self._schemas.get(name)
+        if schema is None:
+            schema = self._schemas[name] = pq.read_schema(os.path.join(self.cache_dir, name))
+        return schema
+
+    def compacted_from(self, name):
+        # The part files a compacted part replaces; [] for every other part
+        if not os.path.basename(name).startswith("compact-"):
+            return []
+        return json.loads((self.schema(name).metadata or {}).get(COMPACTED_FROM, b"[]"))
+
+    def superseded(self, files=None):
+        # Part files merged into one of the given (by default, the latest) compacted parts
+        files = latest_revisions(self.local_files()) if files is None else files
+        return {source for name in files for source in self.compacted_from(name)}
+
+    def current_files(self):
+        # Local part files minus the revisions a backfill has superseded and the parts a compaction
+        # has merged, which stay hidden even if a crash left them behind
+        files = latest_revisions(self.local_files())
+        merged = self.superseded(files)
+        return [name for name in files if name not in merged]
+
+    def unseen_files(self, seen):
+        # (parts to read, parts to just record) for a derived index that has taken in `seen`.
+        # A compacted part made only of parts it has seen holds nothing new for it
+        fresh, covered = [], []
+        for name in self.current_files():
+            if name not in seen:
+                sources = self.compacted_from(name)
+                (covered if sources and set(sources) <= seen else fresh).append(name)
+        return fresh, covered
+
+    def sync(self):
+        # Download only the part files this machine has not seen yet, and drop the ones deleted
+        # remotely (superseded revisions, compacted parts). Local files are listed first: an append
+        # writes the backend before the cache, so a part found locally is always in the remote list
+        if isinstance(self.backend, LocalBackend):
+            return 0
+        local = set(self.local_files())
+        remote = self.backend.list_files()
+        missing = [name for name in remote if name not in local]
+        cache = LocalBackend(self.cache_dir)
+        for name in missing:
+            cache.write_file(name, self.backend.read_file(name))
+        for name in local.difference(remote):
+            cache.delete_file(name)
+        return len(missing)
+
+    def append(self, df, ingest_date=None):
+        # Writes one new part file into today's partition. Nothing is written or
+        # uploaded when there are no rows, and existing files are never rewritten
+        if df is None or df.empty:
+            return None
+        ingest_date = ingest_date or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        now = datetime.now(timezone.utc).strftime("%H%M%S")
+        name = f"{PARTITION_KEY}={ingest_date}/part-{now}-{uuid.uuid4().hex[:8]}.parquet"
+
+        buffer = io.BytesIO()
+        pq.write_table(to_arrow(df), buffer, compression="zstd")
+        data = buffer.getvalue()
+
+        with self.lock, metrics.timer("store_write"):
+            self.backend.write_file(name, data)
+            if not isinstance(self.backend, LocalBackend):
+                LocalBackend(self.cache_dir).write_file(name, data)
+        metrics.incr("store_rows_written", len(df))
+        return name
+
+    def copy_file(self, name, data):
+        # Merges only: a part file written by another store (a shard of ingest.py) keeps its
+        # name, which is unique, so a merge can tell which parts it has copied already
+        with self.lock, metrics.timer("store_write"):
+            self.backend.write_file(name, data)
+            if not isinstance(self.backend, LocalBackend):
+                LocalBackend(self.cache_dir).write_file(name, data)
+
+    def replace_file(self, name, data):
+        # Backfills only: the new content is written as the next revision of the part, then the
+        # old revision is deleted. Readers pick the latest revision, so they never see both
+        base, revision = part_revision(name)
+        new_name = f"{base}.r{revision + 1}.parquet"
+        cache = LocalBackend(self.cache_dir)
+        with self.lock, metrics.timer("store_write"):
+            self.backend.write_file(new_name, data)
+            if not isinstance(self.backend, LocalBackend):
+                cache.write_file(new_name, data)
+            self.backend.delete_file(name)
+            cache.delete_file(name)
+        return new_name
+
+    def dataset(self, sync=True, dictionary_columns=None):
+        if sync:
+            self.sync()
+        files = self.current_files()
+        if not files:
+            return None
+        paths = [os.path.join(self.cache_dir, name) for name in files]
+        # Part files written at different times may carry different columns
+        schema = pa.unify_schemas([self.schema(name).remove_metadata() for name in files])
+        # Low-cardinality text can be decoded straight into dictionaries, which pandas keeps as categoricals
+        file_format = "parquet"
+        dictionary_columns = [column for column in dictionary_columns or [] if column in schema.names]
+        if dictionary_columns:
+            for column in dictionary_columns:
+                schema = schema.set(schema.get_field_index(column), pa.field(column, pa.dictionary(pa.int32(), pa.string())))
+            file_format = ds.ParquetFileFormat(read_options=ds.ParquetReadOptions(dictionary_columns=dictionary_columns))
+        schema = schema.append(pa.field(PARTITION_KEY, pa.string())) if PARTITION_KEY not in schema.names else schema
+        return ds.dataset(paths, schema=schema, format=file_format,
+                          partitioning=ds.partitioning(pa.schema([(PARTITION_KEY, pa.string())]), flavor="hive"),
+                          partition_base_dir=self.cache_dir)
+
+    def read(self, filters=None, columns=None, sync=True):
+        dataset = self.dataset(sync)
+        if dataset is None:
+            return pd.DataFrame()
+        with metrics.timer("store_read"):
+            table = dataset.to_table(columns=columns, filter=to_filter_expression(filters))
+            return table.to_pandas()
+
+    def read_files(self, names, columns=None):
+        # Just the given part files, for derived indexes that only need what is new to them
+        frames = []
+        for name in names:
+            wanted = [c for c in columns if c in self.schema(name).names] if columns else None
+            frames.append(pq.read_table(os.path.join(self.cache_dir, name), columns=wanted).to_pandas())
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def partitions(self, sync=True):
+        if sync:
+            self.sync()
+        return sorted({partition_of(name) for name in self.current_files()})
+
+    def compact(self, before=None, min_files=AEC_COMPACT_MIN_FILES):
+        # Every scheduler flush and ingest shard adds a small part file, and each one costs every
+        # load a file open. Date partitions older than `before` (default today, which is still being
+        # appended to) with at least min_files parts are merged into one part. Readers skip the old
+        # parts as soon as the merged one exists; they are deleted afterwards. The name is derived
+        # from the parts merged, so two machines compacting the same partition write the same file.
+        # Returns {partition: parts merged}
+        if not min_files:
+            return {}
+        self.sync()
+        before = before or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        partitions = {}
+        for name in self.current_files():
+            if partition_of(name) < before:
+                partitions.setdefault(partition_of(name), []).append(name)
+        merged = {}
+        for partition, names in sorted(partitions.items()):
+            if len(names) < min_files:
+                continue
+            schema = pa.unify_schemas([self.schema(name).remove_metadata() for name in names])
+            table = ds.dataset([os.path.join(self.cache_dir, name) for name in names], schema=schema, format="parquet").to_table()
+            sources = sorted({source for name in names for source in [name, *self.compacted_from(name)]})
+            digest = hashlib.sha1("\n".join(sources).encode("utf-8")).hexdigest()[:16]
+            name = f"{PARTITION_KEY}={partition}/compact-{digest}.parquet"
+
+            buffer = io.BytesIO()
+            pq.write_table(table.replace_schema_metadata({COMPACTED_FROM: json.dumps(sources)}), buffer, compression="zstd")
+            data = buffer.getvalue()
+            cache = LocalBackend(self.cache_dir)
+            with self.lock, metrics.timer("store_compact"):
+                try:
+                    self.backend.write_file(name, data)
+                except Exception:
+                    # Another machine wrote the same merge first
+                    if name not in self.backend.list_files():
+                        raise
+                if not isinstance(self.backend, LocalBackend):
+                    cache.write_file(name, data)
+                for source in names:
+                    self.backend.delete_file(source)
+                    cache.delete_file(source)
+            merged[partition] = len(names)
+        return merged
+
+
+_default_store = None
+
+
+def get_insight_store():
+    global _default_store
+    if _default_store is None:
+        if AEC_STORE_BACKEND == "local":
+            backend = LocalBackend(AEC_STORE_DIR)
+        else:
+            from azure_storage import BlobBackend
+            backend = BlobBackend()
+        _default_store = InsightStore(backend)
+    return _default_store
@@ -0,0 +1,137 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+AEC_JOBS_PATH = os.getenv("AEC_JOBS_PATH", ".cache/jobs.sqlite")
+
+# A job moves submitted/queued -> fetched -> analysed -> stored, or ends as skipped
+# (near-duplicate) or failed. Every transition is committed, so after a crash each
+# job is picked up again at the stage it had reached
+
+
+class JobStore:
+    def __init__(self, path=AEC_JOBS_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " key TEXT PRIMARY KEY, kind TEXT, source TEXT, url TEXT, guid TEXT, title TEXT,"
+                " summary TEXT, row TEXT, state TEXT, attempts INTEGER DEFAULT 0, note TEXT,"
+                " created REAL, updated REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS schedule ("
+                " source TEXT PRIMARY KEY, url TEXT, last_run REAL, last_status INTEGER)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def add(self, key, kind, source, url, guid=None, title=None, summary=None, state="queued"):
+        # False when the job already exists, whatever state it is in
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO jobs (key, kind, source, url, guid, title, summary, state, created, updated)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, kind, source, url, guid, title, summary, state, now, now),
+            )
+            self.conn.commit()
+        return cursor.rowcount == 1
+
+    def add_many(self, jobs, state="queued"):
+        # jobs: (key, kind, source, url) tuples, inserted in one transaction; returns how many were new
+        now = time.time()
+        with self.lock:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO jobs (key, kind, source, url, state, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(key, kind, source, url, state, now, now) for key, kind, source, url in jobs],
+            )
+            self.conn.commit()
+            return self.conn.total_changes - before
+
+    def get(self, key):
+        with self.lock:
+            cursor = self.conn.execute("SELECT * FROM jobs WHERE key = ?", (key,))
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        job = dict(zip([c[0] for c in cursor.description], row))
+        job["row"] = json.loads(job["row"]) if job["row"] else None
+        return job
+
+    def update(self, key, state, **fields):
+        if "row" in fields and fields["row"] is not None:
+            fields["row"] = json.dumps(fields["row"])
+        columns = ["state", "updated", *fields]
+        values = [state, time.time(), *fields.values()]
+        with self.lock:
+            self.conn.execute(
+                f"UPDATE jobs SET {', '.join(f'{c} = ?' for c in columns)} WHERE key = ?",
+                (*values, key),
+            )
+            self.conn.commit()
+
+    def fail(self, key, error):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET state = 'failed', attempts = attempts + 1, note = ?, updated = ? WHERE key = ?",
+                (str(error)[:500], time.time(), key),
+            )
+            self.conn.commit()
+
+    def keys(self, state):
+        with self.lock:
+            return [key for (key,) in self.conn.execute(
+                "SELECT key FROM jobs WHERE state = ? ORDER BY created", (state,))]
+
+    def retryable(self, max_attempts, delay):
+        with self.lock:
+            return [key for (key,) in self.conn.execute(
+                "SELECT key FROM jobs WHERE state = 'failed' AND attempts < ? AND updated <= ? ORDER BY created",
+                (max_attempts, time.time() - delay))]
+
+    def counts(self):
+        with self.lock:
+            return dict(self.conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+
+    def last_run(self, source):
+        with self.lock:
+            row = self.conn.execute("SELECT last_run FROM schedule WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else 0.0
+
+    def record_poll(self, source, url, status=None):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO schedule (source, url, last_run, last_status) VALUES (?, ?, ?, ?)",
+                (source, url, time.time(), status),
+            )
+            self.conn.commit()
+
+
+def submit_url(url, retry=False, jobs=None):
+    # How the dashboard asks for an article: the scheduler daemon picks the job up on its next tick.
+    # Submitting the same URL again is a no-op unless retry is set and the last attempt failed
+    jobs = jobs or job_store
+    if not jobs.add(url, "url", "User Input", url, state="submitted") and retry:
+        if jobs.get(url)["state"] == "failed":
+            jobs.update(url, "submitted", attempts=0, note=None)
+
+
+job_store = JobStore()
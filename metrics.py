@@ -0,0 +1,195 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+AEC_METRICS_LOG = os.getenv("AEC_METRICS_LOG")
+AEC_METRICS_PROM_PATH = os.getenv("AEC_METRICS_PROM_PATH")
+# USD per 1K tokens; defaults are GPT-4o list prices
+AEC_PROMPT_PRICE_PER_1K = float(os.getenv("AEC_PROMPT_PRICE_PER_1K", "0.0025"))
+AEC_COMPLETION_PRICE_PER_1K = float(os.getenv("AEC_COMPLETION_PRICE_PER_1K", "0.01"))
+MAX_SAMPLES = 50_000
+
+logger = logging.getLogger("aec.metrics")
+if AEC_METRICS_LOG:
+    _handler = logging.FileHandler(AEC_METRICS_LOG)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def format_labels(key, extra=()):
+    pairs = [*key, *extra]
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Metrics:
+    # Stage timers keep their most recent samples for percentiles; counters and gauges are
+    # plain numbers keyed by (name, labels). Every recorded event is also written to the
+    # "aec.metrics" logger as one JSON line
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))
+        self.timer_totals = defaultdict(lambda: [0, 0.0])
+        self.counters = defaultdict(float)
+        self.gauges = {}
+
+    def log(self, event, **fields):
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({"ts": round(time.time(), 3), "event": event, **fields}, default=str))
+
+    def observe(self, stage, seconds, **labels):
+        now = time.monotonic()
+        with self.lock:
+            self.samples[stage].append((now, seconds))
+            totals = self.timer_totals[stage]
+            totals[0] += 1
+            totals[1] += seconds
+        self.log("stage", stage=stage, seconds=round(seconds, 6), **labels)
+
+    @contextmanager
+    def timer(self, stage, **labels):
+        # Failures are timed too and counted under failures_total{stage=...}
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.incr("failures", stage=stage, error=type(e).__name__)
+            self.observe(stage, time.perf_counter() - start, ok=False, **labels)
+            raise
+        self.observe(stage, time.perf_counter() - start, **labels)
+
+    def incr(self, name, value=1, **labels):
+        with self.lock:
+            self.counters[(name, label_key(labels))] += value
+        self.log("counter", name=name, value=value, **labels)
+
+    def gauge(self, name, value, **labels):
+        with self.lock:
+            self.gauges[(name, label_key(labels))] = value
+
+    def record_usage(self, usage, **labels):
+        # usage is the OpenAI response .usage object
+        if usage is None:
+            return
+        self.incr("llm_prompt_tokens", usage.prompt_tokens, **labels)
+        self.incr("llm_completion_tokens", usage.completion_tokens, **labels)
+
+    def counter(self, name, since=None, **labels):
+        # Sum over every label set that contains the given labels
+        wanted = set(label_key(labels))
+        with self.lock:
+            total = sum(v for (n, key), v in self.counters.items() if n == name and wanted <= set(key))
+        if since is not None:
+            total -= sum(v for (n, key), v in since["counters"].items() if n == name and wanted <= set(key))
+        return total
+
+    def snapshot(self):
+        # Mark the start of a run; pass it to summary(since=...) to report just that run
+        with self.lock:
+            return {"at": time.monotonic(), "counters": dict(self.counters)}
+
+    def stage_stats(self, since=None):
+        start = since["at"] if since else float("-inf")
+        with self.lock:
+            samples = {stage: [s for t, s in values if t >= start] for stage, values in self.samples.items()}
+        stats = {}
+        for stage, values in sorted(samples.items()):
+            if values:
+                p50, p95 = np.percentile(values, [50, 95])
+                stats[stage] = {"count": len(values), "p50": p50, "p95": p95, "total": sum(values)}
+        return stats
+
+    def cost(self, since=None):
+        prompt = self.counter("llm_prompt_tokens", since)
+        completion = self.counter("llm_completion_tokens", since)
+        return prompt, completion, prompt / 1000 * AEC_PROMPT_PRICE_PER_1K + completion / 1000 * AEC_COMPLETION_PRICE_PER_1K
+
+    def summary(self, since=None):
+        articles = self.counter("articles_analysed", since)
+        hits = self.counter("insight_cache", since, result="hit")
+        misses = self.counter("insight_cache", since, result="miss")
+        prompt, completion, cost = self.cost(since)
+        return {
+            "stages": self.stage_stats(since),
+            "articles": articles,
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "cost_usd": cost,
+            "cost_per_article_usd": cost / articles if articles else 0.0,
+            "cache_hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "failures": self.counter("failures", since),
+        }
+
+    def print_summary(self, since=None):
+        summary = self.summary(since)
+        print(f"{'stage':<18} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'total s':>9}")
+        for stage, s in summary["stages"].items():
+            print(f"{stage:<18} {s['count']:>7} {s['p50'] * 1000:>9.1f} {s['p95'] * 1000:>9.1f} {s['total']:>9.2f}")
+        print(f"📊 {summary['articles']:.0f} articles, {summary['prompt_tokens']:.0f} prompt + "
+              f"{summary['completion_tokens']:.0f} completion tokens, ${summary['cost_usd']:.4f} "
+              f"(${summary['cost_per_article_usd']:.5f}/article), cache hit rate {summary['cache_hit_rate']:.0%}, "
+              f"{summary['failures']:.0f} failures")
+        self.log("summary", **{k: v for k, v in summary.items() if k != "stages"}, stages=summary["stages"])
+        return summary
+
+    def prometheus_text(self):
+        lines = []
+        with self.lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            samples = {stage: [s for _, s in values] for stage, values in self.samples.items()}
+            totals = {stage: tuple(t) for stage, t in self.timer_totals.items()}
+
+        for name in sorted({n for n, _ in counters}):
+            lines.append(f"# TYPE aec_{name}_total counter")
+            for (n, key), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"aec_{name}_total{format_labels(key)} {value:g}")
+        for name in sorted({n for n, _ in gauges}):
+            lines.append(f"# TYPE aec_{name} gauge")
+            for (n, key), value in sorted(gauges.items()):
+                if n == name:
+                    lines.append(f"aec_{name}{format_labels(key)} {value:g}")
+        if totals:
+            # Quantiles cover the most recent MAX_SAMPLES samples; _sum and _count cover everything
+            lines.append("# TYPE aec_stage_seconds summary")
+            for stage in sorted(totals):
+                key = (("stage", stage),)
+                if samples.get(stage):
+                    for q, value in zip(("0.5", "0.95"), np.percentile(samples[stage], [50, 95])):
+                        lines.append(f"aec_stage_seconds{format_labels(key, [('quantile', q)])} {value:.6f}")
+                lines.append(f"aec_stage_seconds_sum{format_labels(key)} {totals[stage][1]:.6f}")
+                lines.append(f"aec_stage_seconds_count{format_labels(key)} {totals[stage][0]}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path=None):
+        # Node-exporter textfile collector style: replace the file atomically
+        path = path or AEC_METRICS_PROM_PATH
+        if not path:
+            return
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+
+
+metrics = Metrics()
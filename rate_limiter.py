@@ -0,0 +1,161 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from dotenv import load_dotenv
+
+from metrics import metrics
+
+load_dotenv()
+
+AZURE_OPENAI_RPM = int(os.getenv("AZURE_OPENAI_RPM", "360"))
+AZURE_OPENAI_TPM = int(os.getenv("AZURE_OPENAI_TPM", "60000"))
+AZURE_OPENAI_MAX_RETRIES = int(os.getenv("AZURE_OPENAI_MAX_RETRIES", "6"))
+
+
+class TokenBucket:
+    def __init__(self, capacity, per_seconds=60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / per_seconds
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        # Take the tokens straight away (the balance may go negative) and return
+        # how long the caller has to wait until that debt is paid back
+        amount = min(float(amount), self.capacity)
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def refund(self, amount):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+    def clamp(self, remaining):
+        # The server knows better than we do how much quota is left
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, float(remaining))
+
+
+class RateLimiter:
+    def __init__(self, rpm=AZURE_OPENAI_RPM, tpm=AZURE_OPENAI_TPM):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens):
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        with self.lock:
+            wait = max(wait, self.blocked_until - time.monotonic())
+        if wait > 0:
+            metrics.observe("llm_wait", wait)
+            time.sleep(wait)
+
+    def penalize(self, seconds):
+        # Pause every caller sharing this limiter, not just the one that got the 429
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def observe(self, headers):
+        remaining_requests = headers.get("x-ratelimit-remaining-requests")
+        remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+        if remaining_requests is not None:
+            self.requests.clamp(remaining_requests)
+        if remaining_tokens is not None:
+            self.tokens.clamp(remaining_tokens)
+
+
+def estimate_tokens(messages, max_tokens):
+    # ~4 characters per token is close enough for budgeting; the reservation is
+    # corrected from response.usage once the call returns
+    prompt_chars = sum(len(m["content"]) for m in messages)
+    return prompt_chars // 4 + 4 * len(messages) + max_tokens
+
+
+def retry_after_seconds(headers):
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is not None:
+        try:
+            return float(value)
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return None
+
+
+def is_retryable(error):
+    # Imported here rather than at module load; an openai error means the package is loaded already
+    import openai
+
+    if isinstance(error, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+def rate_limited_completion(client, messages, max_tokens, limiter=None, max_retries=AZURE_OPENAI_MAX_RETRIES,
+                            stage="llm", **kwargs):
+    # stage names the timer and token counters this call is recorded under
+    limiter = limiter or default_limiter
+    reserved = estimate_tokens(messages, max_tokens)
+
+    for attempt in range(max_retries + 1):
+        limiter.acquire(reserved)
+        # Timed by hand rather than with metrics.timer: an attempt that is retried is counted under
+        # llm_retries, and only a call that finally fails counts as a failure of the stage
+        start = time.perf_counter()
+        try:
+            raw = client.chat.completions.with_raw_response.create(
+                messages=messages, max_tokens=max_tokens, **kwargs
+            )
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                metrics.incr("failures", stage=stage, error=type(e).__name__)
+                metrics.observe(stage, time.perf_counter() - start, ok=False)
+                # A failed call used no tokens
+                limiter.tokens.refund(reserved)
+                raise
+            metrics.incr("llm_retries", stage=stage, error=type(e).__name__)
+            response = getattr(e, "response", None)
+            delay = retry_after_seconds(response.headers if response is not None else None)
+            if delay is None:
+                delay = min(60.0, 2 ** attempt) * (0.5 + random.random())
+            print(f"⏳ Azure OpenAI {type(e).__name__}, retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})")
+            limiter.tokens.refund(reserved)
+            limiter.penalize(delay)
+            continue
+
+        metrics.observe(stage, time.perf_counter() - start)
+        limiter.observe(raw.headers)
+        completion = raw.parse()
+        usage = getattr(completion, "usage", None)
+        metrics.record_usage(usage, stage=stage)
+        if usage is not None and usage.total_tokens < reserved:
+            limiter.tokens.refund(reserved - usage.total_tokens)
+        return completion
+
+
+default_limiter = RateLimiter()
@@ -0,0 +1,474 @@
+import argparse
+import os
+import queue
+import signal
+import threading
+import time
+import zlib
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from aec_agent import (
+    BATCH_SIZE, MAX_LLM_CONCURRENCY, analyse_article, analyse_document, analyse_feed_batch, build_feed_row, build_manual_row,
+    fetch_feed, fetch_feed_article, is_duplicate_article, read_manual_page, rss_feeds,
+)
+from dedup_index import dedup_index, document_key
+from document_reader import list_documents
+from feed_index import entry_keys, feed_index, manual_page_key
+from http_client import http_client
+from insight_rollups import insight_rollups
+from insight_store import AEC_STORE_BACKEND, LocalBackend, get_insight_store
+from job_store import job_store
+from metrics import metrics
+from vector_index import vector_index
+
+# Standalone ingestion daemon. Each feed is polled on its own interval and every new entry
+# becomes a persisted job that flows through bounded queues:
+#   poll -> fetch (AEC_FETCH_WORKERS threads) -> analyse (one thread per LLM slot) -> write
+# A full queue blocks the stage feeding it, so a slow LLM throttles fetching instead of
+# piling articles up in memory. The dashboard only reads the store and submits URLs as jobs.
+#   python scheduler.py                      # run forever
+#   python scheduler.py --once               # poll every feed once, drain the queues, exit
+#   python scheduler.py --once --manual-dir docs/   # also analyse every internal document under docs/
+#   python scheduler.py --compact            # merge the small part files of past days, then exit
+
+load_dotenv()
+
+AEC_FEED_INTERVAL_SECONDS = float(os.getenv("AEC_FEED_INTERVAL_SECONDS", "1800"))
+AEC_FETCH_WORKERS = int(os.getenv("AEC_FETCH_WORKERS", "8"))
+AEC_QUEUE_SIZE = int(os.getenv("AEC_QUEUE_SIZE", "64"))
+AEC_FLUSH_ROWS = int(os.getenv("AEC_FLUSH_ROWS", "50"))
+AEC_FLUSH_SECONDS = float(os.getenv("AEC_FLUSH_SECONDS", "30"))
+AEC_BATCH_WAIT_SECONDS = float(os.getenv("AEC_BATCH_WAIT_SECONDS", "2"))
+AEC_COMPACT_INTERVAL_SECONDS = float(os.getenv("AEC_COMPACT_INTERVAL_SECONDS", "86400"))
+AEC_JOB_MAX_ATTEMPTS = int(os.getenv("AEC_JOB_MAX_ATTEMPTS", "3"))
+AEC_JOB_RETRY_SECONDS = float(os.getenv("AEC_JOB_RETRY_SECONDS", "300"))
+MANUAL_PAGES = ["SkyResidenceDawson"]
+
+
+def shard_of(key, count):
+    # Stable across processes and machines, unlike hash(); ingest.py splits its inputs with it
+    return zlib.crc32(key.encode("utf-8")) % count
+
+
+def job_entry(job):
+    # Just enough of a feedparser entry for build_feed_row, entry_keys and the RSS fallback
+    import feedparser
+
+    return feedparser.FeedParserDict(title=job["title"] or "", link=job["url"], id=job["guid"], summary=job["summary"] or "")
+
+
+def fetch_url_article(url):
+    # Same extraction the dashboard used to run inline for pasted links. newspaper's own download()
+    # refused 4xx/5xx pages; raising here sends the job to failed and retry instead of the model
+    from newspaper import Article
+
+    res = http_client.get(url, timeout=10)
+    res.raise_for_status()
+    article = Article(url)
+    article.download(input_html=res.text)
+    article.parse()
+    return {"title": article.title, "summary": article.text[:500]}
+
+
+def migrate_legacy_csv(store):
+    # One-off: an empty blob-backed store starts from the old insights.csv
+    if AEC_STORE_BACKEND == "local" or isinstance(store.backend, LocalBackend) or store.partitions():
+        return 0
+    from azure_storage import load_insights_from_blob
+
+    df = load_insights_from_blob()
+    store.append(df)
+    return len(df)
+
+
+class Scheduler:
+    def __init__(self, feeds=None, intervals=None, manual_pages=None, jobs=None, store=None, max_per_feed=5,
+                 fetch_workers=AEC_FETCH_WORKERS, analyse_workers=MAX_LLM_CONCURRENCY, queue_size=AEC_QUEUE_SIZE,
+                 batch_size=None, batch_wait=AEC_BATCH_WAIT_SECONDS, flush_rows=AEC_FLUSH_ROWS,
+                 flush_seconds=AEC_FLUSH_SECONDS, tick=1.0, shard=None, indexes=True):
+        self.feeds = dict(rss_feeds if feeds is None else feeds)
+        self.intervals = intervals or {}
+        self.manual_pages = MANUAL_PAGES if manual_pages is None else manual_pages
+        self.jobs = jobs or job_store
+        self.store = store or get_insight_store()
+        self.max_per_feed = max_per_feed
+        self.fetch_workers = fetch_workers
+        self.analyse_workers = analyse_workers
+        self.batch_size = batch_size or BATCH_SIZE
+        self.batch_wait = batch_wait
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.tick = tick
+        # (index, count): only feed entries whose link falls in this shard become jobs
+        self.shard = shard
+        # Batch runs leave the chart rollups and the search index to whoever serves the dashboard
+        self.indexes = indexes
+
+        self.fetch_queue = queue.Queue(queue_size)
+        self.analyse_queue = queue.Queue(queue_size)
+        self.write_queue = queue.Queue(queue_size)
+        self.stopping = threading.Event()
+        self.draining = False
+        self.lock = threading.Lock()
+        # One analyse worker gathers a batch at a time, so concurrent workers do not split it between them
+        self.batch_lock = threading.Lock()
+        self.inflight = set()
+        self.threads = []
+
+    def interval(self, source):
+        return self.intervals.get(source, AEC_FEED_INTERVAL_SECONDS)
+
+    def owns(self, key):
+        return self.shard is None or shard_of(key, self.shard[1]) == self.shard[0]
+
+    # Queue plumbing. A key is in flight from the moment it is queued until its job
+    # reaches stored, skipped or failed, which stops resume and retry from queueing it twice
+
+    def _put(self, q, key):
+        while not self.stopping.is_set():
+            try:
+                q.put(key, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        # Shutting down: the job keeps its persisted state and is resumed on the next start
+        self._release(key)
+        return False
+
+    def _take(self, q):
+        try:
+            return q.get(timeout=0.2)
+        except queue.Empty:
+            return None
+
+    def _enqueue(self, q, key):
+        with self.lock:
+            if key in self.inflight:
+                return False
+            self.inflight.add(key)
+        return self._put(q, key)
+
+    def _release(self, key):
+        with self.lock:
+            self.inflight.discard(key)
+
+    def idle(self):
+        with self.lock:
+            return not self.inflight
+
+    def _finish(self, job, state, **fields):
+        # Stored or skipped: the feed index remembers the entry so later polls ignore it
+        self.jobs.update(job["key"], state, **fields)
+        metrics.incr("jobs_finished", kind=job["kind"], state=state)
+        if job["kind"] == "feed":
+            feed_index.mark_seen(entry_keys(job_entry(job)), job["source"])
+        elif job["kind"] == "manual":
+            feed_index.mark_seen([job["key"]], job["source"])
+        self._release(job["key"])
+
+    def _fail(self, job, error):
+        print(f"❌ Job failed ({job['kind']}) {job['key']}: {error}")
+        metrics.incr("jobs_finished", kind=job["kind"], state="failed")
+        self.jobs.fail(job["key"], error)
+        self._release(job["key"])
+
+    # Stages
+
+    def _resume(self):
+        # Pick every unfinished job up at the stage it had reached before the last shutdown
+        for state, q in (("queued", self.fetch_queue), ("fetched", self.analyse_queue), ("analysed", self.write_queue)):
+            keys = self.jobs.keys(state)
+            if keys:
+                print(f"♻️ Resuming {len(keys)} {state} jobs")
+            for key in keys:
+                self._enqueue(q, key)
+
+        for name in self.manual_pages:
+            try:
+                key = manual_page_key(name)
+            except OSError as e:
+                print(f"❌ Failed to process {name}.txt: {e}")
+                continue
+            if not feed_index.is_seen([key]) and self.jobs.add(key, "manual", name, "Manual Upload"):
+                self._enqueue(self.fetch_queue, key)
+
+    def poll_feed(self, source, url):
+        status = None
+        try:
+            feed = fetch_feed(url, incremental=True)
+            status = feed.get("status")
+            if status == 304:
+                print(f"💤 No changes: {source}")
+            else:
+                new = 0
+                for entry in feed.entries[:self.max_per_feed]:
+                    if not entry.get("link") or not self.owns(entry.link) or feed_index.is_seen(entry_keys(entry)):
+                        continue
+                    if self.jobs.add(entry.link, "feed", source, entry.link, guid=entry.get("id"),
+                                     title=entry.get("title"), summary=entry.get("summary")):
+                        new += 1
+                        self._enqueue(self.fetch_queue, entry.link)
+                # The entries are persisted jobs now, so the validators can be saved straight away
+                feed_index.save_validators(url, feed.get("etag"), feed.get("modified"))
+                print(f"📡 {source}: {new} new entries")
+        except Exception as e:
+            print(f"❌ Failed to poll {source}: {e}")
+        self.jobs.record_poll(source, url, status)
+
+    def _poll_loop(self, once=False):
+        self._resume()
+        while not self.stopping.is_set():
+            for source, url in self.feeds.items():
+                if self.stopping.is_set():
+                    break
+                # Due-ness is worked out from the last poll, so a changed interval applies straight away
+                if once or time.time() >= self.jobs.last_run(source) + self.interval(source):
+                    self.poll_feed(source, url)
+
+            # URLs submitted from the dashboard, then failures whose back-off has passed
+            for key in self.jobs.keys("submitted") + self.jobs.retryable(AEC_JOB_MAX_ATTEMPTS, AEC_JOB_RETRY_SECONDS):
+                self.jobs.update(key, "queued")
+                self._enqueue(self.fetch_queue, key)
+
+            self.report()
+            if once:
+                return
+            self.stopping.wait(self.tick)
+
+    def report(self):
+        for name, q in (("fetch", self.fetch_queue), ("analyse", self.analyse_queue), ("write", self.write_queue)):
+            metrics.gauge("queue_depth", q.qsize(), stage=name)
+        with self.lock:
+            metrics.gauge("jobs_in_flight", len(self.inflight))
+        metrics.write_prometheus()
+
+    def fetch(self, job):
+        if job["kind"] == "manual":
+            return read_manual_page(job["source"])
+        if job["kind"] == "url":
+            return fetch_url_article(job["url"])
+        return fetch_feed_article(job_entry(job))
+
+    def _fetch_loop(self):
+        while not self.stopping.is_set():
+            key = self._take(self.fetch_queue)
+            if key is None:
+                continue
+            job = self.jobs.get(key)
+            try:
+                article = self.fetch(job)
+            except Exception as e:
+                self._fail(job, e)
+                continue
+            self.jobs.update(key, "fetched", title=article["title"], summary=article["summary"])
+            self._put(self.analyse_queue, key)
+
+    def _analyse(self, jobs):
+        # Several feed or URL articles share one chat completion when batch_size > 1;
+        # internal documents always go alone because their row carries fixed overrides
+        try:
+            if len(jobs) > 1:
+                rows = analyse_feed_batch([(job["source"], job_entry(job), job) for job in jobs])
+            else:
+                job = jobs[0]
+                key = document_key(job["url"], job["source"])
+                if job["kind"] == "manual":
+                    insight = analyse_document(key, job["source"], job["title"])
+                    rows = [build_manual_row(job["source"], job["title"], insight)]
+                else:
+                    insight = analyse_article(key, job["title"], job["summary"])
+                    rows = [build_feed_row(job["source"], job_entry(job), job["title"], insight)]
+        except Exception as e:
+            for job in jobs:
+                self._fail(job, e)
+            return
+        for job, row in zip(jobs, rows):
+            self.jobs.update(job["key"], "analysed", row=row)
+            self._put(self.write_queue, job["key"])
+
+    def _take_batch(self):
+        # Fetch workers hand articles over one at a time, so after the first one the batch waits up
+        # to batch_wait for the rest instead of going out with whatever happened to be queued already
+        with self.batch_lock:
+            key = self._take(self.analyse_queue)
+            if key is None:
+                return []
+            keys = [key]
+            deadline = time.monotonic() + self.batch_wait
+            while len(keys) < self.batch_size and not self.stopping.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    keys.append(self.analyse_queue.get(timeout=min(remaining, 0.2)))
+                except queue.Empty:
+                    continue
+            return keys
+
+    def _analyse_loop(self):
+        while not self.stopping.is_set():
+            keys = self._take_batch()
+            if not keys:
+                continue
+
+            articles, manual = [], []
+            for job in map(self.jobs.get, keys):
+                if is_duplicate_article(document_key(job["url"], job["source"]), job["title"], job["summary"]):
+                    self._finish(job, "skipped", note="near-duplicate of an analysed article")
+                elif job["kind"] == "manual":
+                    manual.append(job)
+                else:
+                    articles.append(job)
+            for job in manual:
+                self._analyse([job])
+            if articles:
+                self._analyse(articles)
+
+    def flush(self, keys):
+        jobs = [self.jobs.get(key) for key in keys]
+        try:
+            # Stored with the signature each article was claimed with, for dedup_index.sync elsewhere
+            df = dedup_index.with_signatures(pd.DataFrame([job["row"] for job in jobs]))
+            part = self.store.append(df)
+        except Exception as e:
+            for job in jobs:
+                self._fail(job, e)
+            return
+        if self.indexes:
+            try:
+                insight_rollups.add(df, part)
+            except Exception as e:
+                # The next sync counts the part file instead
+                print(f"❌ Failed to update rollups: {e}")
+            try:
+                vector_index.add(df, part)
+            except Exception as e:
+                # The next sync embeds the part file instead
+                print(f"❌ Failed to update the search index: {e}")
+        for job in jobs:
+            self._finish(job, "stored")
+        print(f"💾 Stored {len(jobs)} insights")
+
+    def _drained(self, pending):
+        # Nothing left upstream of the writer
+        with self.lock:
+            return len(self.inflight) == len(pending)
+
+    def _write_loop(self):
+        # Rows are gathered into one part file per flush_rows rows or flush_seconds, whichever comes first
+        # (or as soon as the other stages are empty during --once). A crash before the flush leaves the
+        # jobs "analysed", and they are written on the next start
+        pending, first = [], None
+        while True:
+            key = self._take(self.write_queue)
+            if key is not None:
+                pending.append(key)
+                first = first or time.monotonic()
+            stopping = self.stopping.is_set()
+            if pending and (stopping or len(pending) >= self.flush_rows or time.monotonic() - first >= self.flush_seconds
+                            or (self.draining and key is None and self._drained(pending))):
+                self.flush(pending)
+                pending, first = [], None
+            if stopping and key is None:
+                return
+
+    def start(self, once=False):
+        self.started = metrics.snapshot()
+        migrated = migrate_legacy_csv(self.store)
+        if migrated:
+            print(f"📦 Migrated {migrated} rows from insights.csv")
+        # Rows written elsewhere (another machine, the migration) count for dedup, the chart rollups and search too
+        dedup_index.sync(self.store)
+        if self.indexes:
+            insight_rollups.sync(self.store)
+            vector_index.sync(self.store)
+
+        workers = [("poll", lambda: self._poll_loop(once), 1), ("fetch", self._fetch_loop, self.fetch_workers),
+                   ("analyse", self._analyse_loop, self.analyse_workers), ("write", self._write_loop, 1)]
+        for name, target, count in workers:
+            for k in range(count):
+                thread = threading.Thread(target=target, name=f"scheduler-{name}-{k}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def stop(self):
+        # In-flight LLM calls are allowed to finish; anything unwritten is resumed on the next start
+        self.stopping.set()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        http_client.print_metrics()
+        metrics.print_summary(since=self.started)
+        self.report()
+        print(f"📋 Jobs: {self.jobs.counts()}")
+
+    def run_once(self):
+        self.draining = True
+        self.start(once=True)
+        self.threads[0].join()
+        while not self.idle():
+            time.sleep(0.1)
+        self.stop()
+
+    def compact(self):
+        try:
+            merged = self.store.compact()
+        except Exception as e:
+            print(f"❌ Failed to compact the insight store: {e}")
+            return
+        if merged:
+            print(f"🗜️ Compacted {sum(merged.values())} part files in {len(merged)} partitions")
+
+    def run_forever(self):
+        signal.signal(signal.SIGTERM, lambda *_: self.stopping.set())
+        self.start()
+        # The daemon serving the dashboard also merges each past day's part files, once a day
+        next_compaction = time.monotonic() if self.indexes else float("inf")
+        try:
+            while not self.stopping.wait(1):
+                if time.monotonic() >= next_compaction:
+                    self.compact()
+                    next_compaction = time.monotonic() + AEC_COMPACT_INTERVAL_SECONDS
+        except KeyboardInterrupt:
+            pass
+        self.stop()
+
+
+def parse_pairs(values):
+    pairs = {}
+    for value in values or []:
+        name, sep, rest = value.rpartition("=")
+        if not sep:
+            raise SystemExit(f"expected NAME=VALUE, got {value!r}")
+        pairs[name] = rest
+    return pairs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AEC insight ingestion scheduler")
+    parser.add_argument("--once", action="store_true", help="poll every feed once, drain the queues and exit")
+    parser.add_argument("--feed", action="append", metavar="NAME=URL", help="replace rss_feeds (repeatable)")
+    parser.add_argument("--interval", action="append", metavar="NAME=SECONDS", help="per-feed poll interval")
+    parser.add_argument("--manual", action="append", metavar="NAME", help="internal documents to analyse once")
+    parser.add_argument("--manual-dir", action="append", metavar="DIR", help="analyse every .txt document under DIR once")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--compact", action="store_true", help="merge the small part files of past days and exit")
+    args = parser.parse_args()
+
+    manual_pages = args.manual
+    if args.manual_dir:
+        manual_pages = [*(manual_pages or []), *(name for directory in args.manual_dir for name in list_documents(directory))]
+    scheduler = Scheduler(
+        feeds=parse_pairs(args.feed) or None,
+        intervals={name: float(seconds) for name, seconds in parse_pairs(args.interval).items()},
+        manual_pages=manual_pages,
+        batch_size=args.batch_size,
+    )
+    if args.compact:
+        scheduler.compact()
+    elif args.once:
+        scheduler.run_once()
+    else:
+        scheduler.run_forever()
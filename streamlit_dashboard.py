@@ -1,14 +1,12 @@
 import streamlit as st
 import pandas as pd
-import re
-from newspaper import Article
 import plotly.express as px
-from collections import Counter
-from wordcloud import WordCloud, STOPWORDS
-import matplotlib.pyplot as plt
-from difflib import SequenceMatcher
-from aec_agent import normalize_signal_strength, run_news_insight_agent, ultimate_aec_market_intelligence_prompt, rss_feeds
-from azure_storage import load_insights_from_blob, upload_insights_to_blob
+from dashboard_data import (
+    load_insights, raw_insight, refresh_insights, search_insights, similar_insights, wait_for_insights, word_cloud,
+)
+from insight_rollups import insight_rollups
+from job_store import job_store, submit_url
+from vector_index import vector_index
 
 
 
@@ -16,18 +14,20 @@ st.set_page_config(page_title="AEC Market Intelligence Dashboard", layout="wide"
 
 st.title("🏗️ AEC Market Intelligence Dashboard")
 
-# Load insights CSV
-def get_predefined_data():
-    df = load_insights_from_blob()
-    if not df.empty:
-        return df
-    else:
-        manual_pages = ["SkyResidenceDawson"]
-        df = run_news_insight_agent(rss_feeds, manual_pages=manual_pages)
-        upload_insights_to_blob(df)  
-        return df
+# Insights come from an in-memory cache shared by all sessions. The page never ingests anything
+# itself: scheduler.py fills the store and pasted links are handed to it as jobs
+df = load_insights()
 
-df = get_predefined_data()
+if df.empty:
+    st.info("⏳ No insights stored yet. Start the ingestion scheduler (`python scheduler.py`) and this page will update once the first insights are stored.")
+    wait_for_insights()
+    st.stop()
+
+with st.sidebar:
+    if st.button("🔄 Refresh data"):
+        refresh_insights()
+        st.rerun()
+    st.caption(f"Data loaded {df.attrs['loaded_at']:%d %b %Y, %H:%M}")
 
 
 st.sidebar.header("🔎 Analyze an Article")
@@ -36,92 +36,35 @@ user_url = st.sidebar.text_input(label="Add an Article...", placeholder="Paste a
         
 st.sidebar.markdown("<div style='margin-bottom: 10px;'></div>", unsafe_allow_html=True)
 
-parsed = None
-custom_result = None
-if user_url:
-    with st.spinner("Extracting insights..."):
-        try:
-            article = Article(user_url)
-            article.download()
-            article.parse()
-
-            title = article.title
-            summary = article.text[:500]  
-
-            insight = ultimate_aec_market_intelligence_prompt(title, summary)
-
-            parsed = {
-                "Source": "User Input", "Title": title, "URL": user_url, "raw_insight": insight,
-                "Summary": summary, "Source Type": "", "Category": "", "Entity Involved": "", "City": "", "Country": "", "Sector": "",
-                "Project or Initiative Name": "", "Project Status": "", "Strategic Insight Summary": "",
-                "Signal Strength": "", "Action Recommendation": ""
-            }
-
-            for line in insight.splitlines():
-                match = re.match(r"\d+\.\s+\*\*(.*?)\*\*:\s*(.*)", line)
-                if match:
-                    key, value = match.groups()
-                    if value.endswith('.'):
-                        value = value[:-1]
-                    if key == "Signal Strength":
-                        value = normalize_signal_strength(value)
-                    if key in parsed:
-                        parsed[key] = value.strip()
-                    
-
-        except Exception as e:
-            st.error(f"Error: {str(e)}")
-
-# Similarity checker
-def is_duplicate_summary(new_summary, existing_summaries, threshold=0.8):
-    for summary in existing_summaries:
-        similarity = SequenceMatcher(None, new_summary, summary).ratio()
-        if similarity > threshold:
-            return True
-    return False
-
-if parsed is not None:
-    new_summary = parsed["Summary"]
-
-    # Handle case when custom_result is None or empty
-    if custom_result is None or custom_result.empty:
-        custom_result = pd.DataFrame([parsed])
+
+@st.fragment(run_every=3)
+def show_submission_status(url):
+    job = job_store.get(url)
+    state = job["state"] if job else "submitted"
+    if state == "stored":
+        if url not in set(df["URL"].dropna()):
+            refresh_insights()
+            st.rerun(scope="app")
         st.success("Insight added!")
+    elif state == "skipped":
+        st.warning("⚠️ Similar insight already exists. Skipping duplicate entry.")
+    elif state == "failed":
+        st.error(f"Error: {job['note']}")
+        if st.button("Retry"):
+            submit_url(url, retry=True)
+            st.rerun()
     else:
-        existing_summaries = df["Summary"].tolist()
-        if not is_duplicate_summary(new_summary, existing_summaries):
-            custom_result = pd.concat([custom_result, pd.DataFrame([parsed])], ignore_index=True)
-            st.success("Insight added!")
-        else:
-            st.warning("⚠️ Similar insight already exists. Skipping duplicate entry.")
-
-if custom_result is not None:
-    df = pd.concat([df, pd.DataFrame([parsed])], ignore_index=True)
-
-# if parsed is not None:
-#     new_summary = parsed["Summary"]
-#     existing_summaries = df["Summary"].tolist() if not df.empty else []
+        st.info(f"⏳ Extracting insights... ({state})")
 
-#     if not is_duplicate_summary(new_summary, existing_summaries):
-#         new_row = pd.DataFrame([parsed])
-#         custom_result = pd.concat([custom_result, new_row], ignore_index=True)
-#         df = pd.concat([df, new_row], ignore_index=True)
-#         st.success("✅ Insight added!")
-#     else:
-#         st.warning("⚠️ Similar insight already exists. Skipping duplicate entry.")
 
-    # if is_duplicate_summary(new_summary, existing_summaries):
-    #     st.warning("⚠️ Similar insight already exists. Skipping duplicate entry.")
-    # else:
-    #     # Add to custom_result
-    #     if custom_result is None or custom_result.empty:
-    #         custom_result = pd.DataFrame([parsed])
-    #     else:
-    #         custom_result = pd.concat([custom_result, pd.DataFrame([parsed])], ignore_index=True)
+custom_result = None
+if user_url:
+    submit_url(user_url)
+    show_submission_status(user_url)
+    custom_result = df[df["URL"] == user_url]
 
-    #     # Add to df
-    #     df = pd.concat([df, pd.DataFrame([parsed])], ignore_index=True)
-    #     st.success("Insight added!")
+st.sidebar.header("🧭 Search Insights")
+search_query = st.sidebar.text_input(label="Search by meaning...", placeholder="e.g. data centre cooling in Southeast Asia")
 
 
 
@@ -151,44 +94,40 @@ with st.sidebar:
     """, unsafe_allow_html=True)
     selected_signal = st.multiselect("", options=df["Signal Strength"].dropna().unique())
 
-# Apply filters
-filtered_df = df.copy()
+# Apply filters: one mask over the categorical codes, then a single copy of the matching rows
+mask = pd.Series(True, index=df.index)
 if selected_sector:
-    filtered_df = filtered_df[filtered_df["Sector"].isin(selected_sector)]
+    mask &= df["Sector"].isin(selected_sector)
 if selected_category:
-    filtered_df = filtered_df[filtered_df["Category"].isin(selected_category)]
+    mask &= df["Category"].isin(selected_category)
 if selected_signal:
-    filtered_df = filtered_df[filtered_df["Signal Strength"].isin(selected_signal)]
+    mask &= df["Signal Strength"].isin(selected_signal)
+filtered_df = df[mask]
+# Charts read pre-aggregated counts for the same filters instead of regrouping filtered_df
+chart_filters = {"Sector": selected_sector, "Category": selected_category, "Signal Strength": selected_signal}
 
 # KPIs
 col1, col2, col3 = st.columns(3)
 col1.metric("Total Insights", len(filtered_df))
 col2.metric("High Signal Entries", sum(filtered_df["Signal Strength"] == "High"))
-col3.metric("Unique Entities", filtered_df["Entity Involved"].nunique())
+col3.metric("Unique Entities", filtered_df["Entity ID"].nunique())
 
 # Insights by Location
 st.subheader("📍 Insights by Location")
-filtered_df["Location"] = filtered_df["City"].fillna("Unknown") + ", " + filtered_df["Country"].fillna("Unknown")
-location_data = filtered_df[filtered_df["Location"] != "Unknown, Unknown"]
-location_counts = location_data["Location"].value_counts().reset_index()
-location_counts.columns = ["Location", "Count"]
+location_counts = insight_rollups.location_counts(chart_filters)
 fig_location = px.bar(location_counts, x="Location", y="Count")
 st.plotly_chart(fig_location, use_container_width=True)
 
 # Geographic Distribution
 st.subheader("🌍 Geographic Distribution")
-size_map = {
-    "Low": 2,
-    "Medium": 5,
-    "High": 10
-}
-location_data["Signal Score"] = location_data["Signal Strength"].map(size_map).fillna(8)
+geo_points = insight_rollups.geo_points(chart_filters)
 
 fig_geographic = px.scatter_geo(
-    location_data,
-    locations="Country",
-    locationmode="country names",
-    hover_name="City",
+    geo_points,
+    locations="Country ID",
+    locationmode="ISO-3",
+    hover_name="City Name",
+    hover_data=["Country Name", "Count"],
     color="Sector",  
     size="Signal Score",         
     projection="natural earth"  
@@ -212,43 +151,19 @@ st.plotly_chart(fig_geographic, use_container_width=True)
 
 # Sector Distribution
 st.subheader("🏷️ Sector Distribution")
-fig_sector = px.pie(filtered_df, names="Sector")
+sector_counts = insight_rollups.counts(["Sector"], chart_filters).dropna()
+fig_sector = px.pie(sector_counts, names="Sector", values="Count")
 st.plotly_chart(fig_sector, use_container_width=True)
 
 # WordCloud
 st.subheader("💬 Emerging Client Priorities (from Strategic Insights)")
 
-custom_stopwords = set(STOPWORDS).union({
-    "this", "that", "it", "they", "may", "must", "new", "within", "due", "including",
-    "completion", "similar", "position", "article", "lead", "prepare",
-    "project", "projects", "design", "opportunity", "opportunities", "potential",
-    "priority", "priorities", "highlight", "highlights", "signals", "shift",
-    "focus", "trend", "significant", "underscores",
-    "sj", "surbana", "jurong", "firm", "firms", "consultancy", "contractors", "entrants",
-    "region", "requirements", "rules", "companies", "framework", "solution", "solutions",
-    "u.s.", "african", "tanzania", "east", "social"
-})
-text = " ".join(filtered_df["Strategic Insight Summary"].dropna()).lower()
-words = [word for word in text.split() if word not in custom_stopwords]
-word_freq = Counter(words)
-
-wc = WordCloud(
-    width=600, height=300,
-    background_color="white",
-    colormap="tab10",
-    max_words=100, 
-    random_state=42
-).generate_from_frequencies(word_freq)
-
-fig_WordCloud, ax = plt.subplots(figsize=(7, 4))
-ax.imshow(wc, interpolation="bilinear")
-ax.axis("off")
-st.pyplot(fig_WordCloud)
-
-wc.to_file("wordcloud_trends.png")
-
-with open("wordcloud_trends.png", "rb") as img_file:
-    st.download_button(label="Download Word Cloud as PNG", data=img_file, file_name="client_priorities_wordcloud.png", mime="image/png")
+word_cloud_image = word_cloud(chart_filters)
+if word_cloud_image:
+    st.image(word_cloud_image)
+    st.download_button(label="Download Word Cloud as PNG", data=word_cloud_image, file_name="client_priorities_wordcloud.png", mime="image/png")
+else:
+    st.info("No strategic insight summaries match the current filters.")
 
 # Table of Insight from Submitted Article
 if custom_result is not None and not custom_result.empty:
@@ -259,6 +174,37 @@ if custom_result is not None and not custom_result.empty:
                 "Project Status", "Country", "City", "Sector", "Project or Initiative Name",
                 "Signal Strength", "Strategic Insight Summary", "Action Recommendation"
         ]])
+        answer = raw_insight(user_url)
+        if answer:
+            st.caption("Model answer")
+            st.text(answer)
+
+# Semantic search, ranked by the embedding index the scheduler keeps up to date
+SEARCH_COLUMNS = ["Score", "Title", "Sector", "Category", "City", "Country", "Summary", "Strategic Insight Summary"]
+filters_active = bool(selected_sector or selected_category or selected_signal)
+search_keys = filtered_df["Document Key"] if filters_active else None
+similar_to = {}
+if search_query:
+    st.subheader("🔍 Search Results")
+    if len(vector_index) == 0:
+        st.info("The search index is empty. The ingestion scheduler builds it as insights are stored.")
+    else:
+        results = search_insights(df, search_query, keys=search_keys)
+        if results.empty:
+            st.info("No insights match this search under the current filters.")
+        else:
+            st.dataframe(results[SEARCH_COLUMNS], hide_index=True)
+            similar_to.update(zip(results["Title"], results["Document Key"]))
+if custom_result is not None and not custom_result.empty:
+    similar_to = {f"Submitted article: {custom_result['Title'].iloc[-1]}": custom_result["Document Key"].iloc[-1], **similar_to}
+if similar_to:
+    picked = st.selectbox("Show insights similar to...", options=[None, *similar_to], format_func=lambda title: title or "Pick an insight")
+    if picked:
+        similar = similar_insights(df, similar_to[picked], keys=search_keys)
+        if similar.empty:
+            st.info("No similar insights found under the current filters.")
+        else:
+            st.dataframe(similar[SEARCH_COLUMNS], hide_index=True)
 
 st.subheader("🧠 Strategic Insights and Recommended Actions")
 st.dataframe(filtered_df[["Title", "Source Type", "Entity Involved", "Category", "Summary", "Project Status", "Country", "City", "Sector", "Strategic Insight Summary", "Action Recommendation"]])
@@ -279,8 +225,11 @@ if not regulatory_df.empty:
 else:
     st.info("No regulatory updates detected in the current data.")
 
-reg_sector_counts = regulatory_df["Sector"].value_counts().reset_index()
-reg_sector_counts.columns = ["Sector", "Policy Mentions"]
+reg_sector_counts = insight_rollups.counts(
+    ["Sector"], {**chart_filters, "Category": ["Policy/Regulatory Update"]}, exclude={"Source Type": ["Internal"]}
+).dropna().rename(columns={"Count": "Policy Mentions"})
+if selected_category and "Policy/Regulatory Update" not in selected_category:
+    reg_sector_counts = reg_sector_counts.iloc[0:0]
 
 fig_reg = px.bar(
     reg_sector_counts,
@@ -315,6 +264,3 @@ if show_high_signal_early:
             "Signal Strength", "Strategic Insight Summary", "Action Recommendation"
         ]].reset_index(drop=True))
         st.download_button("Download High-Potential Opportunities", data=filtered_df.to_csv(index=False), file_name="High Potential Insights.csv", mime="text/csv")
-
-
-upload_insights_to_blob(df)
\ No newline at end of file
@@ -0,0 +1,128 @@
+import argparse
+import hashlib
+import random
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the RSS feeds and the article pages they link to. Together with
+# stub_openai_server.py it lets the scheduler run end to end without network access:
+#   python stub_feed_server.py --port 8098 --feeds 3 --items 5 --publish-every 60
+# Feeds are served at /feeds/<k>.xml and honour If-None-Match, so an unchanged feed costs a 304.
+
+WORDS = (
+    "tower rail metro hospital bridge tender contract award council design timber steel housing "
+    "school airport port water energy solar district masterplan consultancy infrastructure retrofit"
+).split()
+
+
+def article_text(feed, item, words=120):
+    rng = random.Random(f"{feed}-{item}")
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+class FeedState:
+    def __init__(self, feeds=3, items=5, latency=0.0):
+        self.feeds = feeds
+        self.latency = latency
+        self.published = [items] * feeds
+        self.polls = 0
+        self.pages = 0
+        self.lock = threading.Lock()
+
+    def publish(self, feed=None, count=1):
+        # New items appear at the top of one feed (or every feed), like a real news feed
+        with self.lock:
+            for k in range(self.feeds) if feed is None else [feed]:
+                self.published[k] += count
+
+    def feed_xml(self, feed, base_url, limit=20):
+        with self.lock:
+            count = self.published[feed]
+        items = "".join(
+            f"<item><title>Stub story {feed}-{i}</title>"
+            f"<link>{base_url}/articles/{feed}/{i}.html</link><guid>stub-{feed}-{i}</guid>"
+            f"<description>{article_text(feed, i, 20)}</description></item>"
+            for i in range(count - 1, max(-1, count - 1 - limit), -1)
+        )
+        return f'<?xml version="1.0"?><rss version="2.0"><channel><title>Stub feed {feed}</title>{items}</channel></rss>'
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body=b"", content_type="text/html; charset=utf-8", headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if state.latency:
+                time.sleep(state.latency)
+            parts = self.path.split("?")[0].strip("/").split("/")
+            try:
+                if parts[0] == "feeds" and len(parts) == 2:
+                    self._feed(int(parts[1].removesuffix(".xml")))
+                elif parts[0] == "articles" and len(parts) == 3:
+                    self._article(int(parts[1]), int(parts[2].removesuffix(".html")))
+                else:
+                    self._send(404)
+            except (ValueError, IndexError):
+                self._send(404)
+
+        def _feed(self, feed):
+            with state.lock:
+                state.polls += 1
+            body = state.feed_xml(feed, f"http://{self.headers.get('Host')}").encode()
+            etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, headers={"ETag": etag})
+                return
+            self._send(200, body, "application/rss+xml", {"ETag": etag, "Last-Modified": formatdate(usegmt=True)})
+
+        def _article(self, feed, item):
+            with state.lock:
+                state.pages += 1
+            html = f"<html><head><title>Stub story {feed}-{item}</title></head><body><h1>Stub story {feed}-{item}</h1>"
+            html += "".join(f"<p>{article_text(feed, item * 10 + k)}</p>" for k in range(3))
+            self._send(200, (html + "</body></html>").encode())
+
+    return Handler
+
+
+def start_stub_feed_server(port=0, feeds=3, items=5, latency=0.0):
+    state = FeedState(feeds, items, latency)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.daemon_threads = True
+    server.state = state
+    server.feed_urls = {f"Stub Feed {k}": f"http://127.0.0.1:{server.server_address[1]}/feeds/{k}.xml" for k in range(feeds)}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub RSS feeds and article pages")
+    parser.add_argument("--port", type=int, default=8098)
+    parser.add_argument("--feeds", type=int, default=3)
+    parser.add_argument("--items", type=int, default=5, help="items each feed starts with")
+    parser.add_argument("--publish-every", type=float, default=0, help="seconds between new items on every feed")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before answering")
+    args = parser.parse_args()
+
+    server = start_stub_feed_server(args.port, args.feeds, args.items, args.latency)
+    for source, url in server.feed_urls.items():
+        print(f"🧪 {source}: {url}")
+    try:
+        while True:
+            time.sleep(args.publish_every or 3600)
+            if args.publish_every:
+                server.state.publish()
+    except KeyboardInterrupt:
+        server.shutdown()
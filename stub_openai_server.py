@@ -0,0 +1,175 @@
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for an Azure OpenAI deployment. Point AZURE_OPENAI_ENDPOINT at it
+# to exercise the agent, the rate limiter and the retry path without a paid deployment:
+#   python stub_openai_server.py --port 8099 --throttle-every 3 --latency 0.2
+
+CANNED_FIELDS = {
+    "is_relevant": "Yes",
+    "summary": "A new metro line has been approved to connect the airport to the city centre",
+    "source_type": "External",
+    "category": "Project Win",
+    "entity_involved": "Land Transport Authority",
+    "city": "Singapore",
+    "country": "Singapore",
+    "sector": "Transport",
+    "project_or_initiative_name": "Cross Island Line Phase 3",
+    "project_status": "Approved",
+    "strategic_insight_summary": "Signals sustained public investment in rail infrastructure and upcoming design consultancy tenders",
+    "signal_strength": "High",
+    "action_recommendation": "Position for bid on the civil and systems engineering packages",
+}
+
+CANNED_INSIGHT = """1. **Summary**: A new metro line has been approved to connect the airport to the city centre
+2. **Source Type**: External
+3. **Is this relevant to the AEC industry?** Yes
+4. **Category**: Project Win
+5. **Entity Involved**: Land Transport Authority
+6. **City**: Singapore
+7. **Country**: Singapore
+8. **Sector**: Transport
+9. **Project or Initiative Name**: Cross Island Line Phase 3
+10. **Project Status**: Approved
+11. **Strategic Insight Summary**: Signals sustained public investment in rail infrastructure and upcoming design consultancy tenders
+12. **Signal Strength**: High
+13. **Action Recommendation**: Position for bid on the civil and systems engineering packages"""
+
+
+class StubState:
+    def __init__(self, latency=0.0, throttle_every=0, retry_after_ms=500, token_latency=0.0):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.throttle_every = throttle_every
+        self.retry_after_ms = retry_after_ms
+        self.requests = 0
+        self.throttled = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.lock = threading.Lock()
+
+    def record_usage(self, usage):
+        with self.lock:
+            self.prompt_tokens += usage["prompt_tokens"]
+            self.completion_tokens += usage["completion_tokens"]
+
+    def next_request(self):
+        with self.lock:
+            self.requests += 1
+            throttle = self.throttle_every and self.requests % self.throttle_every == 0
+            if throttle:
+                self.throttled += 1
+            return throttle
+
+
+def completion_body(content, prompt_chars, max_tokens):
+    prompt_tokens = prompt_chars // 4
+    completion_tokens = min(max_tokens or 800, len(content) // 4)
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "stub",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def respond(request):
+    # Batched prompts number their articles "### Article k"; answer each one
+    content = request.get("messages", [{}])[-1].get("content") or ""
+    numbers = re.findall(r"^### Article (\d+)", content, flags=re.M)
+    if (request.get("response_format") or {}).get("type") == "json_object":
+        if numbers:
+            return json.dumps({"articles": [{"article": int(k), **CANNED_FIELDS} for k in numbers]})
+        return json.dumps(CANNED_FIELDS)
+    if numbers:
+        return "\n\n".join(f"### Article {k}\n{CANNED_INSIGHT}" for k in numbers)
+    return CANNED_INSIGHT
+
+
+def make_handler(state, responder=respond):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, headers=None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+
+            if not self.path.split("?")[0].endswith("/chat/completions"):
+                self._send(404, {"error": {"message": "not found"}})
+                return
+
+            if state.next_request():
+                self._send(429, {"error": {"code": "429", "message": "Rate limit is exceeded."}}, {
+                    "retry-after-ms": str(state.retry_after_ms),
+                    "retry-after": str(max(1, state.retry_after_ms // 1000)),
+                })
+                return
+
+            prompt_chars = sum(len(m.get("content") or "") for m in request.get("messages", []))
+            body = completion_body(responder(request), prompt_chars, request.get("max_tokens"))
+            state.record_usage(body["usage"])
+
+            # Generation time grows with the answer length, like a real deployment
+            delay = state.latency + state.token_latency * body["usage"]["completion_tokens"]
+            if delay:
+                time.sleep(delay)
+
+            self._send(200, body, {
+                "x-ratelimit-remaining-requests": "1000",
+                "x-ratelimit-remaining-tokens": "1000000",
+            })
+
+    return Handler
+
+
+def start_stub_server(port=0, latency=0.0, throttle_every=0, retry_after_ms=500, responder=respond, token_latency=0.0):
+    state = StubState(latency, throttle_every, retry_after_ms, token_latency)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state, responder))
+    server.daemon_threads = True
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub Azure OpenAI chat completions endpoint")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before answering")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="extra seconds per completion token")
+    parser.add_argument("--throttle-every", type=int, default=0, help="answer every Nth request with a 429")
+    parser.add_argument("--retry-after-ms", type=int, default=500)
+    args = parser.parse_args()
+
+    server = start_stub_server(args.port, args.latency, args.throttle_every, args.retry_after_ms,
+                               token_latency=args.token_latency)
+    print(f"🧪 Stub Azure OpenAI listening on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
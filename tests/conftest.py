@@ -0,0 +1,33 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The modules under test open their SQLite indexes and read their settings from the environment
+# at import, so every path points into a scratch directory before the first test imports them.
+# Empty credentials keep the .env file's Azure account out of reach
+STATE_DIR = tempfile.mkdtemp(prefix="aec-tests-")
+os.environ.update({
+    "AEC_STORE_BACKEND": "local",
+    "AEC_STORE_DIR": os.path.join(STATE_DIR, "insight_store"),
+    "AEC_JOBS_PATH": os.path.join(STATE_DIR, "jobs.sqlite"),
+    "AEC_FEED_INDEX_PATH": os.path.join(STATE_DIR, "feed_index.sqlite"),
+    "AEC_DEDUP_INDEX_PATH": os.path.join(STATE_DIR, "dedup_index.sqlite"),
+    "AEC_CACHE_PATH": os.path.join(STATE_DIR, "insight_cache.sqlite"),
+    "AEC_ROLLUPS_PATH": os.path.join(STATE_DIR, "insight_rollups.sqlite"),
+    "AEC_VECTOR_INDEX_PATH": os.path.join(STATE_DIR, "vector_index.sqlite"),
+    "AEC_METRICS_LOG": "",
+    "AEC_METRICS_PROM_PATH": "",
+    "AZURE_OPENAI_KEY": "",
+    "AZURE_OPENAI_ENDPOINT": "",
+    "AZURE_STORAGE_CONNECTION_STRING": "",
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def store(tmp_path):
+    from insight_store import InsightStore, LocalBackend
+
+    return InsightStore(LocalBackend(str(tmp_path / "store")))
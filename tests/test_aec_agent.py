@@ -0,0 +1,78 @@
+import pytest
+
+import aec_agent
+import insight_rollups as rollups_module
+import insight_store as store_module
+import vector_index as vector_module
+from feed_index import FeedIndex
+from insight_rollups import InsightRollups
+from stub_feed_server import start_stub_feed_server
+from vector_index import HashingEmbedder, VectorIndex
+
+
+@pytest.fixture
+def agent(tmp_path, store, monkeypatch):
+    # The stub feeds, the real polling and feed index, and a row per entry instead of the model
+    server = start_stub_feed_server(feeds=2, items=3)
+    analysed = []
+
+    def analyse_feed_entry(source, entry):
+        analysed.append(entry.link)
+        return {"Source": source, "Title": entry.title, "URL": entry.link, "Summary": entry.summary, "Sector": "Transport"}
+
+    monkeypatch.setattr(aec_agent, "feed_index", FeedIndex(str(tmp_path / "feed_index.sqlite")))
+    monkeypatch.setattr(aec_agent, "analyse_feed_entry", analyse_feed_entry)
+    monkeypatch.setattr(store_module, "_default_store", store)
+    monkeypatch.setattr(rollups_module, "insight_rollups", InsightRollups(str(tmp_path / "rollups.sqlite")))
+    monkeypatch.setattr(vector_module, "vector_index", VectorIndex(str(tmp_path / "vectors.sqlite"), embedder=HashingEmbedder(64)))
+
+    def run(**kwargs):
+        analysed.clear()
+        df = aec_agent.run_news_insight_agent(server.feed_urls, manual_pages=[], batch_size=1, **kwargs)
+        return df, list(analysed)
+
+    yield server, run
+    server.shutdown()
+
+
+def test_an_incremental_run_appends_only_new_entries_to_the_store(agent, store):
+    server, run = agent
+    df, analysed = run(incremental=True)
+    assert len(df) == len(analysed) == 6
+    assert len(store.read()) == 6
+    assert len(rollups_module.insight_rollups) == 6
+
+    # Unchanged feeds answer 304 and nothing is analysed or stored
+    df, analysed = run(incremental=True)
+    assert df.empty and analysed == []
+    assert len(store.read()) == 6
+
+    server.state.publish(feed=0)
+    df, analysed = run(incremental=True)
+    assert df["Title"].tolist() == ["Stub story 0-3"]
+    assert len(store.read()) == 7
+
+
+def test_a_failed_write_leaves_the_entries_for_the_next_run(agent, store, monkeypatch):
+    server, run = agent
+    store_new_rows = aec_agent.store_new_rows
+
+    def full_disk(df):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(aec_agent, "store_new_rows", full_disk)
+    with pytest.raises(OSError):
+        run(incremental=True)
+    monkeypatch.setattr(aec_agent, "store_new_rows", store_new_rows)
+
+    # Neither the entries nor the feeds' validators were remembered, so the next run redoes them
+    df, analysed = run(incremental=True)
+    assert len(analysed) == 6
+    assert len(store.read()) == 6
+
+
+def test_a_full_run_stores_nothing(agent, store):
+    server, run = agent
+    df, analysed = run()
+    assert len(df) == 6
+    assert store.read().empty
@@ -0,0 +1,44 @@
+import azure.storage.blob
+import pytest
+from azure.core.exceptions import ClientAuthenticationError, ResourceExistsError
+
+import azure_storage
+from metrics import metrics
+
+
+class FakeService:
+    def __init__(self, error):
+        self.error = error
+
+    def get_container_client(self, name):
+        return self
+
+    def create_container(self):
+        if self.error:
+            raise self.error
+
+
+@pytest.fixture
+def connect(monkeypatch):
+    def connect(error):
+        monkeypatch.setattr(azure_storage, "_container_client", None)
+        monkeypatch.setattr(azure.storage.blob.BlobServiceClient, "from_connection_string",
+                            staticmethod(lambda connection_string: FakeService(error)))
+        return azure_storage.get_container_client()
+
+    return connect
+
+
+def test_an_existing_container_is_not_a_failed_connect(connect):
+    since = metrics.snapshot()
+    assert connect(ResourceExistsError("ContainerAlreadyExists")) is not None
+    assert metrics.counter("failures", since, stage="blob_connect") == 0
+    assert metrics.stage_stats(since)["blob_connect"]["count"] == 1
+
+
+def test_other_connect_errors_are_raised_and_retried(connect):
+    since = metrics.snapshot()
+    with pytest.raises(ClientAuthenticationError):
+        connect(ClientAuthenticationError("bad key"))
+    assert metrics.counter("failures", since, stage="blob_connect") == 1
+    assert azure_storage._container_client is None
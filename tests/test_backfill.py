@@ -0,0 +1,14 @@
+import pandas as pd
+
+from backfill import rederive
+
+REPEATED = "1. **Summary**: first\n2. **Sector**: Energy\n1. **Summary**: second"
+
+
+def test_rederive_keeps_each_row_kinds_rule_for_repeated_fields():
+    df = pd.DataFrame({"Source": ["Feed", "Site Plan"], "URL": ["https://a.example/1", "Manual Upload"],
+                       "raw_insight": [REPEATED, REPEATED]})
+    out = rederive(df)
+    assert out["Summary"].tolist() == ["second", "first"]
+    assert out["Sector"].tolist() == ["Energy", "Energy"]
+    assert out["Source Type"].tolist()[1] == "Internal"
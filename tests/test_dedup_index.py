@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+import dedup_index as dedup_module
+from dedup_index import NUM_PERM, ROWS, SIGNATURE_COLUMN, DedupIndex, band_keys, decode_signature, encode_signature
+
+ARTICLE = (
+    "The city council approved a 420 million dollar contract for the new light rail depot on the "
+    "eastern waterfront, with construction due to start next spring and the first trains running "
+    "by the end of the decade according to the transport authority"
+)
+# The model's one-line summary of the same article shares almost no word 3-grams with it
+MODEL_SUMMARY = "A major rail depot contract was awarded, signalling strong transport investment."
+
+
+def make_index(tmp_path, name="dedup.sqlite"):
+    return DedupIndex(str(tmp_path / name), threshold=0.5)
+
+
+def stored_rows(index, urls):
+    rows = pd.DataFrame({"Source": "Feed", "Title": "Rail depot approved", "URL": urls, "Summary": MODEL_SUMMARY})
+    return index.with_signatures(rows)
+
+
+def test_claim_registers_and_detects_a_copy(tmp_path):
+    index = make_index(tmp_path)
+    assert index.claim("https://a.example/1", "Rail depot approved", ARTICLE) is None
+    match = index.claim("https://b.example/1", "Council backs depot", ARTICLE.replace("spring", "summer"))
+    assert match is not None and match.key == "https://a.example/1"
+    # Re-submitting the original under its own key is not a duplicate
+    assert index.claim("https://a.example/1", "Rail depot approved", ARTICLE) is None
+
+
+def test_discard_releases_a_failed_claim(tmp_path):
+    index = make_index(tmp_path)
+    index.claim("https://a.example/1", "Rail depot approved", ARTICLE)
+    index.discard("https://a.example/1")
+    assert index.claim("https://b.example/1", "Rail depot approved", ARTICLE) is None
+
+
+def test_signature_round_trips_through_text():
+    signature = np.arange(NUM_PERM, dtype=np.uint32) * 40_000_000
+    assert np.array_equal(decode_signature(encode_signature(signature)), signature)
+
+
+def test_synced_row_matches_a_later_claim_of_the_same_article(tmp_path, store):
+    # Claimed and stored on one machine...
+    writer = make_index(tmp_path, "writer.sqlite")
+    writer.claim("https://a.example/1", "Rail depot approved", ARTICLE)
+    rows = stored_rows(writer, ["https://a.example/1"])
+    assert rows[SIGNATURE_COLUMN].notna().all()
+    store.append(rows)
+
+    # ...synced on another, where a syndicated copy of the article arrives
+    reader = make_index(tmp_path, "reader.sqlite")
+    assert reader.sync(store) == 1
+    match = reader.claim("https://b.example/1", "Council backs new depot", ARTICLE.replace("420 million", "$420m"))
+    assert match is not None and match.key == "https://a.example/1"
+
+
+def test_rows_without_a_signature_fall_back_to_their_summary(tmp_path, store):
+    store.append(pd.DataFrame({"Source": ["Feed"], "Title": ["Rail depot approved"], "URL": ["https://a.example/1"],
+                               "Summary": [ARTICLE]}))
+    index = make_index(tmp_path)
+    assert index.sync(store) == 1
+    assert index.sync(store) == 0
+    assert index.find("Rail depot approved", ARTICLE).key == "https://a.example/1"
+
+
+def test_busy_buckets_do_not_crowd_out_the_near_duplicate(tmp_path, monkeypatch):
+    monkeypatch.setattr(dedup_module, "MAX_CANDIDATES", 5)
+    rng = np.random.default_rng(0)
+    query = rng.integers(1, 2**32 - 1, NUM_PERM, dtype=np.uint64).astype(np.uint32)
+    # Twenty loose matches share only the query's lowest-numbered bucket, the one SQLite reads first
+    band = int(np.argmin(band_keys(query)[0]))
+    shared = slice(band * ROWS, (band + 1) * ROWS)
+    decoys = []
+    for k in range(20):
+        signature = rng.integers(1, 2**32 - 1, NUM_PERM, dtype=np.uint64).astype(np.uint32)
+        signature[shared] = query[shared]
+        decoys.append((f"decoy-{k}", "", signature))
+    near = query.copy()
+    near[::5] += 1
+    near[shared.start] += 1
+    index = make_index(tmp_path)
+    index.add_signatures(decoys + [("near", "", near)])
+    match = index._match(query)
+    assert match is not None and match.key == "near"
@@ -0,0 +1,92 @@
+import argparse
+from collections import Counter
+
+import pandas as pd
+import pytest
+
+import ingest
+import insight_rollups as rollups_module
+import insight_store as store_module
+import scheduler as scheduler_module
+import vector_index as vector_module
+from insight_rollups import InsightRollups
+from scheduler import shard_of
+from vector_index import HashingEmbedder, VectorIndex
+
+
+def run_args(tmp_path, **overrides):
+    args = dict(feeds=None, urls=None, manual_dir=None, shard=(0, 1), state_dir=str(tmp_path / "state"), output=None,
+                max_per_feed=0, batch_size=None, retry_failed=False)
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+
+def test_shards_split_keys_into_disjoint_stable_slices():
+    keys = [f"https://news.example/{k}" for k in range(2000)]
+    slices = [{key for key in keys if shard_of(key, 4) == index} for index in range(4)]
+    assert sum(map(len, slices)) == len(keys) and set().union(*slices) == set(keys)
+    assert min(map(len, slices)) > 400
+    # A CRC of the key rather than hash(), so every machine and every Python process agrees
+    assert shard_of("https://news.example/0", 4) == 2
+
+
+def test_parse_shard_rejects_out_of_range_values():
+    assert ingest.parse_shard("2/4") == (2, 4)
+    for value in ["4/4", "-1/4", "1/0", "1", "a/b"]:
+        with pytest.raises(argparse.ArgumentTypeError):
+            ingest.parse_shard(value)
+
+
+def test_input_files_skip_comments_blanks_and_repeats(tmp_path):
+    path = tmp_path / "feeds.txt"
+    path.write_text("# feeds\nConstruction News https://cn.example/rss\n\nhttps://bare.example/feed\n"
+                    "https://bare.example/feed\n", encoding="utf-8")
+    assert ingest.read_feeds(str(path)) == {"Construction News": "https://cn.example/rss",
+                                            "bare.example": "https://bare.example/feed"}
+
+
+def test_a_rerun_only_picks_up_what_the_last_run_left(tmp_path, monkeypatch):
+    from job_store import JobStore
+
+    urls = tmp_path / "urls.txt"
+    urls.write_text("\n".join(f"https://news.example/{k}" for k in range(40)), encoding="utf-8")
+    jobs = JobStore(str(tmp_path / "jobs.sqlite"))
+    monkeypatch.setattr("job_store.job_store", jobs)
+    states = Counter()
+
+    def run_once(self):
+        # The first run is interrupted after storing half of its jobs
+        queued = jobs.keys("queued")
+        for key in queued[:len(queued) // 2] if not states["runs"] else queued:
+            jobs.update(key, "stored")
+            states[key] += 1
+        states["runs"] += 1
+
+    monkeypatch.setattr(scheduler_module.Scheduler, "run_once", run_once)
+    args = run_args(tmp_path, urls=[str(urls)], shard=(1, 3), output=str(tmp_path / "out"))
+    monkeypatch.setattr(ingest, "shard_environment", lambda state_dir: {})
+    mine = [f"https://news.example/{k}" for k in range(40) if shard_of(f"https://news.example/{k}", 3) == 1]
+    ingest.run(args)
+    assert len(jobs.keys("stored")) == len(mine) // 2
+    ingest.run(args)
+    assert sorted(jobs.keys("stored")) == sorted(mine)
+    # No article was taken twice, and nothing outside the shard was queued
+    assert all(states[key] == 1 for key in mine)
+    assert sum(jobs.counts().values()) == len(mine)
+
+
+def test_a_shard_writing_to_the_store_updates_its_indexes(tmp_path, store, monkeypatch):
+    for name in ingest.shard_environment(str(tmp_path / "state")):
+        monkeypatch.delenv(name, raising=False)
+    rollups = InsightRollups(str(tmp_path / "rollups.sqlite"))
+    vectors = VectorIndex(str(tmp_path / "vectors.sqlite"), embedder=HashingEmbedder(64))
+    monkeypatch.setattr(store_module, "_default_store", store)
+    monkeypatch.setattr(rollups_module, "insight_rollups", rollups)
+    monkeypatch.setattr(vector_module, "vector_index", vectors)
+    row = {"Source": "URL List", "URL": "https://a.example/1", "Sector": "Transport",
+           "Summary": "Council approves rail depot", "Strategic Insight Summary": "Rail depot pipeline"}
+    monkeypatch.setattr(scheduler_module.Scheduler, "run_once", lambda self: self.store.append(pd.DataFrame([row])))
+
+    assert ingest.run(run_args(tmp_path)) == 0
+    assert len(rollups) == 1
+    assert vectors.search("rail depot", k=1)["Document Key"].tolist() == ["https://a.example/1"]
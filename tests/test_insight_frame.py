@@ -0,0 +1,30 @@
+import pandas as pd
+
+from insight_frame import read_insight_frame, typed_frame
+from insight_rollups import InsightRollups
+
+
+def test_signal_strength_is_ordered_and_keeps_other_answers(tmp_path, store):
+    # The parser stores the prompt's "N/A" for internal documents as "N/a"
+    df = pd.DataFrame({"URL": ["a", "b", "c", "d"], "Sector": "Transport",
+                       "Signal Strength": ["High", "N/a", "Low", None]})
+    store.append(df)
+    frame = read_insight_frame(store)
+    signal = frame.set_index("URL")["Signal Strength"]
+    assert signal.cat.ordered
+    assert signal["b"] == "N/a" and pd.isna(signal["d"])
+    assert signal.sort_values().index.tolist() == ["b", "c", "a", "d"]
+
+    # The table and the rollup-backed charts agree on every value the filter offers
+    rollups = InsightRollups(str(tmp_path / "rollups.sqlite"))
+    rollups.sync(store)
+    for value in frame["Signal Strength"].dropna().unique():
+        table = int((frame["Signal Strength"] == value).sum())
+        chart = rollups.counts(["Sector"], {"Signal Strength": [value]})["Count"].sum()
+        assert table == chart == 1
+
+
+def test_typed_frame_accepts_plain_text_columns():
+    frame = typed_frame(pd.DataFrame({"Signal Strength": ["Medium", "N/a"], "Sector": ["Energy", "Water"]}))
+    assert list(frame["Signal Strength"].cat.categories) == ["N/a", "Low", "Medium", "High"]
+    assert isinstance(frame["Sector"].dtype, pd.CategoricalDtype)
@@ -0,0 +1,117 @@
+import json
+
+import pandas as pd
+import pytest
+
+from insight_parser import INSIGHT_FIELDS, MANUAL_PAGE_FIELDS, Insight, InsightParseError, parse_insight, parse_insights_bulk
+
+MARKDOWN = """Here is the analysis:
+1. **Summary**: The council approved a new rail depot.
+2. **Source Type**: external
+3. **Category**: project win
+**City:** Singapore
+- Country: Singapore
+4. **Sector** (if available): Transport
+5. **Project Status**: under construction.
+6. **Signal Strength**: HIGH.
+7. **Action Recommendation**: Contact the transport authority: they tender next month.
+"""
+
+JSON_ANSWER = {
+    "is_relevant": "Yes", "summary": "Council approves rail depot.", "source_type": "External",
+    "category": "Project Win", "entity_involved": "LTA", "city": "Singapore", "country": "Singapore",
+    "sector": "Transport", "project_or_initiative_name": "East Depot", "project_status": "Approved",
+    "strategic_insight_summary": "Rail pipeline is growing.", "signal_strength": "medium",
+    "action_recommendation": "**Bid for the design package**",
+}
+
+
+def test_markdown_variants_parse_the_same_fields():
+    columns = parse_insight(MARKDOWN)
+    assert columns["Summary"] == "The council approved a new rail depot"
+    assert columns["Source Type"] == "External"
+    assert columns["Category"] == "Project Win"
+    assert columns["City"] == "Singapore" and columns["Country"] == "Singapore"
+    assert columns["Sector"] == "Transport"
+    assert columns["Project Status"] == "Under Construction"
+    assert columns["Signal Strength"] == "High"
+    # Only the first colon separates the key from the value
+    assert columns["Action Recommendation"] == "Contact the transport authority: they tender next month"
+    assert columns["Entity Involved"] is None
+
+
+REPEATED = "1. **Summary**: first.\n2. **Sector**:\n2. **Sector**: Transport\n1. **Summary**: second\n2. **Sector**:"
+
+
+def test_a_repeated_field_keeps_its_last_value_as_the_feed_parser_did():
+    columns = parse_insight(REPEATED)
+    assert (columns["Summary"], columns["Sector"]) == ("second", "")
+
+
+def test_internal_documents_keep_the_first_non_empty_value_as_the_manual_parser_did():
+    columns = parse_insight(REPEATED, overrides=MANUAL_PAGE_FIELDS, first_wins=True)
+    assert (columns["Summary"], columns["Sector"]) == ("first", "Transport")
+
+
+def test_fenced_json_is_cleaned_and_normalized():
+    columns = parse_insight(f"```json\n{json.dumps(JSON_ANSWER)}\n```")
+    assert columns["Summary"] == "Council approves rail depot"
+    assert columns["Signal Strength"] == "Medium"
+    assert columns["Action Recommendation"] == "Bid for the design package"
+
+
+def test_unexpected_labels_are_kept_rather_than_dropped():
+    columns = parse_insight(json.dumps({**JSON_ANSWER, "category": "Market Rumour", "signal_strength": "very high"}))
+    assert columns["Category"] == "Market Rumour"
+    assert columns["Signal Strength"] == "Very high"
+
+
+def test_broken_json_falls_back_to_the_markdown_parser():
+    columns = parse_insight('{"summary": "cut off\nSummary: Council approves depot\nSector: Energy')
+    assert columns["Summary"] == "Council approves depot"
+    assert columns["Sector"] == "Energy"
+
+
+def test_json_of_the_wrong_shape_is_rejected():
+    with pytest.raises(InsightParseError):
+        Insight.from_json(["not", "an", "object"])
+    with pytest.raises(InsightParseError):
+        Insight.from_json({"summary": {"nested": "value"}})
+    with pytest.raises(InsightParseError):
+        Insight.from_json({"unrelated": "keys"})
+    # An irrelevant article legitimately has no fields
+    assert Insight.from_json({"is_relevant": False}).is_relevant == "No"
+
+
+def test_overrides_pin_columns_whatever_the_model_says():
+    columns = parse_insight(json.dumps({**JSON_ANSWER, "source_type": "External"}), overrides=MANUAL_PAGE_FIELDS)
+    assert columns["Source Type"] == "Internal"
+    assert columns["Entity Involved"] == "Surbana Jurong"
+
+
+def test_empty_and_unparseable_answers_give_empty_columns():
+    assert parse_insight("") == dict.fromkeys(INSIGHT_FIELDS)
+    assert parse_insight("The model refused to answer.") == dict.fromkeys(INSIGHT_FIELDS)
+
+
+def test_bulk_parse_matches_the_row_parser():
+    raw = pd.Series([
+        MARKDOWN,
+        json.dumps(JSON_ANSWER),
+        f"```json\n{json.dumps(JSON_ANSWER)}\n```",
+        json.dumps({**JSON_ANSWER, "is_relevant": True, "signal_strength": 3}),
+        '{"summary": "cut off\nSummary: Council approves depot',
+        json.dumps({"is_relevant": "No"}),
+        "",
+        None,
+        REPEATED,
+        '{"summary": "cut off\n' + REPEATED,
+    ], index=range(10, 20))
+    for first_wins in (False, True):
+        bulk = parse_insights_bulk(raw, first_wins=first_wins)
+        assert list(bulk.index) == list(raw.index)
+        expected = pd.DataFrame([parse_insight(text, first_wins=first_wins) for text in raw.fillna("")], index=raw.index)
+        expected = expected[list(INSIGHT_FIELDS)]
+        # Missing is missing, whether None or NaN
+        pd.testing.assert_frame_equal(bulk.astype(object).where(bulk.notna(), None),
+                                      expected.astype(object).where(expected.notna(), None))
@@ -0,0 +1,90 @@
+import io
+import threading
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from insight_rollups import InsightRollups, tokenize
+from insight_store import to_arrow
+
+
+def insights(n, sector="Transport"):
+    return pd.DataFrame({
+        "Sector": [sector] * n,
+        "Category": ["Project Win"] * n,
+        "Signal Strength": ["High"] * n,
+        "Source Type": ["External"] * n,
+        "City": ["Singapore"] * n,
+        "Country": ["Singapore"] * n,
+        "Strategic Insight Summary": ["Net-zero rail depot for the council's masterplan"] * n,
+    })
+
+
+def test_tokenize_keeps_inner_punctuation_and_drops_possessives():
+    assert tokenize("The council’s net-zero R&D plan for the U.S.") == ["the", "council", "net-zero", "r&d", "plan", "for", "the", "u.s"]
+
+
+def test_a_part_is_counted_once(tmp_path):
+    rollups = InsightRollups(str(tmp_path / "rollups.sqlite"))
+    assert rollups.add(insights(3), part="p1") == 3
+    assert rollups.add(insights(3), part="p1") == 0
+    assert len(rollups) == 3
+    # Rows without a part name (nothing to deduplicate on) always count
+    rollups.add(insights(2, "Energy"))
+    assert rollups.counts(["Sector"]).set_index("Sector")["Count"].to_dict() == {"Transport": 3, "Energy": 2}
+    assert rollups.word_counts(filters={"Sector": ["Transport"]})["depot"] == 3
+
+
+def test_two_processes_adding_the_same_part_count_it_once(tmp_path):
+    # Separate connections to one file, as the dashboard's sync and the scheduler's add have
+    path = str(tmp_path / "rollups.sqlite")
+    writers = [InsightRollups(path) for _ in range(4)]
+    barrier = threading.Barrier(len(writers))
+
+    def add(rollups):
+        for k in range(20):
+            barrier.wait()
+            rollups.add(insights(5), part=f"p{k}")
+
+    threads = [threading.Thread(target=add, args=(rollups,)) for rollups in writers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(InsightRollups(path)) == 100
+
+
+def test_a_failed_add_leaves_nothing_behind(tmp_path, monkeypatch):
+    rollups = InsightRollups(str(tmp_path / "rollups.sqlite"))
+    upsert = rollups._upsert
+
+    def fail_on_words(table, keys, counts):
+        if table == "words":
+            raise RuntimeError("disk full")
+        upsert(table, keys, counts)
+
+    monkeypatch.setattr(rollups, "_upsert", fail_on_words)
+    with pytest.raises(RuntimeError):
+        rollups.add(insights(3), part="p1")
+    monkeypatch.undo()
+    assert len(rollups) == 0
+    assert rollups.add(insights(3), part="p1") == 3
+    assert len(rollups) == 3
+
+
+def test_sync_counts_new_parts_once_and_recounts_after_a_backfill(tmp_path, store):
+    rollups = InsightRollups(str(tmp_path / "rollups.sqlite"))
+    first = store.append(insights(2))
+    assert rollups.add(insights(2), part=first) == 2
+    store.append(insights(4, "Energy"), ingest_date="2025-01-02")
+    assert rollups.sync(store) == 4
+    assert rollups.sync(store) == 0
+    assert len(rollups) == 6
+
+    # A backfill supersedes the first part with a revision where the sector changed
+    buffer = io.BytesIO()
+    pq.write_table(to_arrow(insights(2, "Water")), buffer)
+    store.replace_file(first, buffer.getvalue())
+    assert rollups.sync(store) == 6
+    assert rollups.counts(["Sector"]).set_index("Sector")["Count"].to_dict() == {"Energy": 4, "Water": 2}
@@ -0,0 +1,149 @@
+import argparse
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+import backfill
+import insight_store as store_module
+from dedup_index import DedupIndex
+from insight_rollups import InsightRollups
+from insight_store import InsightStore, LocalBackend
+from vector_index import HashingEmbedder, VectorIndex
+
+
+def insights(urls, sector="Transport"):
+    return pd.DataFrame({
+        "Source": "Feed",
+        "Title": [f"Depot {url}" for url in urls],
+        "URL": urls,
+        "Summary": [f"Council approves rail depot number {url}" for url in urls],
+        "Sector": sector,
+        "Strategic Insight Summary": "Net-zero rail depot",
+    })
+
+
+def fill(store, partition, parts, rows=2):
+    names = []
+    for k in range(parts):
+        urls = [f"https://a.example/{partition}/{k}/{j}" for j in range(rows)]
+        names.append(store.append(insights(urls), ingest_date=partition))
+    return names
+
+
+def test_compaction_merges_past_partitions_into_one_part(store):
+    old = fill(store, "2025-01-01", 3)
+    fill(store, "2025-01-02", 2)
+    today = fill(store, "2025-01-03", 3)
+    before = store.read()
+
+    assert store.compact(before="2025-01-03", min_files=3) == {"2025-01-01": 3}
+    files = store.current_files()
+    assert len(files) == 1 + 2 + 3 and set(today) <= set(files)
+    [merged] = [name for name in files if name.startswith("ingest_date=2025-01-01/")]
+    assert store.compacted_from(merged) == sorted(old)
+    assert not set(old) & set(store.local_files())
+    after = store.read()
+    assert sorted(after["URL"]) == sorted(before["URL"])
+
+
+def test_a_source_left_behind_by_a_crash_stays_hidden(store):
+    old = fill(store, "2025-01-01", 3)
+    data = store.backend.read_file(old[0])
+    store.compact(before="2025-01-02", min_files=3)
+    store.backend.write_file(old[0], data)
+    assert old[0] not in store.current_files()
+    assert len(store.read()) == 6
+
+
+def test_compacting_again_folds_in_the_earlier_sources(store):
+    old = fill(store, "2025-01-01", 3)
+    store.compact(before="2025-01-02", min_files=3)
+    more = fill(store, "2025-01-01", 2)
+    store.compact(before="2025-01-02", min_files=3)
+    [merged] = store.current_files()
+    first = [source for source in store.compacted_from(merged) if os.path.basename(source).startswith("compact-")]
+    assert set(store.compacted_from(merged)) == set(old) | set(more) | set(first)
+    assert len(store.read()) == 10
+
+
+def test_derived_indexes_record_a_compacted_part_without_reading_it(tmp_path, store):
+    fill(store, "2025-01-01", 3)
+    rollups = InsightRollups(str(tmp_path / "rollups.sqlite"))
+    dedup = DedupIndex(str(tmp_path / "dedup.sqlite"))
+    vectors = VectorIndex(str(tmp_path / "vectors.sqlite"), embedder=HashingEmbedder(64))
+    assert rollups.sync(store) == 6
+    assert dedup.sync(store) == 6
+    assert vectors.sync(store) == 6
+
+    store.compact(before="2025-01-02", min_files=3)
+    assert rollups.sync(store) == 0
+    assert dedup.sync(store) == 0
+    assert vectors.sync(store) == 0
+    assert len(rollups) == 6
+
+    # An index that never saw the sources reads the compacted part instead
+    fresh = InsightRollups(str(tmp_path / "fresh.sqlite"))
+    assert fresh.sync(store) == 6
+    assert fresh.sync(store) == 0
+
+
+def test_schemas_are_read_once_per_part(store, monkeypatch):
+    fill(store, "2025-01-01", 4)
+    reads = []
+    read_schema = pq.read_schema
+    monkeypatch.setattr(store_module.pq, "read_schema", lambda path: reads.append(path) or read_schema(path))
+    store.read()
+    store.read()
+    store.read_files(store.current_files(), columns=["URL"])
+    assert len(reads) == 4
+
+
+def test_a_backfilled_compacted_part_keeps_its_sources(store, monkeypatch):
+    old = fill(store, "2025-01-01", 3)
+    store.compact(before="2025-01-02", min_files=3)
+    [merged] = store.current_files()
+    monkeypatch.setattr(backfill, "rederive", lambda df: df.assign(Sector="Water"))
+
+    rows, changed, data = backfill.backfill_part(os.path.join(store.cache_dir, merged), chunk_rows=2)
+    assert (rows, changed) == (6, 6)
+    revision = store.replace_file(merged, data)
+    assert store.current_files() == [revision]
+    assert store.compacted_from(revision) == sorted(old)
+    assert set(store.read()["Sector"]) == {"Water"}
+
+
+def test_merge_does_not_copy_shard_parts_the_target_has_compacted(tmp_path):
+    import ingest
+
+    shard = InsightStore(LocalBackend(str(tmp_path / "shard")))
+    fill(shard, "2025-01-01", 3)
+    args = argparse.Namespace(into=str(tmp_path / "target"), shards=[str(tmp_path / "shard")])
+    ingest.merge(args)
+    target = InsightStore(LocalBackend(args.into))
+    target.compact(before="2025-01-02", min_files=3)
+
+    ingest.merge(args)
+    assert len(target.current_files()) == 1
+    assert len(target.read()) == 6
+
+
+def test_a_remote_store_drops_cached_parts_deleted_remotely(tmp_path):
+    remote = LocalBackend(str(tmp_path / "remote"))
+    writer = InsightStore(remote, cache_dir=str(tmp_path / "writer"))
+    reader = InsightStore(_Remote(remote), cache_dir=str(tmp_path / "reader"))
+    fill(writer, "2025-01-01", 3)
+    assert len(reader.read()) == 6
+
+    writer.compact(before="2025-01-02", min_files=3)
+    assert len(reader.read()) == 6
+    assert len(reader.local_files()) == 1
+
+
+class _Remote:
+    # A backend the store does not treat as its own cache, like the blob backend
+    def __init__(self, backend):
+        self.backend = backend
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
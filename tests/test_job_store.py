@@ -0,0 +1,121 @@
+import json
+
+import pytest
+
+import scheduler as scheduler_module
+from job_store import JobStore, submit_url
+from scheduler import Scheduler
+
+
+@pytest.fixture
+def jobs(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite"))
+
+
+def make_scheduler(jobs, store, **kwargs):
+    return Scheduler(feeds={}, manual_pages=[], jobs=jobs, store=store, indexes=False, fetch_workers=1,
+                     analyse_workers=1, batch_wait=0, flush_seconds=0.2, tick=0.05, **kwargs)
+
+
+def drain(q):
+    keys = []
+    while not q.empty():
+        keys.append(q.get_nowait())
+    return keys
+
+
+def test_a_job_is_added_once_whatever_its_state(jobs):
+    assert jobs.add("https://a.example/1", "url", "User Input", "https://a.example/1")
+    jobs.update("https://a.example/1", "stored")
+    assert not jobs.add("https://a.example/1", "url", "User Input", "https://a.example/1")
+    assert jobs.add_many([("https://a.example/1", "url", "URL List", "https://a.example/1"),
+                          ("https://a.example/2", "url", "URL List", "https://a.example/2")]) == 1
+    assert jobs.counts() == {"stored": 1, "queued": 1}
+
+
+def test_each_state_change_keeps_its_fields(tmp_path, jobs):
+    jobs.add("k", "url", "Feed", "https://a.example/1")
+    jobs.update("k", "fetched", title="Depot", summary="Council approves depot")
+    jobs.update("k", "analysed", row={"Title": "Depot", "Sector": "Transport"})
+    # A fresh connection, as after a restart
+    job = JobStore(str(tmp_path / "jobs.sqlite")).get("k")
+    assert job["state"] == "analysed"
+    assert (job["title"], job["summary"]) == ("Depot", "Council approves depot")
+    assert job["row"] == {"Title": "Depot", "Sector": "Transport"}
+
+
+def test_failed_jobs_are_retried_after_the_delay_until_attempts_run_out(jobs):
+    jobs.add("k", "url", "Feed", "https://a.example/1")
+    jobs.fail("k", RuntimeError("timeout"))
+    assert jobs.get("k")["note"] == "timeout"
+    assert jobs.retryable(max_attempts=2, delay=3600) == []
+    assert jobs.retryable(max_attempts=2, delay=0) == ["k"]
+    jobs.fail("k", RuntimeError("timeout"))
+    assert jobs.retryable(max_attempts=2, delay=0) == []
+
+
+def test_resubmitting_a_url_only_retries_a_failed_job(jobs):
+    submit_url("https://a.example/1", jobs=jobs)
+    assert jobs.get("https://a.example/1")["state"] == "submitted"
+    jobs.update("https://a.example/1", "stored")
+    submit_url("https://a.example/1", retry=True, jobs=jobs)
+    assert jobs.get("https://a.example/1")["state"] == "stored"
+
+    jobs.fail("https://a.example/1", "boom")
+    submit_url("https://a.example/1", jobs=jobs)
+    assert jobs.get("https://a.example/1")["state"] == "failed"
+    submit_url("https://a.example/1", retry=True, jobs=jobs)
+    job = jobs.get("https://a.example/1")
+    assert (job["state"], job["attempts"], job["note"]) == ("submitted", 0, None)
+
+
+def test_resume_picks_each_job_up_at_the_stage_it_reached(jobs, store):
+    for key, state in [("q", "queued"), ("f", "fetched"), ("a", "analysed"), ("s", "stored"), ("x", "failed")]:
+        jobs.add(key, "url", "Feed", f"https://a.example/{key}", state=state)
+    scheduler = make_scheduler(jobs, store)
+    scheduler._resume()
+    assert drain(scheduler.fetch_queue) == ["q"]
+    assert drain(scheduler.analyse_queue) == ["f"]
+    assert drain(scheduler.write_queue) == ["a"]
+
+
+def test_a_run_takes_submitted_jobs_through_to_stored(jobs, store, monkeypatch):
+    def fetch(self, job):
+        if job["key"].endswith("broken"):
+            raise RuntimeError("404 Not Found")
+        return {"title": f"Depot {job['key'][-1]}", "summary": "Council approves depot"}
+
+    monkeypatch.setattr(Scheduler, "fetch", fetch)
+    monkeypatch.setattr(scheduler_module, "is_duplicate_article", lambda key, title, summary: False)
+    monkeypatch.setattr(scheduler_module, "analyse_article",
+                        lambda key, title, summary: json.dumps({"summary": title, "sector": "Transport"}))
+    for key in ["https://a.example/1", "https://a.example/2", "https://a.example/broken"]:
+        submit_url(key, jobs=jobs)
+    make_scheduler(jobs, store).run_once()
+
+    assert jobs.counts() == {"stored": 2, "failed": 1}
+    assert jobs.get("https://a.example/broken")["note"] == "404 Not Found"
+    stored = store.read()
+    assert sorted(stored["Summary"]) == ["Depot 1", "Depot 2"]
+    assert set(stored["Sector"]) == {"Transport"}
+    # Nothing is left to resume
+    assert not any(jobs.keys(state) for state in ("queued", "fetched", "analysed"))
+
+
+def test_an_error_page_fails_the_job_instead_of_being_analysed(jobs, store, monkeypatch):
+    import requests
+
+    def get(url, timeout=10, headers=None):
+        res = requests.Response()
+        res.status_code, res.url, res._content = 404, url, b"<html><h1>Page not found</h1></html>"
+        return res
+
+    analysed = []
+    monkeypatch.setattr(scheduler_module.http_client, "get", get)
+    monkeypatch.setattr(scheduler_module, "analyse_article", lambda *args: analysed.append(args))
+    submit_url("https://a.example/gone", jobs=jobs)
+    make_scheduler(jobs, store).run_once()
+
+    job = jobs.get("https://a.example/gone")
+    assert job["state"] == "failed" and "404" in job["note"]
+    assert analysed == []
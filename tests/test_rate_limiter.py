@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from metrics import metrics
+from rate_limiter import RateLimiter, estimate_tokens, rate_limited_completion
+
+MESSAGES = [{"role": "user", "content": "Summarize the council's rail depot plans" * 10}]
+
+
+def fake_client(*outcomes):
+    # Each call raises or returns the next outcome
+    outcomes = list(outcomes)
+
+    def create(**kwargs):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(with_raw_response=SimpleNamespace(create=create))))
+
+
+def response(status, **headers):
+    # Just what the openai errors read from an HTTP response
+    return SimpleNamespace(status_code=status, headers=headers, request=None)
+
+
+def rate_limited():
+    return openai.RateLimitError("Too Many Requests", response=response(429, **{"retry-after-ms": "1"}), body=None)
+
+
+def bad_request():
+    return openai.BadRequestError("Bad Request", response=response(400), body=None)
+
+
+def ok():
+    return SimpleNamespace(headers={}, parse=lambda: SimpleNamespace(usage=None, text="ok"))
+
+
+def test_a_retried_call_that_succeeds_is_not_a_failure():
+    since = metrics.snapshot()
+    completion = rate_limited_completion(fake_client(rate_limited(), ok()), MESSAGES, 50, limiter=RateLimiter(),
+                                         stage="test_retry")
+    assert completion.text == "ok"
+    assert metrics.counter("llm_retries", since, stage="test_retry") == 1
+    assert metrics.counter("failures", since, stage="test_retry") == 0
+    assert metrics.stage_stats(since)["test_retry"]["count"] == 1
+
+
+def test_a_failed_call_counts_once_and_refunds_its_tokens():
+    limiter = RateLimiter(rpm=60, tpm=10_000)
+    since = metrics.snapshot()
+    with pytest.raises(openai.BadRequestError):
+        rate_limited_completion(fake_client(bad_request()), MESSAGES, 50, limiter=limiter, stage="test_failure")
+    assert metrics.counter("failures", since, stage="test_failure") == 1
+    assert metrics.counter("llm_retries", since, stage="test_failure") == 0
+    assert estimate_tokens(MESSAGES, 50) > 100
+    assert limiter.tokens.tokens == pytest.approx(10_000)
+
+
+def test_giving_up_after_the_last_retry_refunds_its_tokens():
+    limiter = RateLimiter(rpm=60, tpm=10_000)
+    since = metrics.snapshot()
+    with pytest.raises(openai.RateLimitError):
+        rate_limited_completion(fake_client(rate_limited(), rate_limited()), MESSAGES, 50, limiter=limiter,
+                                max_retries=1, stage="test_give_up")
+    assert metrics.counter("llm_retries", since, stage="test_give_up") == 1
+    assert metrics.counter("failures", since, stage="test_give_up") == 1
+    assert limiter.tokens.tokens == pytest.approx(10_000)
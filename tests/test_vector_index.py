@@ -0,0 +1,45 @@
+import os
+
+import pandas as pd
+
+from vector_index import HashingEmbedder, VectorIndex, embedder_path
+
+
+def insights(urls, summaries):
+    return pd.DataFrame({"Source": "Feed", "URL": urls, "Summary": summaries,
+                         "Strategic Insight Summary": "Signals demand for rail capacity"})
+
+
+ROWS = insights(
+    ["https://a.example/1", "https://a.example/2", "https://a.example/3"],
+    ["Metro line tunnel contract awarded", "Hospital wing design tender opens", "Solar farm connects to the grid"],
+)
+
+
+def test_each_embedder_keeps_its_own_file(tmp_path):
+    path = str(tmp_path / "vectors.sqlite")
+    small = VectorIndex(path, embedder=HashingEmbedder(64), backend="exact")
+    small.add(ROWS, part="p1")
+    # Opening the same path with another model leaves the first model's vectors alone
+    large = VectorIndex(path, embedder=HashingEmbedder(128), backend="exact")
+    assert len(large) == 0
+    assert len(VectorIndex(path, embedder=HashingEmbedder(64), backend="exact")) == 3
+    assert os.path.exists(embedder_path(path, "hashing:64")) and os.path.exists(embedder_path(path, "hashing:128"))
+
+
+def test_a_part_is_embedded_once_and_search_finds_it(tmp_path, store):
+    index = VectorIndex(str(tmp_path / "vectors.sqlite"), embedder=HashingEmbedder(), backend="exact")
+    part = store.append(ROWS)
+    assert index.add(ROWS, part=part) == 3
+    assert index.add(ROWS, part=part) == 0
+    assert index.sync(store) == 0
+    hits = index.search("hospital design tender")
+    assert hits["Document Key"].iloc[0] == "https://a.example/2"
+    assert "https://a.example/1" not in set(index.similar("https://a.example/1")["Document Key"])
+
+
+def test_sync_embeds_parts_written_elsewhere(tmp_path, store):
+    store.append(ROWS)
+    index = VectorIndex(str(tmp_path / "vectors.sqlite"), embedder=HashingEmbedder(), backend="exact")
+    assert index.sync(store) == 3
+    assert index.search("metro tunnel")["Document Key"].iloc[0] == "https://a.example/1"
@@ -0,0 +1,400 @@
+import functools
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import zlib
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+from dedup_index import document_key
+from metrics import metrics
+
+load_dotenv()
+
+AEC_VECTOR_INDEX_PATH = os.getenv("AEC_VECTOR_INDEX_PATH", ".cache/vector_index.sqlite")
+AZURE_OPENAI_EMBEDDING_DEPLOYMENT = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
+# "azure" embeds with the deployment above; "hashing" is local, free and keyword-level only
+AEC_EMBEDDINGS = os.getenv("AEC_EMBEDDINGS", "azure" if AZURE_OPENAI_EMBEDDING_DEPLOYMENT else "hashing")
+AEC_EMBEDDING_DIMENSIONS = int(os.getenv("AEC_EMBEDDING_DIMENSIONS", "256"))
+# "exact" scores every vector; "ivf" only the closest clusters; "auto" switches at IVF_MIN_ROWS
+AEC_VECTOR_BACKEND = os.getenv("AEC_VECTOR_BACKEND", "auto")
+AEC_VECTOR_NPROBE = int(os.getenv("AEC_VECTOR_NPROBE", "32"))
+IVF_MIN_ROWS = 200_000
+IVF_TRAIN_SAMPLE = 50_000
+IVF_ITERATIONS = 10
+EMBED_COLUMNS = ["Summary", "Strategic Insight Summary"]
+EMBED_BATCH = 256
+MATMUL_ROWS = 20_000
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in into is it its of on or that the their this to was were will with".split()
+)
+
+
+def normalize_rows(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.where(norms == 0, 1, norms)).astype(np.float32)
+
+
+class HashingEmbedder:
+    # Signed feature hashing of words and word pairs: deterministic, offline and free, so tests,
+    # benchmarks and deployments without an embedding model still get keyword-level search
+    def __init__(self, dimensions=AEC_EMBEDDING_DIMENSIONS):
+        self.dimensions = dimensions
+        self.name = f"hashing:{dimensions}"
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = [w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS]
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                h = zlib.crc32(feature.encode())
+                vectors[row, h % self.dimensions] += 1.0 if h & 0x80000000 else -1.0
+        return normalize_rows(vectors)
+
+
+class AzureEmbedder:
+    # text-embedding-3 deployments can shorten their vectors, which keeps the in-memory matrix small
+    def __init__(self, deployment=AZURE_OPENAI_EMBEDDING_DEPLOYMENT, dimensions=AEC_EMBEDDING_DIMENSIONS):
+        self.deployment = deployment
+        self.dimensions = dimensions
+        self.name = f"azure:{deployment}:{dimensions}"
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import AzureOpenAI
+
+            self._client = AzureOpenAI(
+                api_key=os.getenv("AZURE_OPENAI_KEY"),
+                azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+                api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-01"),
+            )
+        return self._client
+
+    def embed(self, texts):
+        with metrics.timer("embed"):
+            response = self.client.embeddings.create(model=self.deployment, input=list(texts), dimensions=self.dimensions)
+        metrics.incr("embedded_texts", len(texts))
+        data = sorted(response.data, key=lambda item: item.index)
+        return normalize_rows(np.array([item.embedding for item in data], dtype=np.float32))
+
+
+EMBEDDERS = {"hashing": HashingEmbedder, "azure": AzureEmbedder}
+
+
+def get_embedder(name=AEC_EMBEDDINGS):
+    return EMBEDDERS[name]()
+
+
+def embedder_path(path, name):
+    # One index file per embedding model (".cache/vector_index.hashing-256.sqlite"). Vectors from
+    # different models are not comparable, and a process configured with another model, such as a
+    # dashboard without the Azure deployment, must not touch the index the scheduler built
+    root, ext = os.path.splitext(path)
+    return f"{root}.{re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')}{ext}"
+
+
+def insight_text(df):
+    # What is embedded for each row: the summary and why it matters
+    parts = [df[column].astype(object).where(df[column].notna(), "").astype(str) for column in EMBED_COLUMNS if column in df]
+    if not parts:
+        return pd.Series("", index=df.index)
+    text = parts[0]
+    for part in parts[1:]:
+        text = text + "\n" + part
+    return text.str.strip()
+
+
+def kmeans(sample, clusters, iterations=IVF_ITERATIONS, seed=0):
+    # Spherical k-means: centroids are renormalized means, assignment is by inner product
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = nearest_centroids(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        counts = np.bincount(assignment, minlength=clusters)
+        filled = counts > 0
+        centroids[filled] = normalize_rows(sums[filled])
+    return centroids
+
+
+def nearest_centroids(vectors, centroids):
+    return np.concatenate([
+        np.argmax(vectors[start:start + MATMUL_ROWS] @ centroids.T, axis=1)
+        for start in range(0, len(vectors), MATMUL_ROWS)
+    ]).astype(np.int32) if len(vectors) else np.empty(0, dtype=np.int32)
+
+
+class VectorIndex:
+    # Embeddings of every stored insight, keyed like dedup_index (URL, or manual:<name> for
+    # internal documents), kept up to date as part files are appended. Queries run against a
+    # float32 matrix held in memory and extended incrementally; above IVF_MIN_ROWS rows the
+    # vectors are clustered and a query only scores the AEC_VECTOR_NPROBE closest clusters.
+    # The embedder is pluggable: anything with name, dimensions and embed(texts) -> unit vectors.
+    # Each embedder keeps its own file next to path (see embedder_path)
+    def __init__(self, path=AEC_VECTOR_INDEX_PATH, embedder=None, backend=AEC_VECTOR_BACKEND, nprobe=AEC_VECTOR_NPROBE):
+        self.path = path
+        self.backend = backend
+        self.nprobe = nprobe
+        self._embedder = embedder
+        self.lock = threading.Lock()
+        self._conn = None
+        self._version = None
+        self._reset_memory()
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            self._embedder = get_embedder()
+        return self._embedder
+
+    @property
+    def file_path(self):
+        return embedder_path(self.path, self.embedder.name)
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.file_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value BLOB)")
+            self._conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('embedder', ?)", (self.embedder.name,))
+            stored = self._conn.execute("SELECT value FROM meta WHERE name = 'embedder'").fetchone()[0]
+            if stored != self.embedder.name:
+                # Two model names that map to one file name; never mix or drop their vectors
+                self._conn.close()
+                self._conn = None
+                raise RuntimeError(f"{self.file_path} holds {stored} vectors, not {self.embedder.name}")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS vectors ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT UNIQUE NOT NULL, text_hash TEXT NOT NULL,"
+                " list INTEGER, vector BLOB NOT NULL)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS parts (name TEXT PRIMARY KEY)")
+            self._conn.commit()
+        return self._conn
+
+    def _meta(self, name):
+        row = self.conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    # Writing
+
+    def add(self, df, part=None):
+        # Embeds the rows of one appended part file. Rows whose text is unchanged since they were
+        # embedded (a part rewritten by backfill.py) are not sent to the embedder again
+        if part:
+            with self.lock:
+                if self.conn.execute("SELECT 1 FROM parts WHERE name = ?", (part,)).fetchone():
+                    return 0
+        rows = {}
+        if not df.empty:
+            urls = df["URL"] if "URL" in df else pd.Series(None, index=df.index)
+            sources = df["Source"] if "Source" in df else pd.Series(None, index=df.index)
+            for url, source, text in zip(urls, sources, insight_text(df)):
+                if isinstance(url, str) and text:
+                    rows[document_key(url, source)] = (text, hashlib.sha1(text.encode("utf-8")).hexdigest()[:16])
+
+        with self.lock:
+            known = {}
+            keys = list(rows)
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                known.update(self.conn.execute(
+                    f"SELECT key, text_hash FROM vectors WHERE key IN ({','.join('?' * len(batch))})", batch))
+        fresh = [key for key, (_, text_hash) in rows.items() if known.get(key) != text_hash]
+
+        embedded = []
+        for start in range(0, len(fresh), EMBED_BATCH):
+            batch = fresh[start:start + EMBED_BATCH]
+            embedded.append(self.embedder.embed([rows[key][0] for key in batch]))
+        vectors = np.concatenate(embedded) if embedded else np.empty((0, self.embedder.dimensions), dtype=np.float32)
+
+        with self.lock:
+            # The part is claimed in the same transaction as its vectors, so the dashboard's sync
+            # and the scheduler's add embedding one part at the same time store it once
+            try:
+                if part and not self.conn.execute("INSERT OR IGNORE INTO parts (name) VALUES (?)", (part,)).rowcount:
+                    self.conn.rollback()
+                    return 0
+                centroids = self._stored_centroids()
+                lists = nearest_centroids(vectors, centroids).tolist() if centroids is not None else [None] * len(fresh)
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO vectors (key, text_hash, list, vector) VALUES (?, ?, ?, ?)",
+                    [(key, rows[key][1], cluster, vector.tobytes()) for key, cluster, vector in zip(fresh, lists, vectors)],
+                )
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+            self._version = None
+        self._maybe_train()
+        return len(fresh)
+
+    def sync(self, store):
+        # Embed the store's part files not seen yet (other machines, the CSV migration, a backfill).
+        # A compacted part is recorded with the parts it replaces, so merging it again later is no news
+        with self.lock:
+            done = {name for (name,) in self.conn.execute("SELECT name FROM parts")}
+        store.sync()
+        fresh, covered = store.unseen_files(done)
+        added = 0
+        for name in fresh:
+            added += self.add(store.read_files([name], columns=["Source", "URL", *EMBED_COLUMNS]), part=name)
+        with self.lock:
+            self.conn.executemany("INSERT OR IGNORE INTO parts (name) VALUES (?)", [
+                (source,) for name in fresh + covered for source in [name, *store.compacted_from(name)]
+            ])
+            self.conn.commit()
+        return added
+
+    def _stored_centroids(self):
+        blob = self._meta("centroids")
+        return None if blob is None else np.frombuffer(blob, dtype=np.float32).reshape(-1, self.embedder.dimensions)
+
+    def _maybe_train(self):
+        # (Re)cluster once there are IVF_MIN_ROWS vectors and again whenever they have doubled
+        if self.backend == "exact":
+            return
+        with self.lock:
+            rows = self.conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+            trained = int(self._meta("trained_rows") or 0)
+        if rows < (IVF_MIN_ROWS if self.backend == "auto" else 1) or (trained and rows < 2 * trained):
+            return
+        self.train()
+
+    def train(self):
+        with metrics.timer("vector_train"):
+            matrix, keys, _ = self._snapshot()
+            rng = np.random.default_rng(0)
+            sample = matrix[rng.choice(len(matrix), min(len(matrix), IVF_TRAIN_SAMPLE), replace=False)]
+            clusters = int(min(len(sample), max(16, np.sqrt(len(matrix)))))
+            centroids = kmeans(sample, clusters)
+            lists = nearest_centroids(matrix, centroids)
+            with self.lock:
+                self.conn.executemany("UPDATE vectors SET list = ? WHERE key = ?", zip(lists.tolist(), keys))
+                generation = int(self._meta("generation") or 0) + 1
+                self.conn.executemany("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", [
+                    ("centroids", centroids.tobytes()), ("trained_rows", str(len(matrix))), ("generation", str(generation)),
+                ])
+                self.conn.commit()
+                self._version = None
+
+    # Reading
+
+    def _reset_memory(self):
+        self._keys = []
+        self._positions = {}
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._lists = np.empty(0, dtype=np.int32)
+        self._size = 0
+        self._last_id = 0
+        self._centroids = None
+        self._generation = None
+
+    def _refresh(self):
+        # Called with the lock held. data_version moves whenever another connection commits;
+        # only rows added since the last refresh are read, unless the clusters were retrained
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._version:
+            return
+        self._version = version
+        generation = self._meta("generation")
+        if generation != self._generation:
+            self._reset_memory()
+            self._generation = generation
+            self._centroids = self._stored_centroids()
+        rows = self.conn.execute(
+            "SELECT id, key, COALESCE(list, -1), vector FROM vectors WHERE id > ? ORDER BY id", (self._last_id,)
+        ).fetchall()
+        if not rows:
+            return
+        dimensions = self.embedder.dimensions
+        vectors = np.frombuffer(b"".join(row[3] for row in rows), dtype=np.float32).reshape(-1, dimensions)
+        if self._matrix.shape[1] != dimensions or self._size + len(rows) > len(self._matrix):
+            capacity = max(1024, 2 * (self._size + len(rows)))
+            grown = np.empty((capacity, dimensions), dtype=np.float32)
+            if self._size:
+                grown[:self._size] = self._matrix[:self._size]
+            lists = np.full(capacity, -1, dtype=np.int32)
+            lists[:self._size] = self._lists[:self._size]
+            self._matrix, self._lists = grown, lists
+        for (_, key, cluster, _), vector in zip(rows, vectors):
+            position = self._positions.get(key)
+            if position is None:
+                position = self._size
+                self._positions[key] = position
+                self._keys.append(key)
+                self._size += 1
+            self._matrix[position] = vector
+            self._lists[position] = cluster
+        self._last_id = rows[-1][0]
+
+    def _snapshot(self):
+        with self.lock:
+            self._refresh()
+            return self._matrix[:self._size], self._keys[:self._size], self._lists[:self._size]
+
+    @functools.lru_cache(maxsize=256)
+    def query_vector(self, text):
+        return self.embedder.embed([text])[0]
+
+    def search(self, text, k=10, keys=None):
+        # The k insights closest to free text, best first, as a DataFrame of Document Key and Score.
+        # keys restricts the search to those insights (the dashboard's current filters)
+        if not text or not text.strip():
+            return pd.DataFrame({"Document Key": [], "Score": []})
+        with metrics.timer("vector_search"):
+            return self._nearest(self.query_vector(text.strip()), k, keys)
+
+    def similar(self, key, k=10, keys=None):
+        # The k insights closest to an indexed one, leaving the insight itself out
+        with self.lock:
+            self._refresh()
+            position = self._positions.get(key)
+            vector = None if position is None else self._matrix[position].copy()
+        if vector is None:
+            return pd.DataFrame({"Document Key": [], "Score": []})
+        with metrics.timer("vector_search"):
+            found = self._nearest(vector, k + 1, keys)
+        return found[found["Document Key"] != key].head(k).reset_index(drop=True)
+
+    def _nearest(self, vector, k, keys):
+        with self.lock:
+            self._refresh()
+            matrix, all_keys, lists = self._matrix[:self._size], self._keys, self._lists[:self._size]
+            centroids, positions = self._centroids, self._positions
+        if keys is not None:
+            candidates = np.fromiter((p for p in map(positions.get, keys) if p is not None), dtype=np.int64)
+        elif centroids is not None and self.backend != "exact" and (self.backend == "ivf" or len(matrix) >= IVF_MIN_ROWS):
+            probe = np.argsort(centroids @ vector)[-self.nprobe:]
+            # Rows added since the last training have no cluster yet and are always scored
+            candidates = np.flatnonzero(np.isin(lists, probe) | (lists < 0))
+        else:
+            candidates = None
+        scores = matrix @ vector if candidates is None else matrix[candidates] @ vector
+        if not len(scores):
+            return pd.DataFrame({"Document Key": [], "Score": []})
+        top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        # Nothing in common with the query is not a match
+        top = top[scores[top] > 0]
+        rows = top if candidates is None else candidates[top]
+        return pd.DataFrame({"Document Key": [all_keys[i] for i in rows], "Score": scores[top]})
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+
+vector_index = VectorIndex()